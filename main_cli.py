@@ -7,27 +7,14 @@ AW115MST - 115网盘秒传检测工具 (CLI)
 import argparse
 import sys
 from pathlib import Path
-from modules.config_init import init_config_files, validate_config, print_validation_result
-from modules.controller import RapidUploadController
-from modules.file_watcher import FileWatcher
-from modules.scheduler import Scheduler
 
+# 注意：控制器、调度器、Bot 等模块依赖较多（p115client、watchdog、telegram 等），
+# 只在需要它们的命令分支内导入，--test-telegram / --clean-processed / --check-config
+# 等短命令无需加载，便于被外部定时任务频繁调用。
 
-def main():
-    """主函数"""
-    # 初始化配置文件
-    print("🔧 检查配置文件...")
-    config_ready = init_config_files()
-    
-    if not config_ready:
-        # 首次运行，需要用户配置
-        sys.exit(1)
-    
-    # 验证配置
-    errors, warnings = validate_config()
-    if not print_validation_result(errors, warnings):
-        sys.exit(1)
-    
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
     parser = argparse.ArgumentParser(
         description='AW115MST - 115网盘秒传检测工具',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -59,6 +46,9 @@ def main():
   
   # 测试 Telegram 通知
   python main_cli.py --test-telegram
+  
+  # 仅检查配置文件
+  python main_cli.py --check-config
         '''
     )
     
@@ -128,6 +118,12 @@ def main():
         help='测试 Telegram 通知连接'
     )
     
+    parser.add_argument(
+        '--check-config',
+        action='store_true',
+        help='仅检查配置文件是否有效，然后退出'
+    )
+    
     parser.add_argument(
         '--manual',
         action='store_true',
@@ -153,20 +149,37 @@ def main():
         version='AW115MST v1.0.0'
     )
     
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    """主函数"""
+    # 先解析参数，--help / --version 无需检查配置
+    args = build_parser().parse_args()
+    
+    from modules.config_init import init_config_files, validate_config, print_validation_result
+    
+    # 初始化配置文件
+    print("🔧 检查配置文件...")
+    config_ready = init_config_files()
+    
+    if not config_ready:
+        # 首次运行，需要用户配置
+        sys.exit(1)
+    
+    # 验证配置
+    errors, warnings = validate_config()
+    if not print_validation_result(errors, warnings):
+        sys.exit(1)
+    
+    if args.check_config:
+        print("✅ 配置检查通过")
+        sys.exit(0)
     
     # 处理 no-recursive 参数
     if args.no_recursive:
         args.recursive = False
     
-    # 检查输入路径
-    input_path = Path(args.input)
-    if not input_path.exists():
-        print(f"错误: 输入路径不存在: {input_path}")
-        if args.input == './input':
-            print(f"提示: 默认扫描 ./input 目录，请将待检测文件放入该目录")
-        sys.exit(1)
-    
     # 检查配置文件
     config_path = Path(args.config)
     if not config_path.exists():
@@ -175,13 +188,14 @@ def main():
         sys.exit(1)
     
     try:
-        # 创建控制器
-        controller = RapidUploadController(config_path=str(config_path))
-        
-        # 测试 Telegram 连接
+        # 测试 Telegram 连接（只需读取配置，不创建控制器）
         if args.test_telegram:
+            from modules.config_manager import ConfigManager
+            from modules.telegram_notifier import TelegramNotifier
+            
+            telegram = TelegramNotifier(ConfigManager(str(config_path)).get('telegram', {}))
             print("\n=== 测试 Telegram 通知 ===\n")
-            if controller.telegram.test_connection():
+            if telegram.test_connection():
                 print("✅ Telegram 通知测试成功！")
                 sys.exit(0)
             else:
@@ -189,6 +203,19 @@ def main():
                 print("请检查配置文件中的 bot_token 和 chat_id")
                 sys.exit(1)
         
+        # 检查输入路径
+        input_path = Path(args.input)
+        if not args.clean_processed and not input_path.exists():
+            print(f"错误: 输入路径不存在: {input_path}")
+            if args.input == './input':
+                print(f"提示: 默认扫描 ./input 目录，请将待检测文件放入该目录")
+            sys.exit(1)
+        
+        # 创建控制器
+        from modules.controller import RapidUploadController
+        
+        controller = RapidUploadController(config_path=str(config_path))
+        
         # 清理已处理文件记录
         if args.clean_processed:
             print("\n=== 清理已处理文件记录 ===\n")
@@ -262,6 +289,8 @@ def main():
                 sys.exit(1)
         
         # 默认模式：启动调度器（实时监控 + 定时任务）
+        from modules.scheduler import Scheduler
+        
         scheduler_config = controller.config_manager.get('scheduler', {})
         scheduler = Scheduler(scheduler_config, controller)
         scheduler.start()
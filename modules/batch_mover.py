@@ -0,0 +1,135 @@
+"""
+批量放置模块
+一轮处理中移动/复制大量文件时缓存已创建的目录和已占用的文件名，
+空文件夹在本轮结束时统一清理，减少每个文件的系统调用次数
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .copy_engine import place_file_data
+
+
+class BatchMover:
+    """
+    批量文件放置器（单个处理轮次内使用，非线程安全）
+
+    - 已创建的目录只 mkdir 一次
+    - 每个目标目录首次使用时 scandir 一次建立已占用文件名索引，之后只在内存中选名；
+      放置时目标已存在（EEXIST，本轮之外新出现的文件）才登记该名字并换下一个
+    - 移动产生的空文件夹推迟到 finish() 时从深到浅统一清理
+    """
+
+    def __init__(self, file_handler):
+        """
+        初始化批量放置器
+
+        :param file_handler: FileHandler 实例（提供目标路径计算与 verify_copy 配置）
+        """
+        self.file_handler = file_handler
+        self._created_dirs: Set[str] = set()
+        self._taken_names: Dict[str, Set[str]] = {}
+        self._cleanup: Set[Tuple[str, Optional[str]]] = set()
+        self.started = time.monotonic()
+        self.placed = 0
+        self.fallbacks = 0
+
+    def place(self, source: Path, target_dir: Path, keep_structure: bool = False,
+              base_path: Optional[Path] = None, mode: str = 'move',
+              expected_sha1: Optional[str] = None) -> Path:
+        """
+        放置单个文件（参数与 FileHandler.place_file 相同）
+
+        :return: 目标文件路径
+        """
+        source = Path(os.path.abspath(source))
+        if base_path:
+            base_path = Path(os.path.abspath(base_path))
+
+        target_path = self.file_handler.target_path(
+            source, Path(os.path.abspath(target_dir)), keep_structure, base_path
+        )
+        self._ensure_dir(target_path.parent)
+
+        expected = expected_sha1 if self.file_handler.verify_copy else None
+        while True:
+            claimed = self._claim_name(target_path)
+            try:
+                method = place_file_data(source, claimed, mode, expected)
+                break
+            except FileExistsError:
+                # 名字已被占用（索引建立之后出现），保留登记，换下一个名字
+                continue
+            except BaseException:
+                self._taken_names[str(claimed.parent)].discard(claimed.name)
+                raise
+        target_path = claimed
+
+        if mode == 'hardlink' and method != 'hardlink':
+            self.fallbacks += 1
+        if mode == 'move':
+            self._cleanup.add((str(source.parent), str(base_path) if base_path else None))
+
+        self.placed += 1
+        return target_path
+
+    def _ensure_dir(self, dir_path: Path):
+        """创建目录（本轮已创建过的直接跳过）"""
+        key = str(dir_path)
+        if key not in self._created_dirs:
+            dir_path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(key)
+
+    def _claim_name(self, target_path: Path) -> Path:
+        """
+        选出不冲突的文件名并登记为已占用
+
+        :param target_path: 期望的目标路径
+        :return: 实际使用的目标路径（重名时追加 _1、_2 …）
+        """
+        parent = target_path.parent
+        taken = self._taken_names.get(str(parent))
+        if taken is None:
+            with os.scandir(parent) as entries:
+                taken = {entry.name for entry in entries}
+            self._taken_names[str(parent)] = taken
+
+        base_name = target_path.stem
+        extension = target_path.suffix
+        name = target_path.name
+        counter = 1
+        while name in taken:
+            name = f"{base_name}_{counter}{extension}"
+            counter += 1
+
+        taken.add(name)
+        return parent / name
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        结束本轮：清理移动后留下的空文件夹并返回统计
+
+        :return: {placed, fallbacks, removed_dirs, elapsed, rate}
+        """
+        removed = 0
+        # 先处理深层目录，父目录随后就能判断是否为空
+        for dir_path, stop_at in sorted(self._cleanup, key=lambda item: item[0].count(os.sep), reverse=True):
+            while dir_path != stop_at and dir_path != os.path.dirname(dir_path):
+                try:
+                    os.rmdir(dir_path)
+                except OSError:
+                    break
+                removed += 1
+                dir_path = os.path.dirname(dir_path)
+        self._cleanup.clear()
+
+        elapsed = time.monotonic() - self.started
+        return {
+            'placed': self.placed,
+            'fallbacks': self.fallbacks,
+            'removed_dirs': removed,
+            'elapsed': elapsed,
+            'rate': self.placed / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,194 @@
+"""
+断点模块
+记录已处理的文件：每处理一个文件向日志追加一行，日志过长时合并为快照
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, IO, Optional
+
+from .fs_utils import atomic_write_json
+from .resumable_hash import HashProgressStore
+
+
+class Checkpoint:
+    """
+    已处理文件的断点记录
+
+    - 快照（checkpoint_file）：全部已处理文件，通过临时文件 + fsync + rename 原子替换
+    - 日志（checkpoint_file.journal）：快照之后处理的文件，每行一个，只追加
+
+    记录以文件身份（设备、inode、大小、修改时间）为键并附带 SHA-1：
+    改名或移动（同一文件系统内）后仍能识别，内容被替换后身份变化，会重新处理。
+    同一路径再次记录时替换旧记录
+
+    加载时读取快照并重放日志；日志行数超过 compact_threshold 且超过快照条目数时
+    合并为新快照并清空日志，每个文件的平均写入量保持为常数。
+    写入中途崩溃只会留下不完整的最后一行，加载时忽略
+    """
+
+    def __init__(self, checkpoint_file: str | Path, compact_threshold: int = 10000):
+        """
+        初始化断点记录
+
+        :param checkpoint_file: 快照文件路径
+        :param compact_threshold: 触发合并的最少日志行数
+        """
+        self.checkpoint_file = Path(checkpoint_file)
+        self.journal_file = self.checkpoint_file.with_name(self.checkpoint_file.name + '.journal')
+        self.compact_threshold = compact_threshold
+        self.lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_path: Dict[str, str] = {}
+        self._snapshot_size = 0
+        self._journal_lines = 0
+        self._journal: Optional[IO[str]] = None
+
+    @staticmethod
+    def identity(stat: os.stat_result) -> str:
+        """
+        文件身份（与哈希进度使用同一格式）
+
+        :param stat: os.stat_result
+        :return: 身份字符串
+        """
+        return HashProgressStore.identity(stat)
+
+    def load(self) -> int:
+        """
+        从快照和日志加载已处理文件
+
+        :return: 已处理文件数量
+        """
+        with self.lock:
+            self._close_journal()
+            self._entries = {}
+            self._by_path = {}
+            if self.checkpoint_file.exists():
+                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for file_id, entry in data.get('files', {}).items():
+                    self._put(file_id, entry['path'], entry.get('sha1', ''))
+                for path in data.get('processed_files', []):
+                    self._put_legacy(path)
+            self._snapshot_size = len(self._entries)
+
+            self._journal_lines = 0
+            if self.journal_file.exists():
+                with open(self.journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # 崩溃时未写完的最后一行
+                            continue
+                        if isinstance(entry, str):
+                            self._put_legacy(entry)
+                        else:
+                            self._put(entry['id'], entry['path'], entry.get('sha1', ''))
+                        self._journal_lines += 1
+
+            return len(self._entries)
+
+    def get(self, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """
+        按文件身份查询记录
+
+        :param stat: 文件的 os.stat_result
+        :return: 记录（path、sha1），未处理过时为 None
+        """
+        with self.lock:
+            entry = self._entries.get(self.identity(stat))
+            return dict(entry) if entry else None
+
+    def add(self, path: str, stat: os.stat_result, sha1: str = '', persist: bool = True):
+        """
+        记录一个已处理文件（追加到日志，由 sync 落盘）
+
+        :param path: 文件绝对路径
+        :param stat: 处理时的 os.stat_result
+        :param sha1: 文件 SHA-1
+        :param persist: 是否写入日志（关闭断点续传时只记在内存中）
+        """
+        file_id = self.identity(stat)
+        with self.lock:
+            if self._entries.get(file_id) == {'path': path, 'sha1': sha1}:
+                return
+            self._put(file_id, path, sha1)
+            if not persist:
+                return
+            if self._journal is None:
+                self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+                torn = self._ends_torn()
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+                if torn:
+                    # 上次崩溃时最后一行没有写完，另起一行
+                    self._journal.write('\n')
+            self._journal.write(json.dumps({'id': file_id, 'path': path, 'sha1': sha1}, ensure_ascii=False) + '\n')
+            self._journal_lines += 1
+
+    def _put(self, file_id: str, path: str, sha1: str):
+        """写入内存记录并维护路径索引（需在锁内调用）"""
+        old_id = self._by_path.get(path)
+        if old_id is not None and old_id != file_id:
+            # 同一路径的文件内容已变化，旧记录作废
+            self._entries.pop(old_id, None)
+        old_entry = self._entries.get(file_id)
+        if old_entry is not None and old_entry['path'] != path:
+            # 文件已改名，旧路径不再对应该文件
+            self._by_path.pop(old_entry['path'], None)
+        self._entries[file_id] = {'path': path, 'sha1': sha1}
+        self._by_path[path] = file_id
+
+    def _put_legacy(self, path: str):
+        """旧版按路径记录的断点：按文件当前身份转换，文件已不存在时丢弃（需在锁内调用）"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._put(self.identity(stat), path, '')
+
+    def sync(self):
+        """日志落盘（fsync），日志过长时合并为快照"""
+        with self.lock:
+            if self._journal is not None:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            if self._journal_lines >= max(self.compact_threshold, self._snapshot_size):
+                self._compact()
+
+    def _compact(self):
+        """写入新快照后清空日志（需在锁内调用；两步之间崩溃只会重复记录，不会丢失）"""
+        atomic_write_json(self.checkpoint_file, {
+            'files': self._entries,
+            'timestamp': datetime.now().isoformat(),
+        }, indent=None)
+        self._close_journal()
+        with open(self.journal_file, 'w', encoding='utf-8'):
+            pass
+        self._snapshot_size = len(self._entries)
+        self._journal_lines = 0
+
+    def _ends_torn(self) -> bool:
+        """日志最后一行是否不完整"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(0, 2)
+                if not f.tell():
+                    return False
+                f.seek(-1, 2)
+                return f.read(1) != b'\n'
+        except OSError:
+            return False
+
+    def _close_journal(self):
+        """关闭日志文件（需在锁内调用）"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
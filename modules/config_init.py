@@ -7,6 +7,8 @@ import shutil
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 
+from .config_schema import Settings
+
 try:
     from ruamel.yaml import YAML
     HAS_RUAMEL = True
@@ -248,6 +250,18 @@ def validate_config():
     config_file = Path('./config/config.yaml')
     if not config_file.exists():
         errors.append("配置文件不存在: config/config.yaml")
+    else:
+        # 检查配置项类型与取值（非法项运行时会使用默认值）
+        try:
+            import yaml
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+            if not isinstance(config, dict):
+                errors.append("配置文件格式错误: config/config.yaml 顶层应为字典")
+            else:
+                warnings.extend(Settings.from_dict(config).errors)
+        except Exception as e:
+            errors.append(f"配置文件解析失败: {e}")
     
     # 检查 cookies 文件
     if not check_cookies_configured():
@@ -1,11 +1,14 @@
 """
 配置管理模块
-负责读取、保存和管理配置文件
+负责读取、保存和管理配置文件，支持修改后自动重新加载
 """
 
+import threading
 import yaml
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config_schema import Settings
 
 
 class ConfigManager:
@@ -19,7 +22,15 @@ class ConfigManager:
         """
         self.config_path = Path(config_path)
         self.config: Dict[str, Any] = {}
+        self.settings = Settings()
         self.load_config()
+        
+        # 热加载：配置文件变化后校验并整体替换，再通知各模块
+        self.lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any], Dict[str, Any]], None]] = []
+        self._file_signature = self._signature()
+        self._watch_stop = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
     
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
@@ -27,10 +38,17 @@ class ConfigManager:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
         
         with open(self.config_path, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+            self.config = yaml.safe_load(f) or {}
         
+        self._rebuild_settings()
         return self.config
     
+    def _rebuild_settings(self) -> None:
+        """根据当前配置字典重新生成类型化配置快照"""
+        self.settings = Settings.from_dict(self.config)
+        for error in self.settings.errors:
+            print(f"⚠️  配置错误: {error}")
+    
     def save_config(self, config: Dict[str, Any] = None) -> None:
         """
         保存配置到文件
@@ -39,10 +57,132 @@ class ConfigManager:
         """
         if config is not None:
             self.config = config
+            self._rebuild_settings()
         
         with open(self.config_path, 'w', encoding='utf-8') as f:
             yaml.dump(self.config, f, allow_unicode=True, default_flow_style=False)
     
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        """配置文件的修改时间与大小（用于检测变化）"""
+        try:
+            stat = self.config_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def add_listener(self, callback: Callable[[Dict[str, Any], Dict[str, Any]], None]) -> None:
+        """
+        注册配置变更回调
+        
+        :param callback: 回调函数，参数为 (旧配置, 新配置)
+        """
+        self._listeners.append(callback)
+    
+    def reload(self) -> Tuple[bool, List[str]]:
+        """
+        重新加载配置文件
+        新配置解析或校验失败时保留旧配置
+        
+        :return: (是否已应用, 错误列表)
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        except Exception as e:
+            return False, [f"解析失败: {e}"]
+        
+        if not isinstance(config, dict):
+            return False, ["顶层应为字典"]
+        
+        settings = Settings.from_dict(config)
+        if settings.errors:
+            return False, list(settings.errors)
+        
+        with self.lock:
+            old_config = self.config
+            self.config = config
+            self.settings = settings
+        
+        for callback in list(self._listeners):
+            try:
+                callback(old_config, config)
+            except Exception as e:
+                print(f"⚠️  应用新配置失败（{getattr(callback, '__qualname__', callback)}）: {e}")
+        
+        return True, []
+    
+    def start_watching(self, interval: float = 5) -> None:
+        """
+        启动配置文件监控（后台线程定期检查修改时间）
+        
+        :param interval: 检查间隔（秒）
+        """
+        if self._watch_thread is not None:
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop, args=(interval,), name='config-watcher', daemon=True
+        )
+        self._watch_thread.start()
+    
+    def stop_watching(self) -> None:
+        """停止配置文件监控"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=2)
+            self._watch_thread = None
+    
+    def _watch_loop(self, interval: float):
+        """配置文件监控循环"""
+        while not self._watch_stop.wait(interval):
+            signature = self._signature()
+            if signature is None or signature == self._file_signature:
+                continue
+            self._file_signature = signature
+            
+            applied, errors = self.reload()
+            if applied:
+                print("🔄 配置文件已修改，新配置已生效")
+            else:
+                print("⚠️  配置文件修改无效，继续使用原配置:")
+                for error in errors:
+                    print(f"   • {error}")
+    
+    def update_file(self, key_path: str, value: Any) -> None:
+        """
+        修改单个配置项并写回配置文件，随后立即重新加载
+        安装了 ruamel.yaml 时保留文件中的注释
+        
+        :param key_path: 配置键路径，如 "telegram.notify_on_rapid"
+        :param value: 配置值
+        """
+        keys = key_path.split('.')
+        
+        try:
+            from ruamel.yaml import YAML
+        except ImportError:
+            YAML = None
+        
+        if YAML is not None:
+            yaml_handler = YAML()
+            yaml_handler.preserve_quotes = True
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                document = yaml_handler.load(f) or {}
+            node = document
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+            node[keys[-1]] = value
+            with open(self.config_path, 'w', encoding='utf-8') as f:
+                yaml_handler.dump(document, f)
+        else:
+            self.set(key_path, value)
+            self.save_config()
+        
+        self._file_signature = self._signature()
+        applied, errors = self.reload()
+        if not applied:
+            raise ValueError("；".join(errors))
+    
     def get(self, key_path: str, default: Any = None) -> Any:
         """
         获取配置项（支持点号分隔的路径）
@@ -78,6 +218,7 @@ class ConfigManager:
             config = config[key]
         
         config[keys[-1]] = value
+        self._rebuild_settings()
     
     def get_p115_config(self) -> Dict[str, Any]:
         """获取115配置"""
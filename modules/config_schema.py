@@ -0,0 +1,241 @@
+"""
+配置结构模块
+加载时将配置字典校验并转换为不可变的类型化对象，
+处理循环中直接读取属性，无需每个文件都按点号路径查找
+"""
+
+import dataclasses
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from .job_scheduler import CronExpression
+
+# scheduler.jobs 下可配置的任务
+SCHEDULED_JOBS = ('scan_input', 'recheck')
+
+# 停止时 drain_timeout 之外的耗时上限（秒）：停止监控与调度 2 + 中断哈希后等待 2 + 停止 Bot 与发出剩余通知 2
+SHUTDOWN_OVERHEAD = 6
+
+
+def parse_interval(interval_str: str) -> int:
+    """
+    解析时间间隔字符串
+
+    :param interval_str: 时间间隔字符串 (如: "5m", "30m", "1h", "6h")
+    :return: 秒数
+    """
+    interval_str = str(interval_str).strip().lower()
+
+    # 分钟格式: 5m, 30m, 60m
+    if interval_str.endswith('m'):
+        return int(interval_str[:-1]) * 60
+
+    # 小时格式: 1h, 6h, 24h
+    if interval_str.endswith('h'):
+        return int(interval_str[:-1]) * 3600
+
+    raise ValueError(f"无法识别的时间间隔: {interval_str}")
+
+
+@dataclass(frozen=True)
+class MoveStrategySettings:
+    """file_processing.move_strategy"""
+    rapid_files_dir: str = './rapid'
+    non_rapid_files_dir: str = './non_rapid'
+    keep_non_rapid_in_place: bool = True
+    create_subdirs: bool = True
+    use_copy: bool = False
+    verify_copy: bool = False
+
+
+@dataclass(frozen=True)
+class RecheckSettings:
+    """recheck"""
+    enabled: bool = True
+    recheck_file: str = './data/recheck.json'
+    max_recheck_times: int = 10
+    delay_move_times: int = 3
+
+
+@dataclass(frozen=True)
+class CheckpointSettings:
+    """checkpoint"""
+    enabled: bool = True
+    checkpoint_file: str = './checkpoint.json'
+    auto_save_interval: int = 10
+    compact_threshold: int = 10000
+
+
+@dataclass(frozen=True)
+class TelegramSettings:
+    """telegram"""
+    enabled: bool = False
+    bot_token: str = ''
+    chat_id: str = ''
+    notify_on_complete: bool = True
+    notify_on_error: bool = True
+    notify_on_rapid: bool = False
+    bot_mode: bool = False
+    digest_size: int = 20
+    digest_interval: float = 30
+    queue_size: int = 100
+    min_interval: float = 1
+
+
+@dataclass(frozen=True)
+class SchedulerSettings:
+    """scheduler（间隔已换算为秒）"""
+    cron_enabled: bool = True
+    cron_interval: int = 6 * 3600
+    drain_timeout: float = 8
+    stop_grace_period: float = 15
+
+
+@dataclass(frozen=True)
+class Settings:
+    """完整配置快照（不可变，配置重新加载时整体替换）"""
+    move_strategy: MoveStrategySettings = field(default_factory=MoveStrategySettings)
+    recheck: RecheckSettings = field(default_factory=RecheckSettings)
+    checkpoint: CheckpointSettings = field(default_factory=CheckpointSettings)
+    telegram: TelegramSettings = field(default_factory=TelegramSettings)
+    scheduler: SchedulerSettings = field(default_factory=SchedulerSettings)
+    errors: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'Settings':
+        """
+        从配置字典构建
+
+        类型不符或取值非法的项使用默认值，问题记录在 errors 中
+
+        :param config: 配置字典
+        :return: 配置快照
+        """
+        config = config or {}
+        errors: List[str] = []
+
+        file_processing = _section(config, 'file_processing', errors)
+        move_strategy = _build(MoveStrategySettings, _section(file_processing, 'move_strategy', errors),
+                               'file_processing.move_strategy', errors)
+        recheck = _build(RecheckSettings, _section(config, 'recheck', errors), 'recheck', errors)
+        checkpoint = _build(CheckpointSettings, _section(config, 'checkpoint', errors), 'checkpoint', errors)
+        telegram = _build(TelegramSettings, _section(config, 'telegram', errors), 'telegram', errors)
+
+        for name in ('max_recheck_times', 'delay_move_times'):
+            if getattr(recheck, name) < 0:
+                errors.append(f"recheck.{name} 不能为负数")
+                recheck = dataclasses.replace(recheck, **{name: getattr(RecheckSettings, name)})
+        if checkpoint.auto_save_interval < 1:
+            errors.append("checkpoint.auto_save_interval 必须大于 0")
+            checkpoint = dataclasses.replace(checkpoint, auto_save_interval=CheckpointSettings.auto_save_interval)
+        if checkpoint.compact_threshold < 1:
+            errors.append("checkpoint.compact_threshold 必须大于 0")
+            checkpoint = dataclasses.replace(checkpoint, compact_threshold=CheckpointSettings.compact_threshold)
+
+        scheduler_config = _section(config, 'scheduler', errors)
+        cron_config = _section(scheduler_config, 'cron', errors)
+        scheduler = SchedulerSettings()
+        cron_enabled = _value(cron_config, 'enabled', bool, scheduler.cron_enabled, 'scheduler.cron', errors)
+        cron_interval = scheduler.cron_interval
+        if 'interval' in cron_config:
+            try:
+                cron_interval = _positive_interval(cron_config['interval'])
+            except ValueError as e:
+                errors.append(f"scheduler.cron.interval: {e}")
+                cron_interval = SchedulerSettings.cron_interval
+        _check_jobs(_section(scheduler_config, 'jobs', errors), errors)
+        drain_timeout = _value(scheduler_config, 'drain_timeout', float, scheduler.drain_timeout,
+                               'scheduler', errors)
+        stop_grace_period = _value(scheduler_config, 'stop_grace_period', float, scheduler.stop_grace_period,
+                                   'scheduler', errors)
+        if drain_timeout + SHUTDOWN_OVERHEAD > stop_grace_period:
+            errors.append(f"scheduler.drain_timeout 需不大于 stop_grace_period - {SHUTDOWN_OVERHEAD} 秒，"
+                          f"停止时将按剩余时间缩短等待")
+        scheduler = SchedulerSettings(cron_enabled, cron_interval, drain_timeout, stop_grace_period)
+
+        return cls(move_strategy, recheck, checkpoint, telegram, scheduler, tuple(errors))
+
+
+def _positive_interval(value: Any) -> int:
+    """解析时间间隔并要求大于 0"""
+    interval = parse_interval(value)
+    if interval <= 0:
+        raise ValueError("时间间隔必须大于 0")
+    return interval
+
+
+def _check_jobs(jobs_config: Dict[str, Any], errors: List[str]):
+    """
+    校验 scheduler.jobs（interval / cron / jitter / enabled / run_at_start）
+
+    :param jobs_config: scheduler.jobs 配置
+    :param errors: 错误列表
+    """
+    for name in jobs_config:
+        path = f"scheduler.jobs.{name}"
+        if name not in SCHEDULED_JOBS:
+            errors.append(f"{path}: 未知的任务（可选: {'、'.join(SCHEDULED_JOBS)}）")
+        job_config = _section(jobs_config, name, errors)
+
+        _value(job_config, 'enabled', bool, True, path, errors)
+        _value(job_config, 'run_at_start', bool, True, path, errors)
+        if _value(job_config, 'jitter', int, 0, path, errors) < 0:
+            errors.append(f"{path}.jitter 不能为负数")
+
+        if job_config.get('cron'):
+            try:
+                CronExpression(str(job_config['cron'])).next_after(time.time())
+            except ValueError as e:
+                errors.append(f"{path}.cron: {e}")
+        elif job_config.get('interval'):
+            try:
+                _positive_interval(job_config['interval'])
+            except ValueError as e:
+                errors.append(f"{path}.interval: {e}")
+
+
+def _section(config: Dict[str, Any], key: str, errors: List[str]) -> Dict[str, Any]:
+    """读取子配置（缺失或为空时返回空字典）"""
+    value = config.get(key)
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        errors.append(f"{key} 应为字典")
+        return {}
+    return value
+
+
+def _value(data: Dict[str, Any], key: str, expected: type, default: Any, path: str, errors: List[str]) -> Any:
+    """
+    读取并校验单个配置项
+
+    :param data: 所在的配置字典
+    :param key: 配置键
+    :param expected: 期望类型（bool / int / float / str）
+    :param default: 默认值
+    :param path: 所在配置的路径（用于错误信息）
+    :param errors: 错误列表
+    :return: 配置值（非法时返回默认值）
+    """
+    if key not in data or data[key] is None:
+        return default
+
+    value = data[key]
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if expected is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, expected) and not (expected is int and isinstance(value, bool)):
+        return value
+
+    errors.append(f"{path}.{key} 应为 {expected.__name__}，实际为 {value!r}，已使用默认值 {default!r}")
+    return default
+
+
+def _build(cls, data: Dict[str, Any], path: str, errors: List[str]):
+    """按 dataclass 字段读取并校验一组配置"""
+    values = {}
+    for f in dataclasses.fields(cls):
+        values[f.name] = _value(data, f.name, f.type, f.default, path, errors)
+    return cls(**values)
@@ -3,45 +3,36 @@
 协调各模块完成文件检查与移动流程
 """
 
-import json
+import itertools
+import os
 import shutil
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime
-from tqdm import tqdm
 
 from .file_handler import FileHandler
 from .p115_client import P115ClientWrapper
 from .logger import Logger
 from .config_manager import ConfigManager
 from .telegram_notifier import TelegramNotifier
+from .state_store import StateStore
+from .job_registry import JobRegistry, PathBusyError
+from .batch_mover import BatchMover
+from .progress import PassProgress
+from .dir_stats import DirStats
+from .run_report import RunReport
+from .checkpoint import Checkpoint
+
+# 日志中的文件编号（同一文件在一轮处理中的各条日志共用一个编号）
+_file_ids = itertools.count(1)
 
 
 class RapidUploadController:
     """秒传检查与移动控制器"""
     
-    def _parse_interval(self, interval_str: str) -> int:
-        """
-        解析时间间隔字符串
-        
-        :param interval_str: 时间间隔字符串 (如: "5m", "30m", "1h", "6h")
-        :return: 秒数
-        """
-        interval_str = interval_str.strip().lower()
-        
-        # 分钟格式: 5m, 30m, 60m
-        if interval_str.endswith('m'):
-            minutes = int(interval_str[:-1])
-            return minutes * 60
-        
-        # 小时格式: 1h, 6h, 24h
-        if interval_str.endswith('h'):
-            hours = int(interval_str[:-1])
-            return hours * 3600
-        
-        # 默认 30 分钟
-        return 30 * 60
-    
     def __init__(self, config_path: str = "config/config.yaml"):
         """
         初始化控制器
@@ -68,17 +59,69 @@ class RapidUploadController:
         self.telegram = TelegramNotifier(telegram_config)
         
         # 断点续传配置
-        self.checkpoint_config = self.config_manager.get_checkpoint_config()
-        self.checkpoint_file = Path(self.checkpoint_config.get('checkpoint_file', './checkpoint.json'))
-        self.processed_files: set = set()
+        checkpoint_settings = self.config_manager.settings.checkpoint
+        self.checkpoint = Checkpoint(checkpoint_settings.checkpoint_file, checkpoint_settings.compact_threshold)
         
         # 重新检测配置
-        self.recheck_config = self.config_manager.get('recheck', {})
-        self.recheck_file = Path(self.recheck_config.get('recheck_file', './data/recheck.json'))
-        self.delay_move_times = self.recheck_config.get('delay_move_times', 3)
+        self.recheck_file = Path(self.config_manager.settings.recheck.recheck_file)
+        self.state_store = StateStore(self.recheck_file)
+        
+        # 任务登记（监控、定时任务、Bot、GUI 共享，同一文件同一时间只处理一次）
+        self.job_registry = JobRegistry()
+        
+        # 排空标志（收到停止信号后，各处理循环在当前文件结束后退出）
+        self.draining = threading.Event()
+        
+        # 当前线程正在进行的批量放置（每轮处理一个 BatchMover）
+        self._batch = threading.local()
+        
+        # 目录文件数与大小（放置文件时增量更新，供 Bot 状态页直接读取）
+        self.dir_stats = DirStats(
+            self._dir_stats_roots(),
+            self.config_manager.get('file_processing.dir_stats.reconcile_interval', 3600)
+        )
+        
+        # 当前线程正在进行的一轮处理的运行报告
+        self._report = threading.local()
         
-        # 统计信息
-        self.stats = {
+        # 实时监控的运行报告（每天一个，跨天或停止时写入索引）
+        self._watch_lock = threading.Lock()
+        self._watch_report: Optional[RunReport] = None
+        self._watch_report_day = ''
+        
+        # 当前线程正在进行的一轮处理的进度（Bot 触发的任务用于显示进度与取消）
+        self._progress = threading.local()
+        
+        # 配置文件修改后同步到各模块
+        self.config_manager.add_listener(self._on_config_reload)
+        
+        # 统计信息（本轮）
+        self.stats = self._new_stats()
+    
+    def _on_config_reload(self, old_config: Dict[str, Any], new_config: Dict[str, Any]):
+        """
+        配置重新加载后更新各模块（Cookies、日志目录、记录文件路径等需重启生效）
+        
+        :param old_config: 旧配置
+        :param new_config: 新配置
+        """
+        self.file_handler.apply_config(self.config_manager.get_file_processing_config())
+        
+        p115_config = dict(self.config_manager.get_p115_config())
+        p115_config.update(self.config_manager.get_performance_config())
+        self.p115_client.apply_config(p115_config)
+        
+        self.telegram.apply_config(self.config_manager.get('telegram', {}))
+        self.dir_stats.set_roots(self._dir_stats_roots())
+        self.dir_stats.reconcile_interval = self.config_manager.get(
+            'file_processing.dir_stats.reconcile_interval', 3600
+        )
+        self.logger.set_level(self.config_manager.get('logging.level', 'INFO'))
+    
+    @staticmethod
+    def _new_stats() -> Dict[str, int]:
+        """一轮处理的统计计数"""
+        return {
             'total': 0,
             'rapid': 0,
             'non_rapid': 0,
@@ -86,6 +129,15 @@ class RapidUploadController:
             'moved': 0,
         }
     
+    def _dir_stats_roots(self) -> Dict[str, str]:
+        """需要统计的目录"""
+        move_strategy = self.config_manager.settings.move_strategy
+        return {
+            'input': './input',
+            'rapid': move_strategy.rapid_files_dir,
+            'non_rapid': move_strategy.non_rapid_files_dir,
+        }
+    
     def check_login(self) -> bool:
         """检查115登录状态"""
         self.logger.info("检查115登录状态...")
@@ -99,34 +151,32 @@ class RapidUploadController:
         self.logger.error("✗ 115登录失败，请检查cookies配置")
         return False
     
-    def load_checkpoint(self) -> set:
-        """加载断点信息"""
-        if not self.checkpoint_config.get('enabled', True):
-            return set()
+    def load_checkpoint(self) -> int:
+        """
+        加载断点信息
         
-        if self.checkpoint_file.exists():
-            try:
-                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.processed_files = set(data.get('processed_files', []))
-                    self.logger.info(f"加载断点信息: 已处理 {len(self.processed_files)} 个文件")
-                    return self.processed_files
-            except Exception as e:
-                self.logger.warning(f"加载断点信息失败: {e}")
+        :return: 已处理文件数量
+        """
+        if not self.config_manager.settings.checkpoint.enabled:
+            return 0
+        
+        try:
+            processed = self.checkpoint.load()
+            if processed:
+                self.logger.info(f"加载断点信息: 已处理 {processed} 个文件")
+            return processed
+        except Exception as e:
+            self.logger.warning(f"加载断点信息失败: {e}")
         
-        return set()
+        return 0
     
     def save_checkpoint(self):
-        """保存断点信息"""
-        if not self.checkpoint_config.get('enabled', True):
+        """保存断点信息（断点日志落盘，过长时合并为快照）"""
+        if not self.config_manager.settings.checkpoint.enabled:
             return
         
         try:
-            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'processed_files': list(self.processed_files),
-                    'timestamp': datetime.now().isoformat(),
-                }, f, ensure_ascii=False, indent=2)
+            self.checkpoint.sync()
         except Exception as e:
             self.logger.warning(f"保存断点信息失败: {e}")
     
@@ -143,39 +193,44 @@ class RapidUploadController:
         """
         file_path_str = str(file_path.absolute())
         
-        # 检查是否已处理
-        if file_path_str in self.processed_files:
+        # 检查是否已处理（按文件身份，改名后仍能识别，内容变化后重新处理）
+        try:
+            stat = file_path.stat()
+        except OSError:
+            stat = None
+        if stat is not None and self.checkpoint.get(stat):
             return {'skipped': True, 'reason': '已处理'}
         
+        # 检测与放置在同一个 hold 内：停止时已开始的文件可以完成移动，不会检测完却留在原处
+        with self._file_context(file_path), self.job_registry.hold() as admitted:
+            if not admitted:
+                return {'success': False, 'skipped': True, 'reason': '正在停止'}
+            return self._process_file(file_path, file_path_str, stat, target_dir, base_path, move_files)
+    
+    def _is_processed(self, file_path: Path) -> bool:
+        """文件是否已处理过（只读取元数据，不计算哈希）"""
+        try:
+            return self.checkpoint.get(file_path.stat()) is not None
+        except OSError:
+            return False
+    
+    def _process_file(self, file_path: Path, file_path_str: str, stat: Optional[os.stat_result],
+                      target_dir: Optional[Path], base_path: Optional[Path], move_files: bool) -> Dict[str, Any]:
+        """处理单个文件（在文件日志上下文内执行）"""
         try:
             # 获取文件信息
             file_info = self.file_handler.get_file_info(file_path)
-            self.logger.debug(f"处理文件: {file_info['name']} ({file_info['size_human']})")
-            
-            # 计算SHA-1（添加进度提示）
-            file_size_mb = file_info['size'] / (1024 * 1024)
-            if file_size_mb > 100:  # 大于 100MB 显示进度
-                print(f"  ⏳ 计算哈希: {file_info['name']} ({file_info['size_human']})...")
-            
-            self.logger.debug(f"计算SHA-1: {file_info['name']}")
-            filesha1 = self.file_handler.calculate_sha1(file_path)
-            file_info['sha1'] = filesha1
-            
-            # 定义二次验证函数
-            def read_range_bytes(sign_check: str) -> bytes:
-                start, end = map(int, sign_check.split('-'))
-                with open(file_path, 'rb') as f:
-                    f.seek(start)
-                    return f.read(end - start + 1)
-            
-            # 检查秒传状态
-            self.logger.debug(f"检查秒传状态: {file_info['name']}")
-            result = self.p115_client.check_rapid_upload(
-                filename=file_info['name'],
-                filesize=file_info['size'],
-                filesha1=filesha1,
-                read_range_bytes_or_hash=read_range_bytes if file_info['size'] >= 1048576 else None,
-            )
+            self.logger.debug("处理文件: %s (%s)", file_info['name'], file_info['size_human'])
+            
+            # 计算SHA-1并检查秒传状态（与实时监控的检测共用租约，同一文件同一时间只处理一次）
+            check_start = time.monotonic()
+            try:
+                result = self._leased_check(file_path, file_info)
+            except PathBusyError as e:
+                self._report_result(file_path, 'skipped', size=file_info['size'], note=str(e))
+                return {'success': False, 'skipped': True, 'reason': str(e)}
+            latency = time.monotonic() - check_start
+            file_info['sha1'] = result.get('sha1', '')
             
             if not result['success']:
                 # 检查失败
@@ -183,10 +238,14 @@ class RapidUploadController:
                 file_info['status'] = '检查失败'
                 file_info['note'] = result.get('message', '')
                 file_info['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                self.logger.add_failed_file(file_info)
+                self.logger.count_result('failed')
                 self.logger.error(f"✗ {file_info['name']}: {result.get('message', '')}")
+                self._report_result(file_path, 'failed', size=file_info['size'], latency=latency,
+                                    api_status=result.get('status'), note=file_info['note'])
                 return {'success': False, 'error': result.get('message', '')}
             
+            action = ''
+            
             # 记录处理状态
             file_info['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
@@ -199,25 +258,19 @@ class RapidUploadController:
                 # 移动文件
                 if move_files and target_dir:
                     try:
-                        keep_structure = self.config_manager.get('file_processing.move_strategy.create_subdirs', True)
-                        use_copy = self.config_manager.get('file_processing.move_strategy.use_copy', False)
-                        new_path = self.file_handler.move_or_copy_file(
-                            file_path, target_dir,
-                            keep_structure=keep_structure,
-                            base_path=base_path,
-                            use_copy=use_copy
-                        )
+                        mode = self.file_handler.placement_mode('rapid')
+                        new_path = self._place_file(file_path, target_dir, base_path, mode, file_info['sha1'])
                         file_info['target_path'] = str(new_path)
                         self.stats['moved'] += 1
-                        action = "已复制" if use_copy else "已移动"
-                        self.logger.success(f"✓ {file_info['name']}: 可秒传，{action}")
+                        action = mode
+                        self.logger.success(f"✓ {file_info['name']}: 可秒传，{self._describe_placement(mode)}")
                     except Exception as e:
                         file_info['note'] += f" | 移动失败: {str(e)}"
                         self.logger.error(f"✗ {file_info['name']}: 移动失败 - {str(e)}")
                 else:
                     self.logger.success(f"✓ {file_info['name']}: 可秒传")
                 
-                self.logger.add_rapid_file(file_info)
+                self.logger.count_result('rapid')
                 
             else:
                 # 不可秒传
@@ -226,45 +279,293 @@ class RapidUploadController:
                 file_info['note'] = f"状态码: {result['status']}"
                 
                 # 根据配置决定是否移动
-                keep_in_place = self.config_manager.get('file_processing.move_strategy.keep_non_rapid_in_place', True)
-                if not keep_in_place and move_files:
-                    non_rapid_dir = Path(self.config_manager.get('file_processing.move_strategy.non_rapid_files_dir', './non_rapid'))
+                move_strategy = self.config_manager.settings.move_strategy
+                if not move_strategy.keep_non_rapid_in_place and move_files:
+                    non_rapid_dir = Path(move_strategy.non_rapid_files_dir)
                     try:
-                        keep_structure = self.config_manager.get('file_processing.move_strategy.create_subdirs', True)
-                        use_copy = self.config_manager.get('file_processing.move_strategy.use_copy', False)
-                        new_path = self.file_handler.move_or_copy_file(
-                            file_path, non_rapid_dir,
-                            keep_structure=keep_structure,
-                            base_path=base_path,
-                            use_copy=use_copy
-                        )
+                        mode = self.file_handler.placement_mode('non_rapid')
+                        new_path = self._place_file(file_path, non_rapid_dir, base_path, mode, file_info['sha1'])
                         file_info['target_path'] = str(new_path)
-                        action = "已复制" if use_copy else "已移动"
-                        self.logger.info(f"○ {file_info['name']}: 不可秒传，{action}到暂存目录")
+                        action = mode
+                        self.logger.info(f"○ {file_info['name']}: 不可秒传，{self._describe_placement(mode)}到暂存目录")
                     except Exception as e:
                         file_info['note'] += f" | 移动失败: {str(e)}"
                         self.logger.error(f"✗ {file_info['name']}: 移动失败 - {str(e)}")
                 else:
                     self.logger.info(f"○ {file_info['name']}: 不可秒传")
                 
-                self.logger.add_non_rapid_file(file_info)
+                self.logger.count_result('non_rapid')
+            
+            self._report_result(
+                file_path, 'rapid' if result['can_rapid'] else 'non_rapid',
+                size=file_info['size'], sha1=file_info['sha1'], latency=latency, api_status=result['status'],
+                action=action, target=file_info.get('target_path', ''), note=file_info['note']
+            )
             
             # 标记为已处理
-            self.processed_files.add(file_path_str)
+            if stat is not None:
+                self.checkpoint.add(file_path_str, stat, file_info['sha1'],
+                                    persist=self.config_manager.settings.checkpoint.enabled)
             
             return {'success': True, 'can_rapid': result['can_rapid']}
             
         except Exception as e:
             self.stats['failed'] += 1
             self.logger.error(f"✗ {file_path.name}: 处理异常 - {str(e)}")
-            self.logger.add_failed_file({
-                'path': file_path_str,
-                'status': '处理异常',
-                'note': str(e),
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            })
+            self.logger.count_result('failed')
+            self._report_result(file_path, 'failed', note=str(e))
             return {'success': False, 'error': str(e)}
     
+    def _hash_and_check(self, file_path: Path, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        计算SHA-1并查询秒传状态
+        
+        :param file_path: 文件路径
+        :param file_info: 文件信息
+        :return: 查询结果（附带 sha1）
+        """
+        # 计算SHA-1（添加进度提示）
+        file_size_mb = file_info['size'] / (1024 * 1024)
+        if file_size_mb > 100:  # 大于 100MB 显示进度
+            print(f"  ⏳ 计算哈希: {file_info['name']} ({file_info['size_human']})...")
+        
+        self.logger.debug("计算SHA-1: %s", file_info['name'])
+        hash_start = time.monotonic()
+        filesha1 = self.file_handler.calculate_sha1(file_path)
+        hash_ms = round((time.monotonic() - hash_start) * 1000)
+        self.logger.debug("SHA-1 完成: %s", file_info['name'],
+                          stage='hash', duration_ms=hash_ms, bytes=file_info['size'])
+        
+        # 定义二次验证函数
+        def read_range_bytes(sign_check: str) -> bytes:
+            start, end = map(int, sign_check.split('-'))
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                return f.read(end - start + 1)
+        
+        # 检查秒传状态
+        check_start = time.monotonic()
+        result = self.p115_client.check_rapid_upload(
+            filename=file_info['name'],
+            filesize=file_info['size'],
+            filesha1=filesha1,
+            read_range_bytes_or_hash=read_range_bytes if file_info['size'] >= 1048576 else None,
+        )
+        self.logger.debug("秒传查询完成: %s", file_info['name'], stage='check',
+                          duration_ms=round((time.monotonic() - check_start) * 1000),
+                          bytes=file_info['size'], status=result.get('status'))
+        result['sha1'] = filesha1
+        return result
+    
+    def _place_file(self, file_path: Path, target_dir: Path, base_path: Optional[Path],
+                    mode: str, expected_sha1: Optional[str] = None) -> Path:
+        """
+        在租约保护下放置文件（移动期间不会有其他任务对其计算哈希）
+        
+        :param file_path: 文件路径
+        :param target_dir: 目标目录
+        :param base_path: 基础路径（用于保持目录结构）
+        :param mode: 放置方式（move / copy / hardlink / reflink / symlink）
+        :param expected_sha1: 检测时的 SHA-1（用于复制校验）
+        :return: 目标文件路径
+        """
+        keep_structure = self.config_manager.settings.move_strategy.create_subdirs
+        mover = getattr(self._batch, 'mover', None)
+        place = mover.place if mover else self.file_handler.place_file
+        new_path = self.job_registry.run(
+            file_path, 'move',
+            lambda: place(
+                file_path, target_dir,
+                keep_structure=keep_structure,
+                base_path=base_path,
+                mode=mode,
+                expected_sha1=expected_sha1
+            )
+        )
+        
+        try:
+            size = os.stat(new_path).st_size
+        except OSError:
+            size = 0
+        self.dir_stats.record_placement(file_path, new_path, size, moved=(mode == 'move'))
+        return new_path
+    
+    @contextmanager
+    def _batch_pass(self):
+        """
+        一轮处理内复用同一个 BatchMover，结束时统一清理空文件夹并输出放置速度
+        """
+        if getattr(self._batch, 'mover', None) is not None:
+            # 嵌套调用时沿用外层批次
+            yield
+            return
+        
+        mover = BatchMover(self.file_handler)
+        self._batch.mover = mover
+        try:
+            yield
+        finally:
+            self._batch.mover = None
+            result = mover.finish()
+            if result['placed']:
+                message = f"📦 本轮放置 {result['placed']} 个文件，{result['rate']:.1f} 个/秒"
+                if result['fallbacks']:
+                    message += f"（{result['fallbacks']} 个无法硬链接，已改用复制）"
+                self.logger.info(message)
+    
+    @contextmanager
+    def _run_report(self, kind: str):
+        """
+        一轮处理写入一个运行报告，结束时向报告索引追加汇总
+        
+        :param kind: 处理类型（manual / scan_input / recheck）
+        """
+        if self.logger.context_value('job') is not None:
+            # 嵌套调用时沿用外层报告
+            yield
+            return
+        
+        report = self._new_report(kind)
+        if report is None:
+            # 不生成报告时日志仍带上本轮编号
+            with self.logger.context(job=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{kind}"):
+                yield
+            return
+        
+        self._report.current = report
+        try:
+            with self.logger.context(job=report.run_id):
+                yield
+        finally:
+            self._report.current = None
+            if report.close():
+                self.logger.info(f"📝 运行报告: {report.path}")
+    
+    def _new_report(self, kind: str, flush_every: int = 100) -> Optional[RunReport]:
+        """
+        按 logging.reports 配置创建运行报告
+        
+        :param kind: 处理类型
+        :param flush_every: 缓冲多少条后写盘
+        :return: 运行报告，未启用时为 None
+        """
+        config = self.config_manager.get('logging.reports', {}) or {}
+        if not config.get('enabled', True):
+            return None
+        report_dir = config.get('report_dir') or Path(self.config_manager.get('logging.log_dir', './logs')) / 'reports'
+        return RunReport(report_dir, kind, config.get('format', 'jsonl'), config.get('flush_interval', 5),
+                         flush_every=flush_every)
+    
+    def _current_watch_report(self) -> Optional[RunReport]:
+        """当天的实时监控报告（跨天时结束前一天的报告）"""
+        today = datetime.now().strftime('%Y%m%d')
+        with self._watch_lock:
+            if self._watch_report_day != today:
+                self._close_watch_report()
+                # 监控结果逐条写盘（到达频率低，缓冲可能长时间不满）
+                self._watch_report = self._new_report('watch', flush_every=1)
+                self._watch_report_day = today
+            return self._watch_report
+    
+    def _close_watch_report(self):
+        """结束实时监控报告并写入索引（需持有 _watch_lock）"""
+        report, self._watch_report, self._watch_report_day = self._watch_report, None, ''
+        if report is not None and report.close():
+            self.logger.info(f"📝 运行报告: {report.path}")
+    
+    def close_watch_report(self):
+        """结束实时监控报告（调度器停止时调用）"""
+        with self._watch_lock:
+            self._close_watch_report()
+    
+    def _report_result(self, file_path: Path, status: str, api_status: Any = None, **fields):
+        """
+        向当前运行报告写入一个文件的结果，JSON 日志中同时记录一条 result 事件
+        
+        :param file_path: 文件路径
+        :param status: 结果（rapid / non_rapid / failed / skipped）
+        :param api_status: 115 秒传接口返回的状态码
+        :param fields: size / sha1 / latency / action / target / note
+        """
+        report = getattr(self._report, 'current', None)
+        if report is not None:
+            report.add(str(file_path.absolute()), status=status, **fields)
+        
+        latency = fields.get('latency')
+        self.logger.event(
+            'result', "%s: %s", file_path.name, status,
+            status=status, api_status=api_status, bytes=fields.get('size', 0),
+            duration_ms=round(latency * 1000) if latency is not None else None,
+            action=fields.get('action') or None
+        )
+    
+    def _file_context(self, file_path: Path):
+        """
+        为一个文件的日志分配文件编号（已在文件上下文中时沿用）
+        
+        :param file_path: 文件路径
+        """
+        if self.logger.context_value('file') is not None:
+            return nullcontext()
+        return self.logger.context(file=f"{next(_file_ids):x}", name=file_path.name)
+    
+    @contextmanager
+    def track_progress(self, progress: PassProgress):
+        """
+        在当前线程内跟踪处理进度，期间各处理循环更新进度并响应取消
+        
+        :param progress: 进度对象
+        """
+        self._progress.current = progress
+        try:
+            yield progress
+        finally:
+            self._progress.current = None
+            progress.finish()
+    
+    def _track_files(self, files: List[Path]) -> Iterator[Path]:
+        """
+        逐个返回文件，每处理完一个更新当前进度
+        每个文件的检测与后续移动在同一个 hold 内（停止时已开始的文件处理完再退出；
+        排空开始后不再登记，循环随即因 _stop_reason 结束）
+        """
+        progress = getattr(self._progress, 'current', None)
+        if progress is None:
+            for file_path in files:
+                with self._file_context(file_path), self.job_registry.hold():
+                    yield file_path
+            return
+        
+        progress.start(len(files))
+        for file_path in files:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                size = 0
+            with self._file_context(file_path), self.job_registry.hold():
+                yield file_path
+            progress.advance(size)
+    
+    def _stop_reason(self) -> Optional[str]:
+        """处理循环是否需要提前结束（收到停止信号或任务被取消）"""
+        if self.draining.is_set():
+            return "收到停止信号"
+        progress = getattr(self._progress, 'current', None)
+        if progress is not None and progress.cancelled:
+            return "任务已取消"
+        return None
+    
+    @staticmethod
+    def _describe_placement(mode: str) -> str:
+        """放置方式的提示文字"""
+        return {
+            'move': '已移动',
+            'copy': '已复制',
+            'hardlink': '已硬链接',
+            'reflink': '已克隆',
+            'symlink': '已软链接',
+        }.get(mode, '已放置')
+    
     def process_directory(self, input_path: str | Path, target_path: Optional[str | Path] = None,
                          recursive: bool = True, move_files: bool = True) -> Dict[str, Any]:
         """
@@ -289,31 +590,42 @@ class RapidUploadController:
         if target_path:
             target_dir = Path(target_path)
         else:
-            target_dir = Path(self.config_manager.get('file_processing.move_strategy.rapid_files_dir', './rapid_files'))
+            target_dir = Path(self.config_manager.settings.move_strategy.rapid_files_dir)
         
         # 扫描文件
         self.logger.info(f"扫描文件: {input_path}")
         files = self.file_handler.scan_files(input_path, recursive=recursive)
         
         # 过滤已处理的文件
-        files = [f for f in files if str(f.absolute()) not in self.processed_files]
+        files = [f for f in files if not self._is_processed(f)]
         
         if not files:
             self.logger.warning("没有找到需要处理的文件")
             return {'success': True, 'total': 0}
         
         self.logger.info(f"找到 {len(files)} 个文件待处理")
+        
+        # 每轮重新计数（常驻运行时不累计）
+        self.stats = self._new_stats()
         self.stats['total'] = len(files)
+        self.logger.begin_pass()
         
         # 确定基础路径（用于保持目录结构）
         base_path = input_path if input_path.is_dir() else input_path.parent
         
         # 处理文件
         start_time = datetime.now()
-        auto_save_interval = self.checkpoint_config.get('auto_save_interval', 10)
+        auto_save_interval = self.config_manager.settings.checkpoint.auto_save_interval
+        
+        from tqdm import tqdm
         
-        with tqdm(total=len(files), desc="处理进度", unit="文件") as pbar:
-            for idx, file_path in enumerate(files, 1):
+        with tqdm(total=len(files), desc="处理进度", unit="文件") as pbar, \
+                self._batch_pass(), self._run_report('manual'):
+            for idx, file_path in enumerate(self._track_files(files), 1):
+                reason = self._stop_reason()
+                if reason:
+                    self.logger.warning(f"{reason}，中断本轮处理")
+                    break
                 self.process_file(file_path, target_dir, base_path, move_files)
                 pbar.update(1)
                 
@@ -361,30 +673,20 @@ class RapidUploadController:
         """
         try:
             # 获取配置
-            recheck_config = self.config_manager.get('recheck', {})
-            if not recheck_config.get('enabled', True):
+            settings = self.config_manager.settings
+            if not settings.recheck.enabled:
                 return {
                     'success': False,
                     'error': '重新检测功能未启用，请在 config.yaml 中启用'
                 }
             
-            recheck_file = Path(recheck_config.get('recheck_file', './recheck.json'))
-            max_recheck_times = recheck_config.get('max_recheck_times', 10)
+            max_recheck_times = settings.recheck.max_recheck_times
             
             # 使用调度器的间隔时间作为重检间隔
-            scheduler_config = self.config_manager.get('scheduler', {})
-            cron_interval_str = scheduler_config.get('cron', {}).get('interval', '6h')
-            file_interval = self._parse_interval(cron_interval_str)
-            
-            # 加载重新检测记录
-            recheck_data = {}
-            if recheck_file.exists():
-                with open(recheck_file, 'r', encoding='utf-8') as f:
-                    recheck_data = json.load(f)
+            file_interval = settings.scheduler.cron_interval
             
             # 获取 non_rapid 目录
-            move_strategy = self.config_manager.get('file_processing.move_strategy', {})
-            non_rapid_dir = Path(move_strategy.get('non_rapid_files_dir', './non_rapid'))
+            non_rapid_dir = Path(settings.move_strategy.non_rapid_files_dir)
             
             if not non_rapid_dir.exists():
                 return {
@@ -417,18 +719,26 @@ class RapidUploadController:
             }
             
             # 处理文件
-            rapid_dir = Path(move_strategy.get('rapid_files_dir', './rapid'))
+            rapid_dir = Path(settings.move_strategy.rapid_files_dir)
             rapid_dir.mkdir(parents=True, exist_ok=True)
             
             current_time = datetime.now().timestamp()
             
-            with tqdm(total=len(files), desc="重新检测进度", unit="文件") as pbar:
-                for file_path in files:
+            from tqdm import tqdm
+            
+            with tqdm(total=len(files), desc="重新检测进度", unit="文件") as pbar, \
+                    self._batch_pass(), self._run_report('recheck'):
+                for file_path in self._track_files(files):
+                    reason = self._stop_reason()
+                    if reason:
+                        self.logger.warning(f"{reason}，中断重新检测")
+                        break
+                    
                     file_key = str(file_path.absolute())
                     
                     # 检查重新检测记录
-                    if file_key in recheck_data:
-                        record = recheck_data[file_key]
+                    record = self.state_store.get(file_key)
+                    if record is not None:
                         last_check_time = record.get('last_check_time', 0)
                         check_count = record.get('check_count', 0)
                         
@@ -447,62 +757,54 @@ class RapidUploadController:
                             pbar.update(1)
                             continue
                     
-                    # 重新检测
-                    result = self.check_and_record(file_path)
+                    # 重新检测（记录检测次数与结果）
+                    check_start = time.monotonic()
+                    result = self.check_and_record(file_path, location='non_rapid')
+                    latency = time.monotonic() - check_start
                     
                     if not result.get('success'):
                         stats['skipped'] += 1
+                        self._report_result(file_path, 'skipped' if result.get('skipped') else 'failed',
+                                            latency=latency, api_status=result.get('api_status'),
+                                            note=result.get('error', ''))
                         pbar.update(1)
                         continue
                     
-                    # 更新记录
-                    if file_key not in recheck_data:
-                        recheck_data[file_key] = {
-                            'first_check_time': current_time,
-                            'check_count': 0,
-                            'location': 'non_rapid'
-                        }
-                    
-                    recheck_data[file_key]['last_check_time'] = current_time
-                    recheck_data[file_key]['check_count'] = recheck_data[file_key].get('check_count', 0) + 1
-                    recheck_data[file_key]['last_status'] = 'rapid' if result['can_rapid'] else 'non_rapid'
+                    report_fields = {'size': result.get('size', 0), 'sha1': result.get('sha1', ''),
+                                     'latency': latency, 'api_status': result.get('api_status')}
                     
                     if result['can_rapid']:
                         # 变成可秒传，移动到 rapid 目录
                         try:
-                            keep_structure = self.config_manager.get('file_processing.move_strategy.create_subdirs', True)
-                            use_copy = self.config_manager.get('file_processing.move_strategy.use_copy', False)
+                            mode = self.file_handler.placement_mode('rapid')
                             
-                            # 使用统一的移动/复制方法
-                            new_path = self.file_handler.move_or_copy_file(
-                                file_path, rapid_dir,
-                                keep_structure=keep_structure,
-                                base_path=non_rapid_dir,
-                                use_copy=use_copy
-                            )
+                            # 使用统一的放置方法
+                            new_path = self._place_file(file_path, rapid_dir, non_rapid_dir, mode, result.get('sha1'))
                             
-                            action = "已复制" if use_copy else "已移动"
+                            action = self._describe_placement(mode)
                             self.logger.success(f"✓ {file_path.name}: 现在可秒传！{action}到 rapid/")
                             stats['now_rapid'] += 1
+                            self._report_result(file_path, 'rapid', action=mode, target=new_path, **report_fields)
                             
                             # 从记录中删除（已经可秒传了）
-                            del recheck_data[file_key]
+                            self.state_store.pop(file_key)
                             
                             # 发送 Telegram 通知
-                            if self.telegram.config.get('notify_on_rapid', False):
+                            if self.telegram.notify_on_rapid:
                                 self.telegram.notify_rapid_file(file_path.name)
                                 
                         except Exception as e:
                             self.logger.error(f"✗ {file_path.name}: 移动失败: {e}")
+                            self._report_result(file_path, 'rapid', note=f"移动失败: {e}", **report_fields)
                     else:
                         self.logger.info(f"○ {file_path.name}: 仍不可秒传")
                         stats['still_non_rapid'] += 1
+                        self._report_result(file_path, 'non_rapid', **report_fields)
                     
                     pbar.update(1)
             
             # 保存重新检测记录
-            with open(recheck_file, 'w', encoding='utf-8') as f:
-                json.dump(recheck_data, f, ensure_ascii=False, indent=2)
+            self.state_store.flush()
             
             # 输出统计
             print("\n" + "=" * 60)
@@ -531,80 +833,119 @@ class RapidUploadController:
                 'error': str(e)
             }
 
-    def check_and_record(self, file_path: Path) -> Dict[str, Any]:
+    def check_and_record(self, file_path: Path, location: str = 'input') -> Dict[str, Any]:
         """
         检查文件秒传状态并记录（不移动文件）
         用于实时监控和延迟移动策略
+        同一文件的并发检测会合并为一次，正在移动的文件不会被检测
         
         :param file_path: 文件路径
+        :param location: 新建记录时的文件位置（input 或 non_rapid）
         :return: 检查结果
         """
+        with self._file_context(file_path), self.job_registry.hold() as admitted:
+            if not admitted:
+                return {'success': False, 'skipped': True, 'error': '正在停止，不再接受新任务'}
+            try:
+                return self._check_and_record(file_path, location)
+            except PathBusyError as e:
+                return {'success': False, 'skipped': True, 'error': str(e)}
+            except Exception as e:
+                self.logger.error(f"检查文件失败: {file_path.name} - {e}")
+                return {'success': False, 'error': str(e)}
+    
+    def _leased_check(self, file_path: Path, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        在 check 租约内计算SHA-1并查询秒传状态
+        手动处理与实时监控使用同一租约，同时检测同一文件时后到者直接复用结果；
+        正在移动的文件不会被检测
+        
+        :param file_path: 文件路径
+        :param file_info: 文件信息
+        :return: 查询结果（多个调用方共享同一对象）
+        """
+        return self.job_registry.run(
+            file_path, 'check',
+            lambda: self._hash_and_check(file_path, file_info),
+            conflicts=('move',)
+        )
+    
+    def check_new_file(self, file_path: Path) -> Dict[str, Any]:
+        """
+        实时监控到的新文件：检测并记录（不移动），结果写入当天的 watch 运行报告，
+        JSON 日志中带 job 编号并记录 result 事件
+        
+        :param file_path: 文件路径
+        :return: 检查结果（同 check_and_record）
+        """
+        report = self._current_watch_report()
+        job = report.run_id if report is not None else f"{datetime.now().strftime('%Y%m%d')}_watch"
+        self._report.current = report
         try:
-            # 获取文件信息
-            file_info = self.file_handler.get_file_info(file_path)
-            
-            # 计算SHA-1（添加进度提示）
-            file_size_mb = file_info['size'] / (1024 * 1024)
-            if file_size_mb > 100:  # 大于 100MB 显示进度
-                print(f"  ⏳ 计算哈希: {file_info['name']} ({file_info['size_human']})...")
-            
-            filesha1 = self.file_handler.calculate_sha1(file_path)
-            
-            # 定义二次验证函数
-            def read_range_bytes(sign_check: str) -> bytes:
-                start, end = map(int, sign_check.split('-'))
-                with open(file_path, 'rb') as f:
-                    f.seek(start)
-                    return f.read(end - start + 1)
-            
-            # 检查秒传状态
-            result = self.p115_client.check_rapid_upload(
-                filename=file_info['name'],
-                filesize=file_info['size'],
-                filesha1=filesha1,
-                read_range_bytes_or_hash=read_range_bytes if file_info['size'] >= 1048576 else None,
-            )
-            
-            if not result['success']:
-                return {'success': False, 'error': result.get('message', '')}
-            
-            # 加载重新检测记录
-            recheck_data = {}
-            if self.recheck_file.exists():
-                with open(self.recheck_file, 'r', encoding='utf-8') as f:
-                    recheck_data = json.load(f)
-            
-            # 记录检测结果
-            file_key = str(file_path.absolute())
-            current_time = datetime.now().timestamp()
-            
-            if file_key not in recheck_data:
-                recheck_data[file_key] = {
-                    'first_check_time': current_time,
-                    'check_count': 0,
-                    'location': 'input'  # 文件位置：input 或 non_rapid
-                }
-            
-            recheck_data[file_key]['last_check_time'] = current_time
-            recheck_data[file_key]['check_count'] = recheck_data[file_key].get('check_count', 0) + 1
-            recheck_data[file_key]['last_status'] = 'rapid' if result['can_rapid'] else 'non_rapid'
-            recheck_data[file_key]['sha1'] = filesha1
-            recheck_data[file_key]['size'] = file_info['size']
-            
-            # 保存记录
-            self.recheck_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.recheck_file, 'w', encoding='utf-8') as f:
-                json.dump(recheck_data, f, ensure_ascii=False, indent=2)
-            
-            return {
-                'success': True,
-                'can_rapid': result['can_rapid'],
-                'check_count': recheck_data[file_key]['check_count']
-            }
-            
-        except Exception as e:
-            self.logger.error(f"检查文件失败: {file_path.name} - {e}")
-            return {'success': False, 'error': str(e)}
+            with self.logger.context(job=job), self._file_context(file_path):
+                check_start = time.monotonic()
+                result = self.check_and_record(file_path)
+                latency = time.monotonic() - check_start
+                if result.get('success'):
+                    status = 'rapid' if result['can_rapid'] else 'non_rapid'
+                else:
+                    status = 'skipped' if result.get('skipped') else 'failed'
+                self._report_result(
+                    file_path, status, api_status=result.get('api_status'),
+                    size=result.get('size', 0), sha1=result.get('sha1', ''), latency=latency,
+                    note=result.get('error', '')
+                )
+        finally:
+            self._report.current = None
+        return result
+    
+    def _check_and_record(self, file_path: Path, location: str) -> Dict[str, Any]:
+        """检查文件秒传状态并写入状态记录"""
+        # 获取文件信息
+        file_info = self.file_handler.get_file_info(file_path)
+        
+        result = self._leased_check(file_path, file_info)
+        
+        if not result['success']:
+            return {'success': False, 'error': result.get('message', ''), 'api_status': result.get('status')}
+        
+        # 记录检测结果（合并的多个调用方拿到同一个结果对象，只记录一次）
+        file_key = str(file_path.absolute())
+        current_time = datetime.now().timestamp()
+        
+        with self.state_store.lock:
+            check_count = result.get('check_count')
+            if check_count is None:
+                record = self.state_store.get(file_key)
+                if record is None:
+                    record = {
+                        'first_check_time': current_time,
+                        'check_count': 0,
+                        'location': location  # 文件位置：input 或 non_rapid
+                    }
+                    # 首次检测到的文件计入目录统计（/status 无需等待下次完整遍历）
+                    self.dir_stats.record_arrival(file_path, file_info['size'], file_info['ctime_ts'])
+                
+                record['last_check_time'] = current_time
+                record['check_count'] = record.get('check_count', 0) + 1
+                record['last_status'] = 'rapid' if result['can_rapid'] else 'non_rapid'
+                record['sha1'] = result['sha1']
+                record['size'] = file_info['size']
+                record['mtime'] = file_info['mtime_ts']
+                self.state_store.put(file_key, record)
+                check_count = result['check_count'] = record['check_count']
+        
+        # 保存记录
+        self.state_store.flush()
+        
+        return {
+            'success': True,
+            'can_rapid': result['can_rapid'],
+            'check_count': check_count,
+            'sha1': result['sha1'],
+            'size': file_info['size'],
+            'api_status': result.get('status')
+        }
     
     def process_input_with_delay(self) -> Dict[str, Any]:
         """
@@ -623,12 +964,6 @@ class RapidUploadController:
             if not self.check_login():
                 return {'success': False, 'error': '115登录失败'}
             
-            # 加载重新检测记录
-            recheck_data = {}
-            if self.recheck_file.exists():
-                with open(self.recheck_file, 'r', encoding='utf-8') as f:
-                    recheck_data = json.load(f)
-            
             # 扫描 input 目录中的所有文件
             files = self.file_handler.scan_files(input_path, recursive=True)
             
@@ -648,109 +983,124 @@ class RapidUploadController:
             }
             
             # 目标目录
-            move_strategy = self.config_manager.get('file_processing.move_strategy', {})
-            rapid_dir = Path(move_strategy.get('rapid_files_dir', './rapid'))
-            non_rapid_dir = Path(move_strategy.get('non_rapid_files_dir', './non_rapid'))
+            settings = self.config_manager.settings
+            delay_move_times = settings.recheck.delay_move_times
+            rapid_dir = Path(settings.move_strategy.rapid_files_dir)
+            non_rapid_dir = Path(settings.move_strategy.non_rapid_files_dir)
             rapid_dir.mkdir(parents=True, exist_ok=True)
             non_rapid_dir.mkdir(parents=True, exist_ok=True)
             
-            for file_path in files:
-                file_key = str(file_path.absolute())
-                
-                # 检查是否已处理（复制模式下的可秒传文件）
-                if file_key in recheck_data:
-                    record = recheck_data[file_key]
-                    if record.get('processed') and record.get('last_status') == 'rapid':
-                        # 已处理的可秒传文件，跳过
+            with self._batch_pass(), self._run_report('scan_input'):
+                for file_path in self._track_files(files):
+                    reason = self._stop_reason()
+                    if reason:
+                        self.logger.warning(f"{reason}，中断 input 目录处理")
+                        break
+                    
+                    file_key = str(file_path.absolute())
+                    
+                    # 检查是否已处理（复制模式下的可秒传文件）
+                    record = self.state_store.get(file_key)
+                    if record is not None:
+                        if record.get('processed') and record.get('last_status') == 'rapid':
+                            # 已处理的可秒传文件，跳过
+                            continue
+                    
+                    # 检查文件状态
+                    check_start = time.monotonic()
+                    result = self.check_and_record(file_path)
+                    latency = time.monotonic() - check_start
+                    
+                    if not result.get('success'):
+                        self._report_result(file_path, 'skipped' if result.get('skipped') else 'failed',
+                                            latency=latency, api_status=result.get('api_status'),
+                                            note=result.get('error', ''))
                         continue
-                
-                # 检查文件状态
-                result = self.check_and_record(file_path)
-                
-                if not result.get('success'):
-                    continue
-                
-                check_count = result.get('check_count', 0)
-                can_rapid = result.get('can_rapid', False)
-                use_copy = self.config_manager.get('file_processing.move_strategy.use_copy', False)
-                
-                if can_rapid:
-                    # 可秒传：移动或复制到 rapid/
-                    try:
-                        keep_structure = self.config_manager.get('file_processing.move_strategy.create_subdirs', True)
-                        new_path = self.file_handler.move_or_copy_file(
-                            file_path, rapid_dir,
-                            keep_structure=keep_structure,
-                            base_path=input_path,
-                            use_copy=use_copy
-                        )
-                        action = "已复制" if use_copy else "已移动"
-                        self.logger.success(f"✓ {file_path.name}: 可秒传，{action}到 rapid/")
-                        stats['rapid_moved'] += 1
-                        
-                        # 处理记录
-                        if use_copy:
-                            # 复制模式：标记为已处理，但保留记录（避免重复检测）
-                            if file_key not in recheck_data:
-                                recheck_data[file_key] = {}
-                            recheck_data[file_key]['processed'] = True
-                            recheck_data[file_key]['last_status'] = 'rapid'
-                            recheck_data[file_key]['processed_time'] = datetime.now().timestamp()
-                            recheck_data[file_key]['target_path'] = str(new_path)
-                        else:
-                            # 移动模式：删除记录（文件已不在 input 目录）
-                            if file_key in recheck_data:
-                                del recheck_data[file_key]
-                        
-                        # 发送 Telegram 通知
-                        if self.telegram.config.get('notify_on_rapid', False):
-                            self.telegram.notify_rapid_file(file_path.name)
+                    
+                    report_fields = {'size': result.get('size', 0), 'sha1': result.get('sha1', ''),
+                                     'latency': latency, 'api_status': result.get('api_status')}
+                    
+                    check_count = result.get('check_count', 0)
+                    can_rapid = result.get('can_rapid', False)
+                    # 除移动外的放置方式都会把源文件留在 input（按复制模式处理记录）
+                    mode = self.file_handler.placement_mode('rapid')
+                    use_copy = mode != 'move'
+                    
+                    if can_rapid:
+                        # 可秒传：移动或复制到 rapid/
+                        try:
+                            new_path = self._place_file(file_path, rapid_dir, input_path, mode, result.get('sha1'))
+                            action = self._describe_placement(mode)
+                            self.logger.success(f"✓ {file_path.name}: 可秒传，{action}到 rapid/")
+                            stats['rapid_moved'] += 1
+                            self._report_result(file_path, 'rapid', action=mode, target=new_path, **report_fields)
                             
-                    except Exception as e:
-                        self.logger.error(f"✗ {file_path.name}: 移动失败 - {e}")
-                        
-                else:
-                    # 不可秒传：检查是否达到延迟移动次数
-                    if check_count >= self.delay_move_times:
-                        if use_copy:
-                            # 复制模式：不移动文件，只记录状态，继续重检
-                            self.logger.info(f"○ {file_path.name}: 检测 {check_count} 次仍不可秒传（保留在 input，继续重检）")
-                            # 重置检测次数，继续重检
-                            if file_key in recheck_data:
-                                recheck_data[file_key]['check_count'] = 0
-                                recheck_data[file_key]['last_recheck_time'] = datetime.now().timestamp()
-                        else:
-                            # 移动模式：移动到 non_rapid/
-                            try:
-                                keep_structure = self.config_manager.get('file_processing.move_strategy.create_subdirs', True)
-                                new_path = self.file_handler.move_or_copy_file(
-                                    file_path, non_rapid_dir,
-                                    keep_structure=keep_structure,
-                                    base_path=input_path,
-                                    use_copy=False
+                            # 处理记录
+                            if use_copy:
+                                # 复制模式：标记为已处理，但保留记录（避免重复检测）
+                                self.state_store.update(
+                                    file_key,
+                                    processed=True,
+                                    last_status='rapid',
+                                    processed_time=datetime.now().timestamp(),
+                                    target_path=str(new_path)
                                 )
-                                self.logger.info(f"○ {file_path.name}: 检测 {check_count} 次仍不可秒传，已移动到 non_rapid/")
-                                stats['non_rapid_moved'] += 1
+                            else:
+                                # 移动模式：删除记录（文件已不在 input 目录）
+                                self.state_store.pop(file_key)
+                            
+                            # 发送 Telegram 通知
+                            if self.telegram.notify_on_rapid:
+                                self.telegram.notify_rapid_file(file_path.name)
                                 
-                                # 更新文件路径到 non_rapid
-                                if file_key in recheck_data:
-                                    new_file_key = str(new_path.absolute())
-                                    recheck_data[new_file_key] = recheck_data[file_key]
-                                    recheck_data[new_file_key]['location'] = 'non_rapid'
-                                    recheck_data[new_file_key]['check_count'] = 0  # 重置计数
-                                    del recheck_data[file_key]
-                                    
-                            except Exception as e:
-                                self.logger.error(f"✗ {file_path.name}: 移动失败 - {e}")
+                        except Exception as e:
+                            self.logger.error(f"✗ {file_path.name}: 移动失败 - {e}")
+                            self._report_result(file_path, 'rapid', note=f"移动失败: {e}", **report_fields)
+                            
                     else:
-                        # 未达到次数，继续等待
-                        remaining = self.delay_move_times - check_count
-                        self.logger.info(f"⏳ {file_path.name}: 不可秒传（{check_count}/{self.delay_move_times}），还需 {remaining} 次检测")
-                        stats['pending'] += 1
-            
+                        # 不可秒传：检查是否达到延迟移动次数
+                        if check_count >= delay_move_times:
+                            if use_copy:
+                                # 复制模式：不移动文件，只记录状态，继续重检
+                                self.logger.info(f"○ {file_path.name}: 检测 {check_count} 次仍不可秒传（保留在 input，继续重检）")
+                                self._report_result(file_path, 'non_rapid', note='保留在 input', **report_fields)
+                                # 重置检测次数，继续重检
+                                self.state_store.update(
+                                    file_key,
+                                    check_count=0,
+                                    last_recheck_time=datetime.now().timestamp()
+                                )
+                            else:
+                                # 移动模式：移动到 non_rapid/
+                                try:
+                                    new_path = self._place_file(file_path, non_rapid_dir, input_path, 'move',
+                                                                expected_sha1=result.get('sha1'))
+                                    self.logger.info(f"○ {file_path.name}: 检测 {check_count} 次仍不可秒传，已移动到 non_rapid/")
+                                    stats['non_rapid_moved'] += 1
+                                    self._report_result(file_path, 'non_rapid', action='move', target=new_path,
+                                                        **report_fields)
+                                    
+                                    # 更新文件路径到 non_rapid
+                                    self.state_store.rename(
+                                        file_key, str(new_path.absolute()),
+                                        location='non_rapid',
+                                        check_count=0  # 重置计数
+                                    )
+                                        
+                                except Exception as e:
+                                    self.logger.error(f"✗ {file_path.name}: 移动失败 - {e}")
+                                    self._report_result(file_path, 'non_rapid', note=f"移动失败: {e}",
+                                                        **report_fields)
+                        else:
+                            # 未达到次数，继续等待
+                            remaining = delay_move_times - check_count
+                            self.logger.info(f"⏳ {file_path.name}: 不可秒传（{check_count}/{delay_move_times}），还需 {remaining} 次检测")
+                            stats['pending'] += 1
+                            self._report_result(file_path, 'non_rapid', note=f"待重检 {check_count}/{delay_move_times}",
+                                                **report_fields)
+                
             # 保存更新后的记录
-            with open(self.recheck_file, 'w', encoding='utf-8') as f:
-                json.dump(recheck_data, f, ensure_ascii=False, indent=2)
+            self.state_store.flush()
             
             return {
                 'success': True,
@@ -761,6 +1111,28 @@ class RapidUploadController:
             self.logger.error(f"处理 input 目录失败: {e}")
             return {'success': False, 'error': str(e)}
 
+    def begin_drain(self):
+        """进入排空模式：不再开始新文件，正在进行的检测继续完成"""
+        self.draining.set()
+        self.job_registry.drain()
+    
+    def finish_drain(self, timeout: float) -> bool:
+        """
+        等待正在进行的检测完成并保存状态
+        超过期限后中断哈希计算，未完成的文件在下次启动时重新检测
+        
+        :param timeout: 最长等待时间（秒）
+        :return: 是否在期限内全部完成
+        """
+        finished = self.job_registry.wait_idle(timeout)
+        if not finished:
+            self.file_handler.cancel_event.set()
+            self.job_registry.wait_idle(2)
+        
+        self.state_store.flush()
+        self.close_watch_report()
+        return finished
+    
     def clean_processed_records(self) -> Dict[str, Any]:
         """
         清理已处理文件的记录
@@ -769,46 +1141,31 @@ class RapidUploadController:
         :return: 清理结果
         """
         try:
-            recheck_file = Path(self.recheck_file)
-            
-            if not recheck_file.exists():
+            if not self.recheck_file.exists():
                 return {
                     'success': True,
                     'cleaned': 0,
                     'message': '记录文件不存在'
                 }
             
-            # 读取记录
-            with open(recheck_file, 'r', encoding='utf-8') as f:
-                recheck_data = json.load(f)
-            
-            # 统计
-            total_before = len(recheck_data)
-            cleaned_count = 0
-            
             # 清理已处理的记录
-            keys_to_remove = []
-            for file_key, record in recheck_data.items():
-                if record.get('processed'):
-                    keys_to_remove.append(file_key)
-                    cleaned_count += 1
-            
-            for key in keys_to_remove:
-                del recheck_data[key]
+            with self.state_store.lock:
+                total_before = len(self.state_store)
+                cleaned_count = self.state_store.remove_where(lambda record: record.get('processed'))
+                total_after = len(self.state_store)
             
             # 保存更新后的记录
-            with open(recheck_file, 'w', encoding='utf-8') as f:
-                json.dump(recheck_data, f, ensure_ascii=False, indent=2)
+            self.state_store.flush()
             
             print(f"清理前记录数: {total_before}")
-            print(f"清理后记录数: {len(recheck_data)}")
+            print(f"清理后记录数: {total_after}")
             print(f"已清理: {cleaned_count} 条")
             
             return {
                 'success': True,
                 'cleaned': cleaned_count,
                 'total_before': total_before,
-                'total_after': len(recheck_data)
+                'total_after': total_after
             }
             
         except Exception as e:
@@ -0,0 +1,263 @@
+"""
+文件复制引擎
+优先使用写时复制（reflink）和内核零拷贝，需要校验时在复制的同一遍读取中计算 SHA-1；
+另提供硬链接、软链接等不复制数据的放置方式
+"""
+
+import errno
+import os
+import shutil
+import sys
+from hashlib import sha1
+from pathlib import Path
+from typing import Optional
+
+# Linux FICLONE ioctl（_IOW(0x94, 9, int)）
+FICLONE = 0x40049409
+
+# Linux renameat2 参数
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+# 这些错误表示当前方式不可用，应降级到下一种复制方式
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                    errno.ENOTTY, errno.EBADF, errno.EPERM}
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 文件放置方式：移动 / 复制 / 硬链接 / 写时复制 / 软链接
+PLACEMENT_MODES = ('move', 'copy', 'hardlink', 'reflink', 'symlink')
+
+
+class CopyVerifyError(OSError):
+    """复制后的内容与预期哈希不一致"""
+
+
+def try_reflink(src_fd: int, dst_fd: int) -> bool:
+    """
+    尝试写时复制（btrfs / XFS / bcachefs 等 CoW 文件系统，瞬间完成且不占额外空间）
+
+    :return: 是否成功
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+# libc 的 renameat2（False 表示尚未查找）
+_renameat2_func = False
+
+
+def _renameat2():
+    """获取 libc 的 renameat2（非 Linux 或 glibc < 2.28 时为 None）"""
+    global _renameat2_func
+    if _renameat2_func is False:
+        _renameat2_func = None
+        if sys.platform.startswith('linux'):
+            try:
+                import ctypes
+                libc = ctypes.CDLL(None, use_errno=True)
+                _renameat2_func = libc.renameat2
+                _renameat2_func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int,
+                                            ctypes.c_char_p, ctypes.c_uint]
+            except (ImportError, OSError, AttributeError):
+                _renameat2_func = None
+    return _renameat2_func
+
+
+def rename_noreplace(source: Path, target: Path):
+    """
+    重命名文件，目标已存在时抛出 FileExistsError 而不是覆盖
+
+    Linux 上使用 renameat2(RENAME_NOREPLACE) 原子完成；不支持时先检查目标再 rename
+
+    :param source: 源文件
+    :param target: 目标文件
+    """
+    func = _renameat2()
+    if func is not None:
+        import ctypes
+        if func(AT_FDCWD, os.fsencode(source), AT_FDCWD, os.fsencode(target), RENAME_NOREPLACE) == 0:
+            return
+        err = ctypes.get_errno()
+        if err not in _FALLBACK_ERRNOS or err == errno.EXDEV:
+            raise OSError(err, os.strerror(err), str(source), None, str(target))
+
+    if os.path.lexists(target):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(target))
+    os.rename(source, target)
+
+
+def _copy_kernel(src_fd: int, dst_fd: int, size: int) -> bool:
+    """
+    内核零拷贝（copy_file_range，不支持时降级为 sendfile）
+
+    :return: 是否成功（False 表示两种方式都不可用且尚未写入任何数据）
+    :raises OSError: 复制了部分数据后中断（源文件比 stat 时短）
+    """
+    for func_name in ('copy_file_range', 'sendfile'):
+        func = getattr(os, func_name, None)
+        if func is None:
+            continue
+
+        copied = 0
+        try:
+            while copied < size:
+                if func_name == 'copy_file_range':
+                    sent = func(src_fd, dst_fd, size - copied)
+                else:
+                    sent = func(dst_fd, src_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError as e:
+            if copied or e.errno not in _FALLBACK_ERRNOS:
+                raise
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            continue
+
+        if copied == size:
+            return True
+        if copied == 0:
+            # 第一次调用即返回 0（部分文件系统不支持），换下一种方式
+            os.lseek(src_fd, 0, os.SEEK_SET)
+            continue
+        raise OSError(errno.EIO, f"复制中断: 已复制 {copied} / {size} 字节")
+    return False
+
+
+def _copy_and_hash(src_fd: int, dst_fd: int) -> str:
+    """用户态复制，同一遍读取中计算 SHA-1"""
+    sha1_hash = sha1()
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(src_fd, 'rb', buffering=0, closefd=False) as src:
+        while n := src.readinto(buffer):
+            sha1_hash.update(view[:n])
+            written = 0
+            while written < n:
+                written += os.write(dst_fd, view[written:n])
+    return sha1_hash.hexdigest().upper()
+
+
+def copy_file_data(source: Path, target: Path, expected_sha1: Optional[str] = None) -> str:
+    """
+    复制文件内容与元数据（目标文件不能已存在）
+
+    - reflink 可用时直接克隆
+    - 提供 expected_sha1 时边复制边计算哈希，不一致则删除目标并抛出 CopyVerifyError
+    - 否则使用 copy_file_range / sendfile 零拷贝，最后降级为普通复制
+
+    :param source: 源文件
+    :param target: 目标文件
+    :param expected_sha1: 预期的 SHA-1（大写），为空则不校验
+    :return: 实际使用的复制方式
+    """
+    src_fd = os.open(source, os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except BaseException:
+        # 目标已存在（FileExistsError）时不能删除别人的文件
+        os.close(src_fd)
+        raise
+    try:
+        try:
+            if try_reflink(src_fd, dst_fd):
+                method = 'reflink'
+            elif expected_sha1:
+                actual = _copy_and_hash(src_fd, dst_fd)
+                if actual != expected_sha1.upper():
+                    raise CopyVerifyError(
+                        f"复制校验失败: {source.name}（预期 {expected_sha1}，实际 {actual}）"
+                    )
+                method = 'copy+verify'
+            elif _copy_kernel(src_fd, dst_fd, size):
+                method = 'zero-copy'
+            else:
+                _copy_and_hash(src_fd, dst_fd)
+                method = 'copy'
+            copied_size = os.fstat(dst_fd).st_size
+            if copied_size != size:
+                raise OSError(errno.EIO, f"复制不完整: {source.name}（{copied_size} / {size} 字节）")
+        finally:
+            os.close(dst_fd)
+    except BaseException:
+        os.close(src_fd)
+        try:
+            os.unlink(target)
+        except OSError:
+            pass
+        raise
+    os.close(src_fd)
+
+    shutil.copystat(source, target)
+    return method
+
+
+def move_file_data(source: Path, target: Path, expected_sha1: Optional[str] = None) -> str:
+    """
+    移动文件：同一文件系统内直接 rename（不覆盖已有文件），跨设备时复制后删除源文件
+
+    :param source: 源文件
+    :param target: 目标文件
+    :param expected_sha1: 预期的 SHA-1（跨设备复制时校验）
+    :return: 实际使用的方式
+    """
+    try:
+        rename_noreplace(source, target)
+        return 'rename'
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    size = os.stat(source).st_size
+    method = copy_file_data(source, target, expected_sha1)
+    if os.stat(target).st_size != size:
+        # 目标不完整时保留源文件
+        os.unlink(target)
+        raise OSError(errno.EIO, f"复制不完整，保留源文件: {source.name}")
+    os.unlink(source)
+    return method
+
+
+def place_file_data(source: Path, target: Path, mode: str, expected_sha1: Optional[str] = None) -> str:
+    """
+    按指定方式放置文件（目标文件不能已存在）
+
+    - move: 同 move_file_data
+    - copy / reflink: 同 copy_file_data（优先 reflink，不支持时降级为复制）
+    - hardlink: 创建硬链接，跨设备或文件系统不支持时降级为 reflink / 复制
+    - symlink: 创建指向源文件绝对路径的软链接（可跨设备）
+
+    :param source: 源文件
+    :param target: 目标文件
+    :param mode: 放置方式（见 PLACEMENT_MODES）
+    :param expected_sha1: 预期的 SHA-1（发生数据复制时校验）
+    :return: 实际使用的方式
+    """
+    if mode == 'move':
+        return move_file_data(source, target, expected_sha1)
+
+    if mode == 'hardlink':
+        try:
+            os.link(source, target)
+            return 'hardlink'
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS and e.errno != errno.EMLINK:
+                raise
+        return copy_file_data(source, target, expected_sha1)
+
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(source), target)
+        return 'symlink'
+
+    if mode in ('copy', 'reflink'):
+        return copy_file_data(source, target, expected_sha1)
+
+    raise ValueError(f"未知的放置方式: {mode}")
@@ -0,0 +1,131 @@
+"""
+目录统计模块
+缓存 input / rapid / non_rapid 的文件数与总大小：放置文件、首次检测新文件时增量更新，
+后台低优先级线程定期完整遍历校准，查询时直接返回缓存值
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .dir_walker import summarize
+
+
+class DirStats:
+    """目录文件数与总大小缓存"""
+
+    def __init__(self, roots: Dict[str, str], reconcile_interval: float = 3600):
+        """
+        初始化目录统计
+
+        :param roots: 名称 -> 目录路径，如 {'rapid': './rapid'}
+        :param reconcile_interval: 完整遍历校准的间隔（秒）
+        """
+        self.lock = threading.Lock()
+        self.reconcile_interval = reconcile_interval
+        self.roots: Dict[str, str] = {}
+        # 名称 -> {'count', 'bytes', 'started', 'updated'}，尚未统计过的目录没有条目
+        self.counters: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.set_roots(roots)
+
+    def set_roots(self, roots: Dict[str, str]):
+        """
+        设置统计的目录（目录变化的条目会在下次校准时重新统计）
+
+        :param roots: 名称 -> 目录路径
+        """
+        roots = {name: os.path.abspath(path) for name, path in roots.items()}
+        with self.lock:
+            for name, path in roots.items():
+                if self.roots.get(name) != path:
+                    self.counters.pop(name, None)
+            self.roots = roots
+
+    def _root_of(self, path: str) -> Optional[str]:
+        """文件所在的统计目录名称（嵌套时取最深的目录，需持有锁）"""
+        path = os.path.abspath(path)
+        best = None
+        best_len = -1
+        for name, root in self.roots.items():
+            if path.startswith(root + os.sep) and len(root) > best_len:
+                best, best_len = name, len(root)
+        return best
+
+    def _adjust(self, name: Optional[str], count: int, size: int):
+        """增减计数（需持有锁，未统计过的目录忽略）"""
+        counter = self.counters.get(name)
+        if counter is not None:
+            counter['count'] = max(0, counter['count'] + count)
+            counter['bytes'] = max(0, counter['bytes'] + count * size)
+
+    def record_placement(self, source: str | os.PathLike, target: str | os.PathLike,
+                         size: int, moved: bool):
+        """
+        记录一次文件放置
+
+        :param source: 源文件路径
+        :param target: 目标文件路径
+        :param size: 文件大小
+        :param moved: 是否为移动（移动时源目录减少一个文件）
+        """
+        with self.lock:
+            if moved:
+                self._adjust(self._root_of(os.fspath(source)), -1, size)
+            self._adjust(self._root_of(os.fspath(target)), 1, size)
+
+    def record_arrival(self, path: str | os.PathLike, size: int, arrived: float):
+        """
+        记录一个新出现的文件（如实时监控首次检测到的 input 文件）
+
+        :param path: 文件路径
+        :param size: 文件大小
+        :param arrived: 文件出现的时间（st_ctime），早于上次完整遍历开始时已被统计，忽略
+        """
+        with self.lock:
+            name = self._root_of(os.fspath(path))
+            counter = self.counters.get(name)
+            if counter is not None and arrived >= counter['started']:
+                self._adjust(name, 1, size)
+
+    def snapshot(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        获取缓存的统计（不访问磁盘），超过校准间隔时在后台重新统计
+
+        :return: 名称 -> {'count', 'bytes', 'updated'}，尚未统计完成时为 None
+        """
+        with self.lock:
+            result = {name: dict(self.counters[name]) if name in self.counters else None
+                      for name in self.roots}
+            oldest = min((c['updated'] for c in self.counters.values()), default=0)
+            stale = len(self.counters) < len(self.roots) or time.time() - oldest >= self.reconcile_interval
+        if stale:
+            self.refresh()
+        return result
+
+    def refresh(self):
+        """在后台线程完整遍历各目录校准统计（已在统计中时忽略）"""
+        with self.lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._reconcile, name='dir-stats', daemon=True)
+            self._thread.start()
+
+    def _reconcile(self):
+        """逐个目录单线程遍历，降低对磁盘与 CPU 的占用"""
+        try:
+            # 仅降低本线程的 CPU 优先级（Linux 上 nice 值按线程生效）
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        with self.lock:
+            roots = dict(self.roots)
+        for name, root in roots.items():
+            started = time.time()
+            count, total = summarize(root, workers=1)
+            with self.lock:
+                if self.roots.get(name) == root:
+                    self.counters[name] = {'count': count, 'bytes': total,
+                                           'started': started, 'updated': time.time()}
@@ -0,0 +1,118 @@
+"""
+目录遍历模块
+用有限线程池并行 scandir 各子目录，边遍历边产出文件，
+适合 NFS / SMB 等单次往返延迟较高的网络文件系统
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+
+class FileEntry(NamedTuple):
+    """遍历得到的文件"""
+    path: str
+    name: str
+    size: int
+    mtime: float
+
+
+# 目录列举函数：返回 (文件列表, 子目录路径列表)
+Lister = Callable[[str], Tuple[List[FileEntry], List[str]]]
+
+
+def scandir_lister(dir_path: str) -> Tuple[List[FileEntry], List[str]]:
+    """
+    默认列举函数（scandir，文件大小与修改时间随列举一并获取）
+
+    - 跟随指向文件的软链接，不进入指向目录的软链接（避免循环）
+    - 无权限或已被删除的目录视为空目录
+
+    :param dir_path: 目录路径
+    :return: (文件列表, 子目录路径列表)
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append(FileEntry(entry.path, entry.name, stat.st_size, stat.st_mtime))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def walk_files(root: str | os.PathLike, workers: int = 4, recursive: bool = True,
+               lister: Optional[Lister] = None,
+               prune: Optional[Callable[[str], bool]] = None) -> Iterator[FileEntry]:
+    """
+    遍历目录下的文件（顺序不固定）
+
+    workers > 1 时每个子目录作为独立任务提交到线程池，
+    目录列举完成即产出其中的文件并提交下一层子目录
+
+    :param root: 根目录
+    :param workers: 并发列举的线程数（1 表示单线程遍历）
+    :param recursive: 是否递归子目录
+    :param lister: 目录列举函数（默认 scandir_lister）
+    :param prune: 返回 True 的子目录不再进入
+    :return: 文件迭代器
+    """
+    lister = lister or scandir_lister
+    root = os.fspath(root)
+
+    def expand(subdirs: List[str]) -> List[str]:
+        if not recursive:
+            return []
+        if prune is None:
+            return subdirs
+        return [d for d in subdirs if not prune(d)]
+
+    if workers <= 1:
+        stack = [root]
+        while stack:
+            files, subdirs = lister(stack.pop())
+            yield from files
+            stack.extend(reversed(expand(subdirs)))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='DirWalker') as pool:
+        pending: Set[Future] = {pool.submit(lister, root)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    for subdir in expand(subdirs):
+                        pending.add(pool.submit(lister, subdir))
+                    yield from files
+        finally:
+            # 调用方提前结束迭代时取消尚未开始的列举
+            for future in pending:
+                future.cancel()
+
+
+def summarize(root: str | os.PathLike, workers: int = 4) -> Tuple[int, int]:
+    """
+    统计目录下的文件数与总大小
+
+    :param root: 根目录
+    :param workers: 并发列举的线程数
+    :return: (文件数, 总字节数)
+    """
+    if not os.path.isdir(root):
+        return 0, 0
+
+    count = 0
+    total = 0
+    for entry in walk_files(root, workers=workers):
+        count += 1
+        total += entry.size
+    return count, total
@@ -0,0 +1,165 @@
+"""
+文件过滤模块
+将过滤配置一次性编译为扩展名集合与合并后的正则，供扫描、目录遍历与实时监控共用
+"""
+
+import fnmatch
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+# 正则开头的全局标志，如 "(?i)"
+_LEADING_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+
+def compile_patterns(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    将规则列表编译为一个正则表达式
+
+    规则默认为通配符（如 "*.nfo"），以 "re:" 开头的按正则处理（如 "re:(?i).*sample.*"）
+
+    :param patterns: 规则列表
+    :return: 编译后的正则，列表为空时返回 None
+    """
+    parts = []
+    for pattern in patterns or ():
+        pattern = str(pattern)
+        if pattern.startswith('re:'):
+            # 开头的全局标志（如 "(?i)"）改为局部标志，才能与其他规则合并
+            regex = pattern[3:]
+            flags = _LEADING_FLAGS.match(regex)
+            if flags:
+                parts.append(f"(?{flags.group(1)}:{regex[flags.end():]})\\Z")
+            else:
+                parts.append(f"(?:{regex})\\Z")
+        else:
+            parts.append(fnmatch.translate(pattern))
+    if not parts:
+        return None
+    return re.compile('|'.join(parts))
+
+
+def _normalize_extensions(extensions: Iterable[str]) -> frozenset:
+    """扩展名统一为小写并带前导点"""
+    return frozenset(
+        ext if ext.startswith('.') else f".{ext}"
+        for ext in (str(e).lower() for e in extensions or ()) if ext
+    )
+
+
+class FileFilter:
+    """
+    编译后的文件过滤器
+
+    - 大小：min_size / max_size
+    - 扩展名：include_extensions / exclude_extensions（集合查找）
+    - 文件规则：include_patterns / exclude_patterns，不含 "/" 的规则匹配文件名，
+      含 "/" 的规则匹配相对扫描根目录的路径
+    - 目录规则：ignore_dirs 匹配目录名，命中的目录在遍历时直接跳过
+    """
+
+    def __init__(self, filters: Optional[Dict[str, Any]] = None):
+        """
+        编译过滤配置
+
+        :param filters: file_processing.filters 配置
+        """
+        filters = filters or {}
+        self.min_size = filters.get('min_size', 0) or 0
+        max_size = filters.get('max_size')
+        self.max_size = max_size if max_size else float('inf')
+
+        self.include_extensions = _normalize_extensions(filters.get('include_extensions', []))
+        self.exclude_extensions = _normalize_extensions(filters.get('exclude_extensions', []))
+
+        include = list(filters.get('include_patterns', []) or [])
+        exclude = list(filters.get('exclude_patterns', []) or [])
+        self.include_name = compile_patterns(p for p in include if '/' not in p)
+        self.include_path = compile_patterns(p for p in include if '/' in p)
+        self.exclude_name = compile_patterns(p for p in exclude if '/' not in p)
+        self.exclude_path = compile_patterns(p for p in exclude if '/' in p)
+        self.ignore_dirs = compile_patterns(filters.get('ignore_dirs', []))
+        # 只有配置了目录规则或路径规则时才需要计算相对路径
+        self._uses_paths = any(
+            regex is not None for regex in (self.include_path, self.exclude_path, self.ignore_dirs)
+        )
+
+    def prune_dir(self, dir_path: str) -> bool:
+        """
+        遍历时是否跳过该目录
+
+        :param dir_path: 目录路径
+        :return: True 表示跳过
+        """
+        return self.ignore_dirs is not None and self.ignore_dirs.match(os.path.basename(dir_path)) is not None
+
+    def accepts_path(self, path: str, root: Optional[str] = None) -> bool:
+        """
+        只根据路径判断（不访问文件系统），用于事件预过滤和遍历结果过滤
+
+        :param path: 文件路径
+        :param root: 扫描根目录（与 path 同为绝对路径或同为相对路径；用于路径规则与目录规则，为空时只检查文件名）
+        :return: 是否处理
+        """
+        name = os.path.basename(path)
+
+        ext = os.path.splitext(name)[1].lower()
+        if ext in self.exclude_extensions:
+            return False
+        if self.include_extensions and ext not in self.include_extensions:
+            return False
+
+        if self.exclude_name is not None and self.exclude_name.match(name):
+            return False
+
+        rel_path = None
+        if root is not None and self._uses_paths:
+            prefix = root.rstrip(os.sep) + os.sep
+            if path.startswith(prefix):
+                rel_path = path[len(prefix):].replace(os.sep, '/')
+
+        if rel_path is not None:
+            if self.ignore_dirs is not None:
+                for part in rel_path.split('/')[:-1]:
+                    if self.ignore_dirs.match(part):
+                        return False
+            if self.exclude_path is not None and self.exclude_path.match(rel_path):
+                return False
+
+        if self.include_name is not None or self.include_path is not None:
+            if self.include_name is not None and self.include_name.match(name):
+                return True
+            if rel_path is not None and self.include_path is not None and self.include_path.match(rel_path):
+                return True
+            return False
+
+        return True
+
+    def accepts(self, path: str, size: int, root: Optional[str] = None) -> bool:
+        """
+        按大小与路径判断
+
+        :param path: 文件路径
+        :param size: 文件大小
+        :param root: 扫描根目录
+        :return: 是否处理
+        """
+        if size < self.min_size or size > self.max_size:
+            return False
+        return self.accepts_path(path, root)
+
+    def accepts_file(self, file_path: str | Path, root: Optional[str] = None) -> bool:
+        """
+        判断单个文件（读取文件大小）
+
+        :param file_path: 文件路径
+        :param root: 扫描根目录
+        :return: 是否处理
+        """
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            return False
+        return self.accepts(os.fspath(file_path), size, root)
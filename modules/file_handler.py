@@ -4,12 +4,23 @@
 """
 
 import os
-import shutil
+import time
+import threading
 from pathlib import Path
 from hashlib import sha1
 from typing import List, Dict, Any, Callable, Optional
 from datetime import datetime
 
+from .resumable_hash import ResumableSHA1, HashProgressStore
+from .copy_engine import PLACEMENT_MODES, place_file_data
+from .dir_walker import walk_files
+from .file_filter import FileFilter
+from .scan_snapshot import ScanSnapshot
+
+
+class HashInterruptedError(RuntimeError):
+    """哈希计算被中断（程序正在停止）"""
+
 
 class FileHandler:
     """文件处理器"""
@@ -18,12 +29,52 @@ class FileHandler:
         """
         初始化文件处理器
         
+        :param config: 文件处理配置
+        """
+        self._scan_cache: Dict[str, List[Path]] = {}
+        self.apply_config(config)
+        
+        # 目录快照（递归扫描时跳过未变化的目录）
+        snapshot_config = config.get('scan_snapshot', {})
+        self.scan_snapshot = None
+        if snapshot_config.get('enabled', True):
+            self.scan_snapshot = ScanSnapshot(
+                snapshot_config.get('snapshot_file', './data/scan_snapshot.json')
+            )
+        
+        # 设置后正在进行的哈希计算会尽快中断
+        self.cancel_event = threading.Event()
+        
+        # 可续算哈希（大文件定期保存进度，中断后从检查点继续）
+        resumable_config = config.get('resumable_hash', {})
+        self.resumable_min_size = resumable_config.get('min_size', 1073741824)
+        self.resumable_interval = resumable_config.get('checkpoint_interval', 30)
+        self.hash_progress = None
+        if resumable_config.get('enabled', True):
+            if ResumableSHA1.available():
+                self.hash_progress = HashProgressStore(
+                    resumable_config.get('progress_file', './data/hash_progress.json')
+                )
+            else:
+                print("⚠️  未找到 libcrypto，可续算哈希已禁用")
+    
+    def apply_config(self, config: Dict[str, Any]):
+        """
+        应用可在运行中修改的配置（过滤规则、移动策略、并发数等）
+        
         :param config: 文件处理配置
         """
         self.config = config
         self.filters = config.get('filters', {})
+        self.file_filter = FileFilter(self.filters)
         self.move_strategy = config.get('move_strategy', {})
+        # 复制（或跨设备移动）时边复制边计算哈希，与检测时的哈希比对
+        self.verify_copy = self.move_strategy.get('verify_copy', False)
         self.hash_chunk_size = config.get('hash_chunk_size', 8192)
+        # 并行遍历目录的线程数（网络文件系统上可适当调大）
+        self.scan_workers = config.get('scan_workers', 4)
+        # 过滤规则可能已变化，上次的扫描结果不再可用
+        self._scan_cache.clear()
     
     def scan_files(self, path: str | Path, recursive: bool = True) -> List[Path]:
         """
@@ -40,14 +91,24 @@ class FileHandler:
             if self._should_process_file(path):
                 files.append(path)
         elif path.is_dir():
-            if recursive:
-                for file_path in path.rglob('*'):
-                    if file_path.is_file() and self._should_process_file(file_path):
-                        files.append(file_path)
+            # 并行遍历，大小随 scandir 一并取得，无需逐个 stat；
+            # 递归扫描时未变化的目录直接使用快照，整棵树都未变化时直接返回上次结果
+            use_snapshot = recursive and self.scan_snapshot is not None
+            root = os.path.abspath(path)
+            prune = self.file_filter.prune_dir
+            if use_snapshot and root in self._scan_cache and self.scan_snapshot.is_unchanged(root, prune):
+                return list(self._scan_cache[root])
+            
+            if use_snapshot:
+                entries = self.scan_snapshot.walk(root, workers=self.scan_workers, prune=prune)
             else:
-                for file_path in path.iterdir():
-                    if file_path.is_file() and self._should_process_file(file_path):
-                        files.append(file_path)
+                entries = walk_files(root, workers=self.scan_workers, recursive=recursive, prune=prune)
+            accepts = self.file_filter.accepts
+            accepted = sorted(entry.path for entry in entries if accepts(entry.path, entry.size, root))
+            files = [Path(p) for p in accepted]
+            if use_snapshot:
+                self._scan_cache[root] = files
+                return list(files)
         
         return files
     
@@ -58,32 +119,7 @@ class FileHandler:
         :param file_path: 文件路径
         :return: 是否处理
         """
-        # 检查文件大小
-        try:
-            file_size = file_path.stat().st_size
-        except OSError:
-            return False
-        
-        min_size = self.filters.get('min_size', 0)
-        max_size = self.filters.get('max_size', float('inf'))
-        
-        if file_size < min_size or file_size > max_size:
-            return False
-        
-        # 检查文件扩展名
-        ext = file_path.suffix.lower()
-        
-        # 排除列表
-        exclude_exts = self.filters.get('exclude_extensions', [])
-        if ext in exclude_exts:
-            return False
-        
-        # 包含列表（如果指定了包含列表，则只处理列表中的扩展名）
-        include_exts = self.filters.get('include_extensions', [])
-        if include_exts and ext not in include_exts:
-            return False
-        
-        return True
+        return self.file_filter.accepts_file(file_path)
     
     def calculate_sha1(self, file_path: Path, progress_callback: Optional[Callable] = None) -> str:
         """
@@ -93,12 +129,18 @@ class FileHandler:
         :param progress_callback: 进度回调函数
         :return: SHA-1哈希值（大写）
         """
+        stat = file_path.stat()
+        if self.hash_progress and stat.st_size >= self.resumable_min_size:
+            return self._calculate_sha1_resumable(file_path, stat, progress_callback)
+        
         sha1_hash = sha1()
-        file_size = file_path.stat().st_size
+        file_size = stat.st_size
         bytes_read = 0
         
         with open(file_path, 'rb') as f:
             while chunk := f.read(self.hash_chunk_size):
+                if self.cancel_event.is_set():
+                    raise HashInterruptedError(f"哈希计算已中断: {file_path.name}")
                 sha1_hash.update(chunk)
                 bytes_read += len(chunk)
                 
@@ -107,6 +149,56 @@ class FileHandler:
         
         return sha1_hash.hexdigest().upper()
     
+    def _calculate_sha1_resumable(self, file_path: Path, stat: os.stat_result,
+                                  progress_callback: Optional[Callable] = None) -> str:
+        """
+        可续算的SHA-1计算（每隔 checkpoint_interval 秒保存一次中间状态）
+        
+        :param file_path: 文件路径
+        :param stat: 文件 stat 结果
+        :param progress_callback: 进度回调函数
+        :return: SHA-1哈希值（大写）
+        """
+        identity = HashProgressStore.identity(stat)
+        checkpoint = self.hash_progress.get(identity)
+        
+        try:
+            sha1_hash = ResumableSHA1(checkpoint)
+        except ValueError:
+            sha1_hash = ResumableSHA1()
+        
+        bytes_read = sha1_hash.length
+        if bytes_read:
+            print(f"  ↪ 从检查点继续计算哈希: {file_path.name} ({self._format_size(bytes_read)} 已完成)")
+        
+        # 读取块大小取 64 字节的整数倍，保证每次读取后都位于块边界
+        block = ResumableSHA1.BLOCK_SIZE
+        chunk_size = max(block, self.hash_chunk_size // block * block)
+        last_checkpoint = time.time()
+        
+        with open(file_path, 'rb') as f:
+            f.seek(bytes_read)
+            while chunk := f.read(chunk_size):
+                if self.cancel_event.is_set():
+                    self.hash_progress.save(identity, str(file_path), sha1_hash.state())
+                    raise HashInterruptedError(f"哈希计算已中断: {file_path.name}（进度已保存）")
+                
+                sha1_hash.update(chunk)
+                bytes_read += len(chunk)
+                
+                if progress_callback:
+                    progress_callback(bytes_read, stat.st_size)
+                
+                # 定期保存检查点（文件末尾不足一块时不保存）
+                now = time.time()
+                if now - last_checkpoint >= self.resumable_interval and bytes_read % block == 0:
+                    self.hash_progress.save(identity, str(file_path), sha1_hash.state())
+                    last_checkpoint = now
+        
+        self.hash_progress.remove(identity)
+        
+        return sha1_hash.hexdigest().upper()
+    
     def get_file_info(self, file_path: Path) -> Dict[str, Any]:
         """
         获取文件信息
@@ -122,6 +214,8 @@ class FileHandler:
             'size': stat.st_size,
             'size_human': self._format_size(stat.st_size),
             'mtime': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            'mtime_ts': stat.st_mtime,
+            'ctime_ts': stat.st_ctime,
             'extension': file_path.suffix.lower(),
         }
     
@@ -134,8 +228,25 @@ class FileHandler:
             size /= 1024.0
         return f"{size:.2f} PB"
     
+    def placement_mode(self, kind: str) -> str:
+        """
+        获取目标目录的放置方式
+        
+        未单独配置时沿用 use_copy（True=copy，False=move）
+        
+        :param kind: 目标类型（rapid / non_rapid）
+        :return: 放置方式（move / copy / hardlink / reflink / symlink）
+        """
+        default = 'copy' if self.move_strategy.get('use_copy', False) else 'move'
+        mode = (self.move_strategy.get('placement') or {}).get(kind) or default
+        if mode not in PLACEMENT_MODES:
+            print(f"⚠️  未知的放置方式 {mode}（{kind}），使用 {default}")
+            return default
+        return mode
+    
     def move_or_copy_file(self, source: Path, target_dir: Path, keep_structure: bool = False,
-                          base_path: Optional[Path] = None, use_copy: bool = False) -> Path:
+                          base_path: Optional[Path] = None, use_copy: bool = False,
+                          expected_sha1: Optional[str] = None, mode: Optional[str] = None) -> Path:
         """
         移动或复制文件到目标目录
         
@@ -144,15 +255,16 @@ class FileHandler:
         :param keep_structure: 是否保持目录结构
         :param base_path: 基础路径
         :param use_copy: 是否使用复制（True=复制，False=移动）
+        :param expected_sha1: 检测时计算的 SHA-1（启用 verify_copy 时用于校验复制结果）
+        :param mode: 放置方式（move / copy / hardlink / reflink / symlink），指定时忽略 use_copy
         :return: 目标文件路径
         """
-        if use_copy:
-            return self.copy_file(source, target_dir, keep_structure, base_path)
-        else:
-            return self.move_file(source, target_dir, keep_structure, base_path)
+        if mode is None:
+            mode = 'copy' if use_copy else 'move'
+        return self.place_file(source, target_dir, keep_structure, base_path, mode, expected_sha1)
     
     def move_file(self, source: Path, target_dir: Path, keep_structure: bool = False, 
-                  base_path: Optional[Path] = None) -> Path:
+                  base_path: Optional[Path] = None, expected_sha1: Optional[str] = None) -> Path:
         """
         移动文件到目标目录（保持文件夹结构）
         
@@ -160,28 +272,49 @@ class FileHandler:
         :param target_dir: 目标目录
         :param keep_structure: 是否保持目录结构
         :param base_path: 基础路径（用于计算相对路径）
+        :param expected_sha1: 预期的 SHA-1（跨设备移动时校验）
+        :return: 目标文件路径
+        """
+        return self.place_file(source, target_dir, keep_structure, base_path, 'move', expected_sha1)
+    
+    def copy_file(self, source: Path, target_dir: Path, keep_structure: bool = False,
+                  base_path: Optional[Path] = None, expected_sha1: Optional[str] = None) -> Path:
+        """
+        复制文件到目标目录
+        
+        :param source: 源文件路径
+        :param target_dir: 目标目录
+        :param keep_structure: 是否保持目录结构
+        :param base_path: 基础路径
+        :param expected_sha1: 预期的 SHA-1（启用 verify_copy 时校验）
         :return: 目标文件路径
         """
-        target_dir = Path(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
+        return self.place_file(source, target_dir, keep_structure, base_path, 'copy', expected_sha1)
+    
+    def place_file(self, source: Path, target_dir: Path, keep_structure: bool = False,
+                   base_path: Optional[Path] = None, mode: str = 'move',
+                   expected_sha1: Optional[str] = None) -> Path:
+        """
+        按放置方式把文件放到目标目录
         
+        硬链接跨设备时自动降级为 reflink / 复制；
+        只有移动会删除源文件，其他方式源文件保留在原位置
+        
+        :param source: 源文件路径
+        :param target_dir: 目标目录
+        :param keep_structure: 是否保持目录结构
+        :param base_path: 基础路径（用于计算相对路径）
+        :param mode: 放置方式
+        :param expected_sha1: 预期的 SHA-1（发生数据复制且启用 verify_copy 时校验）
+        :return: 目标文件路径
+        """
         # 转换为绝对路径
         source = source.resolve()
         if base_path:
             base_path = base_path.resolve()
         
-        if keep_structure and base_path:
-            # 保持目录结构
-            try:
-                relative_path = source.relative_to(base_path)
-                target_path = target_dir / relative_path
-                target_path.parent.mkdir(parents=True, exist_ok=True)
-            except ValueError:
-                # 如果路径不在 base_path 下，直接使用文件名
-                target_path = target_dir / source.name
-        else:
-            # 直接移动到目标目录
-            target_path = target_dir / source.name
+        target_path = self.target_path(source, Path(target_dir), keep_structure, base_path)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
         
         # 处理文件名冲突
         if target_path.exists():
@@ -192,14 +325,38 @@ class FileHandler:
                 target_path = target_path.parent / f"{base_name}_{counter}{extension}"
                 counter += 1
         
-        # 移动文件
-        shutil.move(str(source), str(target_path))
+        # 放置文件（跨设备移动、复制时使用复制引擎）
+        method = place_file_data(source, target_path, mode, expected_sha1 if self.verify_copy else None)
+        if mode == 'hardlink' and method != 'hardlink':
+            print(f"  ℹ️  无法创建硬链接（可能跨设备），已改用 {method}: {source.name}")
         
-        # 清理空文件夹
-        self._cleanup_empty_dirs(source.parent, base_path)
+        if mode == 'move':
+            # 清理空文件夹
+            self._cleanup_empty_dirs(source.parent, base_path)
         
         return target_path
     
+    @staticmethod
+    def target_path(source: Path, target_dir: Path, keep_structure: bool = False,
+                    base_path: Optional[Path] = None) -> Path:
+        """
+        计算文件在目标目录中的路径（不处理重名，不访问磁盘）
+        
+        :param source: 源文件绝对路径
+        :param target_dir: 目标目录
+        :param keep_structure: 是否保持目录结构
+        :param base_path: 基础路径（绝对路径，用于计算相对路径）
+        :return: 目标文件路径
+        """
+        if keep_structure and base_path:
+            # 保持目录结构
+            try:
+                return target_dir / source.relative_to(base_path)
+            except ValueError:
+                # 如果路径不在 base_path 下，直接使用文件名
+                pass
+        return target_dir / source.name
+    
     def _cleanup_empty_dirs(self, dir_path: Path, stop_at: Optional[Path] = None):
         """
         清理空文件夹（递归向上）
@@ -226,47 +383,3 @@ class FileHandler:
         except (OSError, PermissionError):
             # 忽略权限错误或其他系统错误
             pass
-    
-    def copy_file(self, source: Path, target_dir: Path, keep_structure: bool = False,
-                  base_path: Optional[Path] = None) -> Path:
-        """
-        复制文件到目标目录
-        
-        :param source: 源文件路径
-        :param target_dir: 目标目录
-        :param keep_structure: 是否保持目录结构
-        :param base_path: 基础路径
-        :return: 目标文件路径
-        """
-        target_dir = Path(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 转换为绝对路径
-        source = source.resolve()
-        if base_path:
-            base_path = base_path.resolve()
-        
-        if keep_structure and base_path:
-            try:
-                relative_path = source.relative_to(base_path)
-                target_path = target_dir / relative_path
-                target_path.parent.mkdir(parents=True, exist_ok=True)
-            except ValueError:
-                # 如果路径不在 base_path 下，直接使用文件名
-                target_path = target_dir / source.name
-        else:
-            target_path = target_dir / source.name
-        
-        # 处理文件名冲突
-        if target_path.exists():
-            base_name = target_path.stem
-            extension = target_path.suffix
-            counter = 1
-            while target_path.exists():
-                target_path = target_path.parent / f"{base_name}_{counter}{extension}"
-                counter += 1
-        
-        # 复制文件
-        shutil.copy2(str(source), str(target_path))
-        
-        return target_path
@@ -3,20 +3,32 @@
 使用 watchdog 监控文件系统变化
 """
 
+import os
+import json
 import time
 import threading
 from pathlib import Path
-from typing import Callable, Dict, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
+from .fs_utils import atomic_write_json
+from .file_filter import FileFilter, compile_patterns
+
+
+# 默认忽略的文件名（隐藏文件、临时文件、下载中的文件）
+DEFAULT_IGNORE_PATTERNS = ['.*', '~*', '*.tmp', '*.part', '*.crdownload', '*.!qB']
+
 
 class FileWatcher:
     """文件监控器"""
     
     def __init__(self, watch_path: Path, callback: Callable, 
-                 debounce_seconds: int = 5, recursive: bool = True):
+                 debounce_seconds: int = 5, recursive: bool = True,
+                 ignore_patterns: Optional[List[str]] = None,
+                 file_filter: Optional[FileFilter] = None,
+                 coalesce_seconds: float = 1.0):
         """
         初始化文件监控器
         
@@ -24,12 +36,24 @@ class FileWatcher:
         :param callback: 文件稳定后的回调函数
         :param debounce_seconds: 防抖时间（秒），文件稳定后才触发
         :param recursive: 是否递归监控子目录
+        :param ignore_patterns: 忽略的文件名通配符（默认忽略隐藏文件和临时文件）
+        :param file_filter: 文件过滤器（事件到达时按路径过滤，文件稳定后再检查大小）
+        :param coalesce_seconds: 同一文件的事件合并窗口（秒），窗口内的重复事件直接丢弃
         """
-        self.watch_path = Path(watch_path)
+        self.watch_path = Path(watch_path).absolute()
         self.callback = callback
         self.debounce_seconds = debounce_seconds
         self.recursive = recursive
         
+        # 事件预过滤（在加锁之前完成，只做字符串操作，不访问文件系统）
+        if ignore_patterns is None:
+            ignore_patterns = DEFAULT_IGNORE_PATTERNS
+        self.ignore_regex = compile_patterns(ignore_patterns)
+        self.file_filter = file_filter
+        self._root = str(self.watch_path)
+        self.coalesce_seconds = coalesce_seconds
+        self.coalesced_events = 0
+        
         # 文件变化追踪
         self.pending_files: Dict[str, float] = {}  # {文件路径: 最后修改时间}
         self.processing_files: Set[str] = set()    # 正在处理的文件
@@ -75,6 +99,42 @@ class FileWatcher:
             self.debounce_thread.join(timeout=2)
         print("✓ 监控已停止")
     
+    def apply_settings(self, debounce_seconds: float, coalesce_seconds: float,
+                       ignore_patterns: Optional[List[str]], file_filter: Optional[FileFilter]):
+        """
+        运行中更新监控参数（配置热加载时调用，已在队列中的文件按新参数判断）
+        
+        :param debounce_seconds: 防抖时间（秒）
+        :param coalesce_seconds: 事件合并窗口（秒）
+        :param ignore_patterns: 忽略的文件名通配符
+        :param file_filter: 文件过滤器
+        """
+        if ignore_patterns is None:
+            ignore_patterns = DEFAULT_IGNORE_PATTERNS
+        self.ignore_regex = compile_patterns(ignore_patterns)
+        self.file_filter = file_filter
+        self.debounce_seconds = debounce_seconds
+        self.coalesce_seconds = coalesce_seconds
+    
+    def accepts(self, file_path_str: str) -> bool:
+        """
+        事件预过滤（只检查文件名，不访问文件系统）
+        
+        :param file_path_str: 文件路径
+        :return: 是否需要跟踪
+        """
+        name = os.path.basename(file_path_str)
+        
+        # 忽略临时文件和隐藏文件
+        if self.ignore_regex is not None and self.ignore_regex.match(name):
+            return False
+        
+        # 扩展名、文件规则与忽略目录
+        if self.file_filter is not None and not self.file_filter.accepts_path(file_path_str, self._root):
+            return False
+        
+        return True
+    
     def on_file_event(self, event: FileSystemEvent):
         """
         文件事件处理
@@ -85,24 +145,109 @@ class FileWatcher:
         if event.is_directory:
             return
         
-        # 忽略临时文件和隐藏文件
-        file_path = Path(event.src_path)
-        if file_path.name.startswith('.') or file_path.name.startswith('~'):
+        self._touch(event.src_path)
+    
+    def on_file_moved(self, event: FileSystemEvent):
+        """
+        文件移动事件处理（用目标路径替换原路径）
+        
+        :param event: 文件移动事件
+        """
+        if event.is_directory:
             return
         
-        # 忽略正在处理的文件
-        file_path_str = str(file_path.absolute())
-        if file_path_str in self.processing_files:
+        with self.lock:
+            self.pending_files.pop(event.src_path, None)
+        
+        # 移出监控目录的文件不再跟踪
+        dest_path = event.dest_path
+        if dest_path and dest_path.startswith(str(self.watch_path) + os.sep):
+            self._touch(dest_path)
+    
+    def _touch(self, file_path_str: str):
+        """
+        记录文件变化时间
+        
+        :param file_path_str: 文件绝对路径
+        """
+        if not self.accepts(file_path_str):
+            return
+        
+        # 合并高频事件：窗口内已记录过的文件不再加锁（字典读取在 GIL 下是原子的）
+        now = time.time()
+        last_event = self.pending_files.get(file_path_str)
+        if last_event is not None and now - last_event < self.coalesce_seconds:
+            self.coalesced_events += 1
             return
         
         # 记录文件变化时间（只在首次检测到时打印）
         with self.lock:
+            # 忽略正在处理的文件
+            if file_path_str in self.processing_files:
+                return
             is_new = file_path_str not in self.pending_files
-            self.pending_files[file_path_str] = time.time()
-            
-            # 只在首次检测到文件时显示信息
-            if is_new:
-                print(f"📥 检测到新文件: {file_path.name}")
+            self.pending_files[file_path_str] = now
+        
+        # 只在首次检测到文件时显示信息
+        if is_new:
+            print(f"📥 检测到新文件: {os.path.basename(file_path_str)}")
+    
+    def enqueue(self, files: Iterable[Path]) -> int:
+        """
+        直接加入待处理队列（跳过防抖等待）
+        用于启动时的补偿扫描
+
+        :param files: 文件路径列表
+        :return: 新加入的文件数
+        """
+        # 时间戳前移一个稳定周期，下一轮检查即视为稳定
+        ready_time = time.time() - self.debounce_seconds - self.coalesce_seconds
+        added = 0
+        
+        with self.lock:
+            for file_path in files:
+                file_path_str = str(Path(file_path).absolute())
+                if file_path_str in self.processing_files or file_path_str in self.pending_files:
+                    continue
+                self.pending_files[file_path_str] = ready_time
+                added += 1
+        
+        return added
+    
+    def save_queue(self, queue_file: Path) -> int:
+        """
+        保存待处理队列（含未处理完的文件），供下次启动恢复
+        
+        :param queue_file: 队列文件路径
+        :return: 保存的文件数
+        """
+        with self.lock:
+            files = sorted(set(self.pending_files) | self.processing_files)
+        
+        atomic_write_json(queue_file, {'files': files, 'timestamp': time.time()})
+        return len(files)
+    
+    def restore_queue(self, queue_file: Path) -> int:
+        """
+        恢复上次停止时保存的队列，恢复后删除队列文件
+        
+        :param queue_file: 队列文件路径
+        :return: 恢复的文件数
+        """
+        queue_file = Path(queue_file)
+        if not queue_file.exists():
+            return 0
+        
+        try:
+            with open(queue_file, 'r', encoding='utf-8') as f:
+                files = json.load(f).get('files', [])
+        except (OSError, ValueError) as e:
+            print(f"⚠️  读取待处理队列失败: {e}")
+            return 0
+        
+        added = self.enqueue(Path(p) for p in files if os.path.isfile(p))
+        queue_file.unlink(missing_ok=True)
+        return added
     
     def _debounce_checker(self):
         """防抖检查线程（定期检查稳定的文件）"""
@@ -110,21 +255,35 @@ class FileWatcher:
             time.sleep(1)  # 每秒检查一次
             
             current_time = time.time()
+            # 事件合并会让记录的时间最多滞后一个合并窗口，稳定判定时补上
+            stable_after = self.debounce_seconds + self.coalesce_seconds
             stable_files = []
             
             with self.lock:
                 # 找出稳定的文件（超过防抖时间且未被修改）
                 for file_path, last_modified in list(self.pending_files.items()):
-                    if current_time - last_modified >= self.debounce_seconds:
-                        # 检查文件是否还存在
-                        if Path(file_path).exists():
-                            stable_files.append(file_path)
-                            self.processing_files.add(file_path)
+                    if current_time - last_modified >= stable_after:
+                        stable_files.append(file_path)
+                        self.processing_files.add(file_path)
                         # 从待处理列表移除
                         del self.pending_files[file_path]
             
             # 处理稳定的文件
             for file_path in stable_files:
+                # 已停止：剩余文件放回队列，由 save_queue 保存
+                if not self.running:
+                    with self.lock:
+                        self.processing_files.discard(file_path)
+                        self.pending_files.setdefault(file_path, current_time)
+                    continue
+                
+                # 检查文件是否还存在以及大小等过滤条件
+                if not Path(file_path).is_file() or (
+                        self.file_filter and not self.file_filter.accepts_file(file_path, self._root)):
+                    with self.lock:
+                        self.processing_files.discard(file_path)
+                    continue
+                
                 try:
                     print(f"✅ 文件稳定，开始处理: {Path(file_path).name}")
                     self.callback(Path(file_path))
@@ -156,5 +315,5 @@ class FileChangeHandler(FileSystemEventHandler):
         self.watcher.on_file_event(event)
     
     def on_moved(self, event: FileSystemEvent):
-        """文件移动事件（视为新文件）"""
-        self.watcher.on_file_event(event)
+        """文件移动事件（更新为目标路径）"""
+        self.watcher.on_file_moved(event)
@@ -0,0 +1,59 @@
+"""
+文件系统工具模块
+提供崩溃安全的文件写入
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def atomic_write_text(path: str | Path, text: str) -> None:
+    """
+    原子写入文本文件（临时文件 + fsync + rename）
+    写入中途崩溃时，原文件保持完整
+
+    :param path: 目标文件路径
+    :param text: 文件内容
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # 同步目录项，确保 rename 落盘（部分平台不支持打开目录）
+    try:
+        dir_fd = os.open(str(path.parent), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def atomic_write_json(path: str | Path, data: Any, indent: int | None = 2) -> None:
+    """
+    原子写入 JSON 文件
+
+    :param path: 目标文件路径
+    :param data: 可序列化数据
+    :param indent: 缩进（None 表示紧凑格式）
+    """
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
@@ -0,0 +1,183 @@
+"""
+任务登记模块
+按文件路径发放租约，协调实时监控、定时任务、Bot 与 GUI 对同一文件的并发处理
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class PathBusyError(RuntimeError):
+    """文件正被互斥的任务占用"""
+
+
+class PathLease:
+    """单个文件的处理租约"""
+
+    def __init__(self, path: str, kind: str, owner: str):
+        """
+        初始化租约
+
+        :param path: 文件绝对路径
+        :param kind: 任务类型（check=检测，move=移动/复制）
+        :param owner: 持有者（线程名）
+        """
+        self.path = path
+        self.kind = kind
+        self.owner = owner
+        self.started = time.time()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        """等待租约结束并返回持有者的结果"""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class JobRegistry:
+    """
+    进程内任务登记表（每个文件同一时间只有一个租约）
+
+    一个文件的完整处理（检测后放置）在 hold 内进行：排空开始后不再接受新的处理，
+    已开始的处理仍可申请后续租约（如检测完成后的移动），wait_idle 会等待其全部结束
+    """
+
+    def __init__(self):
+        """初始化任务登记表"""
+        self.lock = threading.Lock()
+        self.leases: Dict[str, PathLease] = {}
+        self.holds = 0
+        self.coalesced = 0
+        self.draining = False
+        self.idle = threading.Condition(self.lock)
+        self._local = threading.local()
+
+    @contextmanager
+    def hold(self) -> Iterator[bool]:
+        """
+        登记当前线程正在处理一个文件（可嵌套）
+
+        :return: 是否被接受（正在排空时为 False，调用方应跳过该文件）
+        """
+        depth = getattr(self._local, 'depth', 0)
+        with self.lock:
+            admitted = depth > 0 or not self.draining
+            if admitted:
+                self.holds += 1
+        if not admitted:
+            yield False
+            return
+
+        self._local.depth = depth + 1
+        try:
+            yield True
+        finally:
+            self._local.depth = depth
+            with self.lock:
+                self.holds -= 1
+                self._notify_if_idle()
+
+    def _notify_if_idle(self):
+        """没有租约和进行中的处理时唤醒 wait_idle（需持有锁）"""
+        if not self.leases and not self.holds:
+            self.idle.notify_all()
+
+    def run(self, path: str | Path, kind: str, func: Callable[[], Any],
+            conflicts: Tuple[str, ...] = ()) -> Any:
+        """
+        在租约保护下执行任务
+
+        - 同类任务正在执行：等待并复用其结果（合并重复工作）
+        - 互斥任务正在执行：抛出 PathBusyError
+        - 其他任务正在执行：等待其结束后再获取租约
+        - 正在排空（准备退出）：hold 之外不再发放新租约，抛出 PathBusyError
+
+        :param path: 文件路径
+        :param kind: 任务类型
+        :param func: 任务函数
+        :param conflicts: 与本任务互斥的任务类型
+        :return: 任务结果
+        """
+        key = str(Path(path).absolute())
+
+        while True:
+            with self.lock:
+                current = self.leases.get(key)
+                if current is None:
+                    if self.draining and not getattr(self._local, 'depth', 0):
+                        raise PathBusyError(f"正在停止，不再接受新任务: {Path(key).name}")
+                    lease = PathLease(key, kind, threading.current_thread().name)
+                    self.leases[key] = lease
+                    break
+                if current.kind == kind:
+                    self.coalesced += 1
+
+            if current.kind in conflicts:
+                raise PathBusyError(f"文件正在{self._describe(current.kind)}: {Path(key).name}")
+
+            if current.kind == kind:
+                return current.wait()
+
+            current.done.wait()
+
+        try:
+            lease.result = func()
+            return lease.result
+        except BaseException as e:
+            lease.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.leases[key]
+                self._notify_if_idle()
+            lease.done.set()
+
+    def drain(self):
+        """进入排空模式：已有租约与已开始的处理继续执行，不再接受新的处理"""
+        with self.lock:
+            self.draining = True
+
+    def wait_idle(self, timeout: float) -> bool:
+        """
+        等待所有租约与进行中的处理结束
+
+        :param timeout: 最长等待时间（秒）
+        :return: 是否已全部结束
+        """
+        with self.idle:
+            return self.idle.wait_for(lambda: not self.leases and not self.holds, timeout=timeout)
+
+    def is_busy(self, path: str | Path) -> bool:
+        """判断文件是否正在被处理"""
+        return str(Path(path).absolute()) in self.leases
+
+    def active(self) -> List[Dict[str, Any]]:
+        """
+        获取当前所有租约
+
+        :return: 租约信息列表
+        """
+        with self.lock:
+            leases = list(self.leases.values())
+
+        now = time.time()
+        return [
+            {
+                'path': lease.path,
+                'kind': lease.kind,
+                'owner': lease.owner,
+                'elapsed': now - lease.started,
+            }
+            for lease in leases
+        ]
+
+    @staticmethod
+    def _describe(kind: str) -> str:
+        return {'check': '检测', 'move': '移动'}.get(kind, kind)
@@ -0,0 +1,373 @@
+"""
+任务调度模块
+按固定间隔或 cron 表达式独立调度多个后台任务
+"""
+
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class JobBusyError(RuntimeError):
+    """任务正在运行"""
+
+
+class CronExpression:
+    """
+    cron 表达式（分 时 日 月 周）
+
+    支持 *、数字、范围（1-5）、步长（*/15、0-30/5）和列表（1,15）；
+    周字段 0 和 7 都表示周日
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        """
+        解析 cron 表达式
+
+        :param expression: cron 表达式，如 "0 */6 * * *"
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式需要 5 个字段: {expression}")
+
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high)
+                  for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+
+        # 日和周同时受限时，满足任一即可（与标准 cron 一致）
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        """解析单个字段"""
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+                if step <= 0:
+                    raise ValueError(f"cron 步长必须大于 0: {field}")
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_str, end_str = part.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"cron 字段超出范围 [{low}-{high}]: {field}")
+
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        """判断日期是否匹配（日/周）"""
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        计算下一次触发时间
+
+        :param timestamp: 起始时间戳
+        :return: 严格晚于起始时间的下一次触发时间戳
+        """
+        dt = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+
+        while dt < limit:
+            if dt.month not in self.months:
+                year = dt.year + (dt.month // 12)
+                month = dt.month % 12 + 1
+                dt = dt.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt.timestamp()
+
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expression}")
+
+
+class ScheduledJob:
+    """调度任务"""
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: Optional[int] = None,
+                 cron: Optional[str] = None, jitter: int = 0, run_at_start: bool = True,
+                 description: str = ''):
+        """
+        初始化调度任务
+
+        :param name: 任务名
+        :param func: 任务函数
+        :param interval: 运行间隔（秒），与 cron 二选一
+        :param cron: cron 表达式
+        :param jitter: 随机延迟上限（秒），避免多个任务同时触发
+        :param run_at_start: 启动后是否立即运行一次
+        :param description: 任务描述（用于状态显示）
+        """
+        if interval is None and cron is None:
+            raise ValueError(f"任务 {name} 需要配置 interval 或 cron")
+
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cron = CronExpression(cron) if cron else None
+        self.jitter = jitter
+        self.description = description or name
+
+        self.running = False
+        self.next_run = time.time() if run_at_start else self._compute_next(time.time())
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_result: Any = None
+
+    def _compute_next(self, after: float) -> float:
+        """计算下一次运行时间（含随机延迟）"""
+        if self.cron:
+            next_run = self.cron.next_after(after)
+        else:
+            next_run = after + self.interval
+
+        if self.jitter:
+            next_run += random.uniform(0, self.jitter)
+        return next_run
+
+    def set_schedule(self, interval: Optional[int] = None, cron: Optional[str] = None, jitter: int = 0):
+        """
+        修改调度规则，按新规则从上次运行（或现在）重新计算下一次运行时间
+
+        :param interval: 运行间隔（秒），与 cron 二选一
+        :param cron: cron 表达式
+        :param jitter: 随机延迟上限（秒）
+        """
+        if interval is None and cron is None:
+            raise ValueError(f"任务 {self.name} 需要配置 interval 或 cron")
+        expression = CronExpression(cron) if cron else None
+        self.interval = interval
+        self.cron = expression
+        self.jitter = jitter
+        if not self.running:
+            self.next_run = max(self._compute_next(self.last_run or time.time()), time.time())
+
+    def schedule_after(self, finished: float):
+        """任务结束后安排下一次运行"""
+        self.next_run = self._compute_next(finished)
+
+    def describe_schedule(self) -> str:
+        """调度规则描述"""
+        if self.cron:
+            return f"cron: {self.cron.expression}"
+        if self.interval >= 3600:
+            return f"每 {self.interval / 3600:.1f} 小时"
+        if self.interval < 60:
+            return f"每 {self.interval} 秒"
+        return f"每 {self.interval / 60:.0f} 分钟"
+
+
+class JobScheduler:
+    """
+    后台任务调度器
+
+    每个任务独立计时，在各自的线程中运行；同一任务不会重叠执行，
+    到期时若上一次仍在运行则顺延
+    """
+
+    def __init__(self):
+        """初始化调度器"""
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.workers: Dict[str, threading.Thread] = {}
+
+    def add_job(self, name: str, func: Callable[[], Any], **kwargs) -> ScheduledJob:
+        """
+        注册任务
+
+        :param name: 任务名
+        :param func: 任务函数
+        :return: 调度任务
+        """
+        job = ScheduledJob(name, func, **kwargs)
+        with self.lock:
+            self.jobs[name] = job
+        self.wakeup.set()
+        return job
+
+    def reschedule(self, name: str, interval: Optional[int] = None, cron: Optional[str] = None,
+                   jitter: int = 0) -> bool:
+        """
+        修改已注册任务的调度规则
+
+        :param name: 任务名
+        :return: 任务是否存在
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None:
+                return False
+            job.set_schedule(interval=interval, cron=cron, jitter=jitter)
+        self.wakeup.set()
+        return True
+
+    def remove_job(self, name: str) -> bool:
+        """
+        移除任务（正在运行的本次执行不受影响）
+
+        :param name: 任务名
+        :return: 任务是否存在
+        """
+        with self.lock:
+            return self.jobs.pop(name, None) is not None
+
+    def start(self):
+        """启动调度线程"""
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 2):
+        """
+        停止调度（不再触发新任务）
+
+        :param timeout: 等待调度线程退出的时间
+        """
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def trigger(self, name: str) -> bool:
+        """
+        立即触发任务（在后台运行）
+
+        :param name: 任务名
+        :return: 是否已安排（任务不存在或正在运行时返回 False）
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None or job.running:
+                return False
+            job.next_run = time.time()
+        self.wakeup.set()
+        return True
+
+    def run_now(self, name: str) -> Any:
+        """
+        在当前线程立即运行任务并返回结果
+
+        :param name: 任务名
+        :return: 任务函数的返回值
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None:
+                raise KeyError(f"任务不存在: {name}")
+            if job.running:
+                raise JobBusyError(f"任务正在运行: {job.description}")
+            job.running = True
+
+        return self._execute(job, reraise=True)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        查询所有任务状态
+
+        :return: 任务状态列表（含下一次运行时间）
+        """
+        with self.lock:
+            return [
+                {
+                    'name': job.name,
+                    'description': job.description,
+                    'schedule': job.describe_schedule(),
+                    'running': job.running,
+                    'next_run': job.next_run,
+                    'last_run': job.last_run,
+                    'last_duration': job.last_duration,
+                    'last_error': job.last_error,
+                }
+                for job in self.jobs.values()
+            ]
+
+    def next_run(self, name: str) -> Optional[float]:
+        """
+        查询任务下一次运行时间
+
+        :param name: 任务名
+        :return: 时间戳，任务不存在时返回 None
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            return job.next_run if job else None
+
+    def _loop(self):
+        """调度循环：睡眠到最近一个任务到期或被唤醒"""
+        while self.running:
+            now = time.time()
+            wait_seconds = 60.0
+
+            with self.lock:
+                for job in self.jobs.values():
+                    if job.running:
+                        continue
+                    if job.next_run <= now:
+                        job.running = True
+                        worker = threading.Thread(
+                            target=self._execute, args=(job,),
+                            name=f"job-{job.name}", daemon=True
+                        )
+                        self.workers[job.name] = worker
+                        worker.start()
+                    else:
+                        wait_seconds = min(wait_seconds, job.next_run - now)
+
+            self.wakeup.wait(timeout=max(wait_seconds, 0.1))
+            self.wakeup.clear()
+
+    def _execute(self, job: ScheduledJob, reraise: bool = False) -> Any:
+        """执行任务并安排下一次运行（调用前 job.running 已置位）"""
+        started = time.time()
+        try:
+            job.last_result = job.func()
+            job.last_error = None
+            return job.last_result
+        except Exception as e:
+            job.last_error = str(e)
+            if reraise:
+                raise
+            print(f"❌ 任务 {job.description} 失败: {e}")
+            traceback.print_exc()
+        finally:
+            finished = time.time()
+            with self.lock:
+                job.last_run = started
+                job.last_duration = finished - started
+                job.schedule_after(finished)
+                job.running = False
+            self.wakeup.set()
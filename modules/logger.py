@@ -1,17 +1,199 @@
 """
 日志模块
 负责记录操作日志、生成报告
+
+日志记录只放入队列，格式化、着色输出与写文件都在后台线程完成，
+不占用哈希计算与接口请求所在的工作线程
+
+logging.format 为 json 时日志文件每行一个 JSON 对象，附带任务编号、文件编号、
+阶段、耗时、字节数与 115 状态码等字段，便于日志平台统计吞吐与延迟
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Dict, Any, Iterator, Optional
 from colorama import Fore, Style, init
 
 # 初始化colorama
 init(autoreset=True)
 
+# 日志队列上限（磁盘阻塞时超出的日志被丢弃，不阻塞工作线程）
+LOG_QUEUE_SIZE = 10000
+
+
+class DailyRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    按天切换的日志文件（rapid_upload_YYYYMMDD.log）
+
+    - 跨天时切换到新文件
+    - 单个文件超过 max_bytes 时，将其改名为 rapid_upload_YYYYMMDD_HHMMSS.log 后重新开始
+    - 每次切换时删除修改时间早于 retention_days 天的日志
+    """
+
+    def __init__(self, log_dir: str | Path, prefix: str = 'rapid_upload',
+                 max_bytes: int = 0, retention_days: int = 30):
+        """
+        初始化日志文件处理器
+
+        :param log_dir: 日志目录
+        :param prefix: 文件名前缀
+        :param max_bytes: 单个文件大小上限（0 表示不限）
+        :param retention_days: 保留天数（0 表示不删除）
+        """
+        self.log_dir = Path(log_dir)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.day = self._today()
+        super().__init__(self._path_for(self.day), 'a', encoding='utf-8')
+        self._purge()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime('%Y%m%d')
+
+    def _path_for(self, day: str) -> Path:
+        return self.log_dir / f"{self.prefix}_{day}.log"
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """跨天或文件超过大小上限时切换"""
+        if self._today() != self.day:
+            return True
+        if self.max_bytes and self.stream is not None:
+            self.stream.seek(0, 2)
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        """切换日志文件"""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        today = self._today()
+        if today == self.day:
+            # 同一天内超过大小上限：当前文件改名归档
+            stamp = f"{self.prefix}_{today}_{datetime.now().strftime('%H%M%S')}"
+            archived = self.log_dir / f"{stamp}.log"
+            suffix = 1
+            while archived.exists():
+                archived = self.log_dir / f"{stamp}_{suffix}.log"
+                suffix += 1
+            try:
+                os.replace(self.baseFilename, archived)
+            except OSError:
+                pass
+        self.day = today
+        self.baseFilename = os.path.abspath(self._path_for(today))
+        self.stream = self._open()
+        self._purge()
+
+    def _purge(self):
+        """删除超过保留天数的日志"""
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for log_file in self.log_dir.glob(f"{self.prefix}_*.log"):
+            try:
+                if log_file.stat().st_mtime < cutoff:
+                    log_file.unlink()
+            except OSError:
+                continue
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃日志并计数，不阻塞调用线程"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        同一进程内的队列直接传递原始记录，消息拼接留给后台线程
+        （默认实现会在调用线程中先格式化一遍）
+        """
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 当前线程的日志上下文（任务编号、文件编号等），由 Logger.context 设置
+_context = threading.local()
+
+
+def _attach_context(record: logging.LogRecord) -> bool:
+    """在调用线程中把当前上下文附加到日志记录上"""
+    record.context = getattr(_context, 'fields', None)
+    return True
+
+
+class _JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON（上下文字段与调用时的字段合并在顶层）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _not_event(record: logging.LogRecord) -> bool:
+    """结构化事件只写入 JSON 日志"""
+    return not getattr(record, 'event', False)
+
+
+class _ColorFormatter(logging.Formatter):
+    """控制台着色：优先使用调用时指定的颜色，否则按级别着色"""
+
+    LEVEL_COLORS = {logging.WARNING: Fore.YELLOW, logging.ERROR: Fore.RED, logging.CRITICAL: Fore.RED}
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        color = getattr(record, 'color', None) or self.LEVEL_COLORS.get(record.levelno)
+        return f"{color}{message}{Style.RESET_ALL}" if color else message
+
+
+def _console_filter(record: logging.LogRecord) -> bool:
+    """关闭控制台输出时仍显示警告、错误与着色的成功信息"""
+    return record.levelno >= logging.WARNING or getattr(record, 'color', None) is not None
+
+
+# 当前的后台日志线程（重新创建 Logger 时先停止旧线程）
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener():
+    """停止后台日志线程（写完队列中剩余的日志）"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
 
 class Logger:
     """日志管理器"""
@@ -22,6 +204,8 @@ class Logger:
         
         :param config: 日志配置
         """
+        global _listener
+        
         self.config = config
         self.log_dir = Path(config.get('log_dir', './logs'))
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -29,73 +213,158 @@ class Logger:
         # 创建日志记录器
         self.logger = logging.getLogger('RapidUploadTool')
         self.logger.setLevel(getattr(logging, config.get('level', 'INFO')))
+        self.logger.propagate = False
         
         # 清除已有的处理器
+        _stop_listener()
         self.logger.handlers.clear()
         
+        handlers = []
+        
         # 控制台处理器
-        if config.get('console_output', True):
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
-            console_formatter = logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%H:%M:%S'
-            )
-            console_handler.setFormatter(console_formatter)
-            self.logger.addHandler(console_handler)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(_ColorFormatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%H:%M:%S'
+        ))
+        console_handler.addFilter(_not_event)
+        if not config.get('console_output', True):
+            console_handler.addFilter(_console_filter)
+        handlers.append(console_handler)
         
-        # 文件处理器
+        # 日志文件格式：text（默认）/ json
+        self.json_format = config.get('format', 'text') == 'json'
+        
+        # 文件处理器（按天切换，超过大小上限时切分，超过保留天数的自动删除）
         if config.get('file_output', True):
-            log_file = self.log_dir / f"rapid_upload_{datetime.now().strftime('%Y%m%d')}.log"
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(logging.DEBUG)
-            file_formatter = logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
+            file_handler = DailyRotatingFileHandler(
+                self.log_dir,
+                max_bytes=int(config.get('max_log_size', 100) * 1024 * 1024),
+                retention_days=config.get('max_log_files', 30)
             )
+            file_handler.setLevel(logging.DEBUG)
+            if self.json_format:
+                file_formatter = _JsonFormatter()
+            else:
+                file_formatter = logging.Formatter(
+                    '%(asctime)s - %(levelname)s - %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S'
+                )
             file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
+            handlers.append(file_handler)
+        
+        # 工作线程只把日志放入队列，由后台线程输出
+        self.queue_handler = _DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.queue_handler.addFilter(_attach_context)
+        self.logger.addHandler(self.queue_handler)
+        _listener = logging.handlers.QueueListener(
+            self.queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
         
-        # 文件记录列表
-        self.rapid_files: List[Dict[str, Any]] = []
-        self.non_rapid_files: List[Dict[str, Any]] = []
-        self.failed_files: List[Dict[str, Any]] = []
+        # 本轮计数（明细逐条写入运行报告，内存中只保留计数，常驻运行时不会增长）
+        self.counts: Dict[str, int] = {'rapid': 0, 'non_rapid': 0, 'failed': 0}
     
-    def info(self, message: str, color: str = None):
-        """记录INFO级别日志"""
+    def set_level(self, level: str):
+        """
+        修改日志级别（配置重新加载时调用）
+        
+        :param level: 级别名称（DEBUG / INFO / WARNING / ERROR）
+        """
+        self.logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    
+    @contextmanager
+    def context(self, **fields) -> Iterator[None]:
+        """
+        在当前线程内为之后的日志附加字段（如 job、file），退出时恢复
+        
+        :param fields: 附加字段
+        """
+        previous = getattr(_context, 'fields', None)
+        _context.fields = {**(previous or {}), **fields}
+        try:
+            yield
+        finally:
+            _context.fields = previous
+    
+    @staticmethod
+    def context_value(key: str) -> Any:
+        """
+        当前线程日志上下文中的字段
+        
+        :param key: 字段名
+        :return: 字段值，未设置时为 None
+        """
+        return (getattr(_context, 'fields', None) or {}).get(key)
+    
+    def _log(self, level: int, message: str, args: tuple, fields: Dict[str, Any],
+             color: Optional[str] = None, event: bool = False):
+        """
+        记录日志（级别未启用时直接返回；message 中的 %s 由后台线程用 args 填充）
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        extra = {'fields': fields}
         if color:
-            print(f"{color}{message}{Style.RESET_ALL}")
-        self.logger.info(message)
+            extra['color'] = color
+        if event:
+            extra['event'] = True
+        self.logger.log(level, message, *args, extra=extra)
     
-    def debug(self, message: str):
+    def info(self, message: str, *args, color: str = None, **fields):
+        """记录INFO级别日志"""
+        self._log(logging.INFO, message, args, fields, color)
+    
+    def debug(self, message: str, *args, **fields):
         """记录DEBUG级别日志"""
-        self.logger.debug(message)
+        self._log(logging.DEBUG, message, args, fields)
     
-    def warning(self, message: str):
+    def warning(self, message: str, *args, **fields):
         """记录WARNING级别日志"""
-        print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}")
-        self.logger.warning(message)
+        self._log(logging.WARNING, message, args, fields)
     
-    def error(self, message: str):
+    def error(self, message: str, *args, **fields):
         """记录ERROR级别日志"""
-        print(f"{Fore.RED}{message}{Style.RESET_ALL}")
-        self.logger.error(message)
+        self._log(logging.ERROR, message, args, fields)
     
-    def success(self, message: str):
+    def success(self, message: str, *args, **fields):
         """记录成功信息"""
-        self.info(message, Fore.GREEN)
+        self._log(logging.INFO, message, args, fields, Fore.GREEN)
     
-    def add_rapid_file(self, file_info: Dict[str, Any]):
-        """添加可秒传文件记录"""
-        self.rapid_files.append(file_info)
+    def event(self, stage: str, message: str, *args, **fields):
+        """
+        记录结构化事件（仅 JSON 日志输出，text 格式下不产生任何开销）
+        
+        :param stage: 处理阶段
+        :param message: 消息
+        :param fields: 事件字段（bytes、duration_ms、status 等）
+        """
+        if self.json_format:
+            self._log(logging.INFO, message, args, {'stage': stage, **fields}, event=True)
     
-    def add_non_rapid_file(self, file_info: Dict[str, Any]):
-        """添加不可秒传文件记录"""
-        self.non_rapid_files.append(file_info)
+    def flush(self, timeout: float = 2.0):
+        """
+        等待后台线程输出队列中已有的日志（直接 print 的摘要不会插到日志前面）
+        
+        :param timeout: 最长等待秒数
+        """
+        log_queue = self.queue_handler.queue
+        deadline = time.monotonic() + timeout
+        while _listener is not None and log_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
     
-    def add_failed_file(self, file_info: Dict[str, Any]):
-        """添加失败文件记录"""
-        self.failed_files.append(file_info)
+    def begin_pass(self):
+        """开始新一轮处理（计数清零）"""
+        self.counts = dict.fromkeys(self.counts, 0)
+    
+    def count_result(self, category: str):
+        """
+        本轮处理结果计数（每个文件的明细由运行报告记录）
+        
+        :param category: 结果类别（rapid / non_rapid / failed）
+        """
+        self.counts[category] += 1
     
     def print_summary(self, start_time: datetime, end_time: datetime):
         """
@@ -105,13 +374,14 @@ class Logger:
         :param end_time: 结束时间
         """
         duration = (end_time - start_time).total_seconds()
+        self.flush()
         
         print("\n" + "=" * 60)
         print(f"{Fore.CYAN}处理完成！{Style.RESET_ALL}")
         print("=" * 60)
         print(f"总耗时: {duration:.2f} 秒")
-        print(f"{Fore.GREEN}✓ 可秒传文件: {len(self.rapid_files)} 个{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}○ 不可秒传文件: {len(self.non_rapid_files)} 个{Style.RESET_ALL}")
-        print(f"{Fore.RED}✗ 失败文件: {len(self.failed_files)} 个{Style.RESET_ALL}")
-        print(f"总处理文件: {len(self.rapid_files) + len(self.non_rapid_files) + len(self.failed_files)} 个")
+        print(f"{Fore.GREEN}✓ 可秒传文件: {self.counts['rapid']} 个{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}○ 不可秒传文件: {self.counts['non_rapid']} 个{Style.RESET_ALL}")
+        print(f"{Fore.RED}✗ 失败文件: {self.counts['failed']} 个{Style.RESET_ALL}")
+        print(f"总处理文件: {sum(self.counts.values())} 个")
         print("=" * 60)
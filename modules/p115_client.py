@@ -6,7 +6,12 @@
 import time
 from pathlib import Path
 from typing import Dict, Any, Optional
-from p115client import P115Client, check_response
+
+
+def check_response(resp):
+    """校验 115 接口响应（p115client 导入耗时较长，首次使用时才导入）"""
+    from p115client import check_response as _check_response
+    return _check_response(resp)
 
 
 class P115ClientWrapper:
@@ -19,13 +24,28 @@ class P115ClientWrapper:
         :param config: 115配置
         """
         self.config = config
-        cookies_file = Path(config.get('cookies_file', '~/115-cookies.txt')).expanduser()
-        check_for_relogin = config.get('check_for_relogin', True)
-        
-        # 创建客户端
-        self.client = P115Client(cookies_file, check_for_relogin=check_for_relogin)
+        self._client = None
         
         # 性能配置
+        self.apply_config(config)
+    
+    @property
+    def client(self):
+        """115 客户端（首次访问时导入 p115client 并创建）"""
+        if self._client is None:
+            from p115client import P115Client
+            
+            cookies_file = Path(self.config.get('cookies_file', '~/115-cookies.txt')).expanduser()
+            check_for_relogin = self.config.get('check_for_relogin', True)
+            self._client = P115Client(cookies_file, check_for_relogin=check_for_relogin)
+        return self._client
+    
+    def apply_config(self, config: Dict[str, Any]):
+        """
+        应用可在运行中修改的配置（超时与重试；Cookies 变化需重启）
+        
+        :param config: 115 配置（含性能配置）
+        """
         self.request_timeout = config.get('request_timeout', 10)
         self.retry_times = config.get('retry_times', 3)
         self.retry_delay = config.get('retry_delay', 2)
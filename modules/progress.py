@@ -0,0 +1,90 @@
+"""
+进度跟踪模块
+记录一轮处理的进度（文件数、字节数、速度、剩余时间），并支持请求取消
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class PassProgress:
+    """
+    一轮处理的进度
+
+    处理循环（工作线程）更新进度，Bot 等调用方在其他线程读取并可请求取消；
+    取消在当前文件处理完成后生效
+    """
+
+    def __init__(self, job_id: str, name: str, description: str):
+        """
+        初始化进度
+
+        :param job_id: 任务编号
+        :param name: 任务名（scan_input / recheck）
+        :param description: 任务描述
+        """
+        self.job_id = job_id
+        self.name = name
+        self.description = description
+        self.total: Optional[int] = None
+        self.done = 0
+        self.bytes_done = 0
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+
+    def start(self, total: int):
+        """
+        文件列表已确定，开始计数
+
+        :param total: 文件总数
+        """
+        self.total = total
+        self.done = 0
+        self.bytes_done = 0
+        self.started = time.time()
+
+    def advance(self, size: int = 0):
+        """
+        完成一个文件
+
+        :param size: 文件大小（字节）
+        """
+        self.done += 1
+        self.bytes_done += size
+
+    def finish(self):
+        """标记结束"""
+        self.finished = time.time()
+
+    def cancel(self):
+        """请求取消"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self._cancel.is_set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        当前进度
+
+        :return: 进度信息（rate 单位为字节/秒，eta 单位为秒，无法估计时为 None）
+        """
+        elapsed = max((self.finished or time.time()) - self.started, 1e-6)
+        rate = self.bytes_done / elapsed
+        eta = None
+        if self.total and self.done:
+            eta = (self.total - self.done) * elapsed / self.done
+        return {
+            'job_id': self.job_id,
+            'total': self.total,
+            'done': self.done,
+            'bytes_done': self.bytes_done,
+            'elapsed': elapsed,
+            'rate': rate,
+            'eta': eta,
+            'cancelled': self.cancelled,
+        }
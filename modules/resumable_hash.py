@@ -0,0 +1,186 @@
+"""
+可续算哈希模块
+SHA-1 中间状态可序列化，大文件哈希中断后从上次检查点继续
+"""
+
+import ctypes
+import ctypes.util
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .fs_utils import atomic_write_json
+
+
+class _SHA_CTX(ctypes.Structure):
+    """OpenSSL SHA_CTX 结构（h0-h4、位长度低/高 32 位、未处理数据块、块内偏移）"""
+    _fields_ = [
+        ('h', ctypes.c_uint32 * 5),
+        ('Nl', ctypes.c_uint32),
+        ('Nh', ctypes.c_uint32),
+        ('data', ctypes.c_uint32 * 16),
+        ('num', ctypes.c_uint32),
+    ]
+
+
+def _load_libcrypto():
+    """加载 libcrypto 的 SHA1 低层接口，不可用时返回 None"""
+    name = ctypes.util.find_library('crypto')
+    if not name:
+        return None
+    try:
+        lib = ctypes.CDLL(name)
+        lib.SHA1_Init.argtypes = [ctypes.POINTER(_SHA_CTX)]
+        lib.SHA1_Update.argtypes = [ctypes.POINTER(_SHA_CTX), ctypes.c_char_p, ctypes.c_size_t]
+        lib.SHA1_Final.argtypes = [ctypes.c_char_p, ctypes.POINTER(_SHA_CTX)]
+        for func in (lib.SHA1_Init, lib.SHA1_Update, lib.SHA1_Final):
+            func.restype = ctypes.c_int
+        return lib
+    except (OSError, AttributeError):
+        return None
+
+
+_libcrypto = _load_libcrypto()
+
+
+class ResumableSHA1:
+    """
+    状态可导出的 SHA-1
+
+    使用 OpenSSL 的 SHA1 实现（与 hashlib 同源、同速度），
+    在 64 字节块边界处导出 {h: [h0..h4], length: 已处理字节数} 作为检查点
+    """
+
+    BLOCK_SIZE = 64
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        """
+        初始化哈希对象
+
+        :param state: 检查点状态，为空则从头计算
+        """
+        if _libcrypto is None:
+            raise RuntimeError("未找到 libcrypto，无法使用可续算哈希")
+
+        self._ctx = _SHA_CTX()
+        _libcrypto.SHA1_Init(ctypes.byref(self._ctx))
+        self.length = 0
+
+        if state:
+            length = int(state['length'])
+            if length % self.BLOCK_SIZE:
+                raise ValueError("检查点必须位于 64 字节块边界")
+            for i, value in enumerate(state['h']):
+                self._ctx.h[i] = value
+            bits = length * 8
+            self._ctx.Nl = bits & 0xFFFFFFFF
+            self._ctx.Nh = bits >> 32
+            self.length = length
+
+    @staticmethod
+    def available() -> bool:
+        """当前环境是否支持可续算哈希"""
+        return _libcrypto is not None
+
+    def update(self, data: bytes):
+        """追加数据"""
+        _libcrypto.SHA1_Update(ctypes.byref(self._ctx), data, len(data))
+        self.length += len(data)
+
+    def state(self) -> Dict[str, Any]:
+        """
+        导出检查点状态（仅在块边界处可用）
+
+        :return: {h: [h0..h4], length: 已处理字节数}
+        """
+        if self.length % self.BLOCK_SIZE:
+            raise ValueError("只能在 64 字节块边界导出状态")
+        return {'h': list(self._ctx.h), 'length': self.length}
+
+    def hexdigest(self) -> str:
+        """计算最终哈希（不改变当前对象状态）"""
+        ctx = _SHA_CTX.from_buffer_copy(self._ctx)
+        out = ctypes.create_string_buffer(20)
+        _libcrypto.SHA1_Final(out, ctypes.byref(ctx))
+        return out.raw.hex()
+
+
+class HashProgressStore:
+    """哈希进度存储（按文件 stat 身份记录已处理的字节数与中间状态）"""
+
+    def __init__(self, progress_file: str | Path, max_age_days: int = 7):
+        """
+        初始化进度存储
+
+        :param progress_file: 进度文件路径
+        :param max_age_days: 超过该天数未更新的进度视为失效
+        """
+        self.progress_file = Path(progress_file)
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def identity(stat) -> str:
+        """
+        文件身份（设备、inode、大小、修改时间），任一变化则进度失效
+
+        :param stat: os.stat_result
+        :return: 身份字符串
+        """
+        return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        """加载进度（需在锁内调用），顺带清理过期条目"""
+        if self._entries is None:
+            entries = {}
+            if self.progress_file.exists():
+                try:
+                    with open(self.progress_file, 'r', encoding='utf-8') as f:
+                        entries = json.load(f)
+                except (OSError, ValueError):
+                    entries = {}
+            now = time.time()
+            self._entries = {
+                key: entry for key, entry in entries.items()
+                if now - entry.get('updated', 0) < self.max_age
+            }
+        return self._entries
+
+    def get(self, identity: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文件的哈希进度
+
+        :param identity: 文件身份
+        :return: {path, h, length, updated}，不存在时返回 None
+        """
+        with self.lock:
+            entry = self._ensure_loaded().get(identity)
+            return dict(entry) if entry else None
+
+    def save(self, identity: str, path: str, state: Dict[str, Any]):
+        """
+        保存检查点
+
+        :param identity: 文件身份
+        :param path: 文件路径（仅用于查看）
+        :param state: ResumableSHA1.state() 的结果
+        """
+        with self.lock:
+            entries = self._ensure_loaded()
+            entries[identity] = {'path': path, **state, 'updated': time.time()}
+            atomic_write_json(self.progress_file, entries, indent=None)
+
+    def remove(self, identity: str):
+        """删除进度（哈希完成后调用）"""
+        with self.lock:
+            entries = self._ensure_loaded()
+            if entries.pop(identity, None) is not None:
+                atomic_write_json(self.progress_file, entries, indent=None)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """获取所有未完成的哈希进度"""
+        with self.lock:
+            return [dict(entry) for entry in self._ensure_loaded().values()]
@@ -0,0 +1,179 @@
+"""
+运行报告模块
+每轮处理生成一个报告文件（JSONL 或 CSV），逐个文件缓冲写入、定期落盘；
+结束时向索引文件追加一行本轮汇总，可流式读取历史运行而无需加载全部报告
+"""
+
+import csv
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+# 报告中每个文件的字段
+REPORT_FIELDS = ['time', 'path', 'size', 'sha1', 'status', 'latency', 'action', 'target', 'note']
+
+# 各轮汇总的索引文件名
+INDEX_FILE = 'index.jsonl'
+
+# 进程内的运行序号（同一秒内开始的多轮处理使用不同的报告文件）
+_run_numbers = itertools.count(1)
+
+
+class RunReport:
+    """单轮处理的报告"""
+
+    def __init__(self, report_dir: str | Path, kind: str, fmt: str = 'jsonl',
+                 flush_interval: float = 5, flush_every: int = 100):
+        """
+        初始化报告（首条结果写入时才创建文件）
+
+        :param report_dir: 报告目录
+        :param kind: 处理类型（manual / scan_input / recheck）
+        :param fmt: 报告格式（jsonl / csv）
+        :param flush_interval: 缓冲写盘间隔（秒）
+        :param flush_every: 缓冲达到多少条时写盘
+        """
+        self.report_dir = Path(report_dir)
+        self.kind = kind
+        self.fmt = 'csv' if fmt == 'csv' else 'jsonl'
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+
+        self.started = time.time()
+        self.run_id = f"{datetime.fromtimestamp(self.started).strftime('%Y%m%d_%H%M%S')}_{kind}_{os.getpid()}_{next(_run_numbers)}"
+        self.path = self.report_dir / f"run_{self.run_id}.{self.fmt}"
+        self.counts: Dict[str, int] = {}
+        self.total_bytes = 0
+
+        self.lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._file: Optional[TextIO] = None
+        self._last_flush = time.monotonic()
+
+    def add(self, path: str | Path, size: int = 0, sha1: str = '', status: str = '',
+            latency: float = 0.0, action: str = '', target: str | Path = '', note: str = ''):
+        """
+        记录一个文件的处理结果
+
+        :param path: 文件路径
+        :param size: 文件大小
+        :param sha1: SHA-1
+        :param status: 结果（rapid / non_rapid / failed / skipped）
+        :param latency: 检测耗时（秒）
+        :param action: 执行的操作（move / copy / hardlink / ... ，未放置时为空）
+        :param target: 放置后的路径
+        :param note: 备注
+        """
+        row = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'path': str(path),
+            'size': size,
+            'sha1': sha1,
+            'status': status,
+            'latency': round(latency, 3),
+            'action': action,
+            'target': str(target) if target else '',
+            'note': note,
+        }
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.total_bytes += size
+            self._buffer.append(row)
+            if (len(self._buffer) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self):
+        """写出缓冲（需持有锁）"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+
+        try:
+            if self._file is None:
+                self.report_dir.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8', newline='')
+                if self.fmt == 'csv':
+                    csv.DictWriter(self._file, REPORT_FIELDS).writeheader()
+
+            if self.fmt == 'csv':
+                out = io.StringIO()
+                csv.DictWriter(out, REPORT_FIELDS).writerows(self._buffer)
+                self._file.write(out.getvalue())
+            else:
+                self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in self._buffer))
+            self._file.flush()
+        except OSError as e:
+            print(f"⚠️  写入运行报告失败: {e}")
+        self._buffer.clear()
+
+    def close(self, extra: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        写出剩余结果并向索引追加本轮汇总（没有任何结果时不生成报告）
+
+        :param extra: 附加到汇总中的字段
+        :return: 本轮汇总，没有结果时返回 None
+        """
+        with self.lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+            if not self.counts:
+                return None
+
+            finished = time.time()
+            summary = {
+                'run_id': self.run_id,
+                'kind': self.kind,
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'finished': datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+                'duration': round(finished - self.started, 3),
+                'total': sum(self.counts.values()),
+                'bytes': self.total_bytes,
+                **{status: count for status, count in sorted(self.counts.items())},
+                'report': self.path.name,
+                **(extra or {}),
+            }
+            try:
+                with open(self.report_dir / INDEX_FILE, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"⚠️  写入运行索引失败: {e}")
+            return summary
+
+
+def iter_runs(report_dir: str | Path, kind: Optional[str] = None,
+              since: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐行读取历史运行汇总（不加载各轮报告）
+
+    :param report_dir: 报告目录
+    :param kind: 只返回该类型的运行
+    :param since: 只返回此时间之后开始的运行
+    :return: 汇总迭代器（按写入顺序）
+    """
+    index_file = Path(report_dir) / INDEX_FILE
+    if not index_file.exists():
+        return
+
+    since_text = since.isoformat(timespec='seconds') if since else None
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                # 进程中断时可能留下不完整的最后一行
+                continue
+            if kind is not None and run.get('kind') != kind:
+                continue
+            if since_text is not None and run.get('started', '') < since_text:
+                continue
+            yield run
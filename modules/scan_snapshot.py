@@ -0,0 +1,172 @@
+"""
+目录快照模块
+记录每个目录的修改时间与列举结果，下次扫描时未变化的目录直接使用快照，
+没有新增/删除文件的定时扫描只需对每个目录做一次 stat
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .dir_walker import FileEntry, scandir_lister, walk_files
+from .fs_utils import atomic_write_json
+
+
+class ScanSnapshot:
+    """
+    目录快照
+
+    目录的 mtime 只在其中的条目增删或改名时变化，因此：
+    - 子目录仍需逐个 stat（深层变化不会反映到父目录）
+    - 原地改写的文件大小可能与快照不同，处理时会重新 stat，不影响检测结果
+    """
+
+    # 目录修改时间距列举时间不足该秒数时不信任快照（部分文件系统 mtime 精度只有 1~2 秒）
+    SETTLE_SECONDS = 2
+
+    def __init__(self, snapshot_file: str | Path):
+        """
+        初始化目录快照
+
+        :param snapshot_file: 快照文件路径
+        """
+        self.snapshot_file = Path(snapshot_file)
+        self.lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] | None = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        """加载快照（需在锁内调用）"""
+        if self._entries is None:
+            self._entries = {}
+            if self.snapshot_file.exists():
+                try:
+                    with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    self._entries = {}
+        return self._entries
+
+    def _is_fresh(self, entry: Dict[str, Any] | None, mtime_ns: int) -> bool:
+        """快照条目是否仍然有效"""
+        return (entry is not None and entry['mtime_ns'] == mtime_ns
+                and mtime_ns / 1e9 < entry['scanned'] - self.SETTLE_SECONDS)
+
+    def is_unchanged(self, root: str | os.PathLike,
+                     prune: Optional[Callable[[str], bool]] = None) -> bool:
+        """
+        快速判断目录树自上次遍历后是否没有任何目录发生变化（每个目录一次 stat，不列举）
+
+        :param root: 根目录
+        :param prune: 遍历时跳过的目录（与 walk 保持一致）
+        :return: 是否全部未变化
+        """
+        root = os.path.abspath(root)
+        with self.lock:
+            entries = self._ensure_loaded()
+            if root not in entries:
+                return False
+            stack = [root]
+            dirs = []
+            while stack:
+                dir_path = stack.pop()
+                entry = entries.get(dir_path)
+                if entry is None:
+                    return False
+                dirs.append((dir_path, entry))
+                for name in entry['subdirs']:
+                    subdir = os.path.join(dir_path, name)
+                    if prune is None or not prune(subdir):
+                        stack.append(subdir)
+
+        for dir_path, entry in dirs:
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                return False
+            if not self._is_fresh(entry, mtime_ns):
+                return False
+        return True
+
+    def _list(self, dir_path: str, visited: Set[str]) -> Tuple[List[FileEntry], List[str]]:
+        """
+        列举目录：mtime 未变化时使用快照，否则 scandir 并更新快照
+
+        :param dir_path: 目录路径
+        :param visited: 本次遍历访问过的目录
+        :return: (文件列表, 子目录路径列表)
+        """
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return [], []
+
+        with self.lock:
+            visited.add(dir_path)
+            entry = self._ensure_loaded().get(dir_path)
+
+        if self._is_fresh(entry, mtime_ns):
+            self.hits += 1
+            files = [
+                FileEntry(os.path.join(dir_path, name), name, size, mtime)
+                for name, size, mtime in entry['files']
+            ]
+            subdirs = [os.path.join(dir_path, name) for name in entry['subdirs']]
+            return files, subdirs
+
+        self.misses += 1
+        scanned = time.time()
+        files, subdirs = scandir_lister(dir_path)
+        with self.lock:
+            self._ensure_loaded()[dir_path] = {
+                'mtime_ns': mtime_ns,
+                'scanned': scanned,
+                'count': len(files) + len(subdirs),
+                'files': [[f.name, f.size, f.mtime] for f in files],
+                'subdirs': [os.path.basename(d) for d in subdirs],
+            }
+            self._dirty = True
+        return files, subdirs
+
+    def walk(self, root: str | os.PathLike, workers: int = 4,
+             prune: Optional[Callable[[str], bool]] = None) -> Iterator[FileEntry]:
+        """
+        借助快照递归遍历目录，遍历完成后清理已消失的目录并保存快照
+
+        :param root: 根目录
+        :param workers: 并发列举的线程数
+        :param prune: 返回 True 的子目录不再进入
+        :return: 文件迭代器
+        """
+        root = os.path.abspath(root)
+        visited: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+        yield from walk_files(root, workers=workers, lister=lambda d: self._list(d, visited), prune=prune)
+
+        prefix = root + os.sep
+        with self.lock:
+            entries = self._ensure_loaded()
+            stale = [
+                key for key in entries
+                if (key == root or key.startswith(prefix)) and key not in visited
+            ]
+            for key in stale:
+                del entries[key]
+            if stale:
+                self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """将修改写回磁盘"""
+        with self.lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.snapshot_file, self._entries, indent=None)
+            self._dirty = False
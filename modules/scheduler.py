@@ -11,6 +11,9 @@ from datetime import datetime, timedelta
 from typing import Callable, Dict, Any
 from pathlib import Path
 
+from .config_schema import SHUTDOWN_OVERHEAD, parse_interval
+from .job_scheduler import JobScheduler
+
 
 class Scheduler:
     """任务调度器"""
@@ -29,10 +32,26 @@ class Scheduler:
         # 实时监控配置
         self.watch_enabled = config.get('watch', {}).get('enabled', True)
         self.debounce_seconds = config.get('watch', {}).get('debounce_seconds', 5)
+        self.ignore_patterns = config.get('watch', {}).get('ignore_patterns')
+        self.coalesce_seconds = config.get('watch', {}).get('coalesce_seconds', 1.0)
+        self.queue_file = Path(config.get('watch', {}).get('queue_file', './data/watch_queue.json'))
+        
+        settings = controller.config_manager.settings.scheduler
+        
+        # 停止时等待进行中检测完成的期限（秒），以及整个停止过程的期限（应与 docker stop 的等待时间一致）
+        self.drain_timeout = settings.drain_timeout
+        self.stop_grace_period = settings.stop_grace_period
+        self._stop_deadline = None
         
         # 定时任务配置
-        self.cron_enabled = config.get('cron', {}).get('enabled', True)
-        self.cron_interval = self._parse_interval(config.get('cron', {}).get('interval', '6h'))
+        self.cron_enabled = settings.cron_enabled
+        self.cron_interval = settings.cron_interval
+        self.jobs_config = config.get('jobs', {}) or {}
+        self.job_scheduler = JobScheduler()
+        
+        # 配置热加载（检查配置文件修改的间隔，0 表示禁用）
+        self.reload_interval = config.get('reload_interval', 5)
+        controller.config_manager.add_listener(self._on_config_reload)
         
         # Telegram Bot 配置
         telegram_config = controller.config_manager.get('telegram', {})
@@ -41,41 +60,103 @@ class Scheduler:
         
         # 线程
         self.watch_thread = None
-        self.cron_thread = None
         self.bot_thread = None
+        self.watcher = None
+    
+    def _register_jobs(self):
+        """
+        注册定时任务
+        scheduler.jobs 下可为每个任务单独配置 interval / cron / jitter / enabled，
+        未配置的任务使用 scheduler.cron.interval；
+        重复调用时更新已有任务的调度规则（用于配置热加载）；
+        规则无效的任务保持原有调度（尚未注册的不注册）
+        """
+        jobs = [
+            ('scan_input', self._run_scan_input, '扫描 input'),
+            ('recheck', self._run_recheck, '重检 non_rapid'),
+        ]
         
-        # 上次执行时间
-        self.last_cron_time = None
+        for name, func, description in jobs:
+            job_config = self.jobs_config.get(name, {}) or {}
+            if not job_config.get('enabled', True):
+                self.job_scheduler.remove_job(name)
+                continue
+            
+            cron = job_config.get('cron')
+            interval = None
+            try:
+                if not cron:
+                    interval = parse_interval(job_config['interval']) \
+                        if job_config.get('interval') else self.cron_interval
+                    if interval <= 0:
+                        raise ValueError("时间间隔必须大于 0")
+                
+                if self.job_scheduler.reschedule(name, interval=interval, cron=cron,
+                                                 jitter=job_config.get('jitter', 0)):
+                    continue
+                
+                self.job_scheduler.add_job(
+                    name, func,
+                    interval=interval,
+                    cron=cron,
+                    jitter=job_config.get('jitter', 0),
+                    run_at_start=job_config.get('run_at_start', True),
+                    description=description
+                )
+            except ValueError as e:
+                print(f"⚠️  任务 {description} 的调度规则无效，保持原有调度: {e}")
     
-    def _parse_interval(self, interval_str: str) -> int:
+    def _on_config_reload(self, old_config: Dict[str, Any], new_config: Dict[str, Any]):
         """
-        解析时间间隔字符串
+        配置重新加载后更新定时任务与实时监控参数
+        （监控开关、Bot 开关需重启生效）
         
-        :param interval_str: 时间间隔字符串 (如: "5m", "30m", "1h", "6h")
-        :return: 秒数
+        :param old_config: 旧配置
+        :param new_config: 新配置
         """
-        interval_str = interval_str.strip().lower()
+        config = new_config.get('scheduler', {}) or {}
+        watch_config = config.get('watch', {}) or {}
+        settings = self.controller.config_manager.settings.scheduler
         
-        # 分钟格式: 5m, 30m, 60m
-        if interval_str.endswith('m'):
-            minutes = int(interval_str[:-1])
-            return minutes * 60
+        self.config = config
+        self.debounce_seconds = watch_config.get('debounce_seconds', 5)
+        self.coalesce_seconds = watch_config.get('coalesce_seconds', 1.0)
+        self.ignore_patterns = watch_config.get('ignore_patterns')
+        self.drain_timeout = settings.drain_timeout
+        self.stop_grace_period = settings.stop_grace_period
+        self.cron_enabled = settings.cron_enabled
+        self.cron_interval = settings.cron_interval
+        self.jobs_config = config.get('jobs', {}) or {}
         
-        # 小时格式: 1h, 6h, 24h
-        if interval_str.endswith('h'):
-            hours = int(interval_str[:-1])
-            return hours * 3600
+        if self.running:
+            if self.cron_enabled:
+                self._register_jobs()
+                if not self.job_scheduler.running:
+                    self.job_scheduler.start()
+            else:
+                for job in self.job_scheduler.status():
+                    self.job_scheduler.remove_job(job['name'])
         
-        # 默认 30 分钟
-        return 30 * 60
+        if self.watcher:
+            self.watcher.apply_settings(
+                debounce_seconds=self.debounce_seconds,
+                coalesce_seconds=self.coalesce_seconds,
+                ignore_patterns=self.ignore_patterns,
+                file_filter=self.controller.file_handler.file_filter,
+            )
     
-    def _should_run_cron(self) -> bool:
-        """判断是否应该运行定时任务"""
-        if not self.last_cron_time:
-            return True
+    def run_job_now(self, name: str):
+        """
+        立即运行任务（供 Bot 调用，与定时触发互斥）
         
-        elapsed = time.time() - self.last_cron_time
-        return elapsed >= self.cron_interval
+        :param name: 任务名（scan_input / recheck）
+        :return: 任务结果
+        """
+        return self.job_scheduler.run_now(name)
+    
+    def get_jobs_status(self):
+        """获取各任务的运行状态与下一次运行时间"""
+        return self.job_scheduler.status()
     
     def start(self):
         """启动调度器"""
@@ -104,14 +185,10 @@ class Scheduler:
         
         # 启动定时任务
         if self.cron_enabled:
-            if self.cron_interval >= 3600:
-                cron_hours = self.cron_interval / 3600
-                print(f"✅ 定时任务: 每 {cron_hours:.1f} 小时（扫描 + 重检）")
-            else:
-                cron_minutes = self.cron_interval / 60
-                print(f"✅ 定时任务: 每 {cron_minutes:.0f} 分钟（扫描 + 重检）")
-            self.cron_thread = threading.Thread(target=self._cron_loop, daemon=True)
-            self.cron_thread.start()
+            self._register_jobs()
+            for job in self.job_scheduler.status():
+                print(f"✅ 定时任务: {job['description']}（{job['schedule']}）")
+            self.job_scheduler.start()
         else:
             print("⏸️  定时任务: 已禁用")
         
@@ -123,6 +200,10 @@ class Scheduler:
         else:
             print("⏸️  Telegram Bot: 已禁用")
         
+        if self.reload_interval:
+            self.controller.config_manager.start_watching(self.reload_interval)
+            print(f"✅ 配置热加载: 已启用（每 {self.reload_interval} 秒检查）")
+        
         print("=" * 60)
         print("💡 提示: 使用 docker stop 停止容器")
         print("=" * 60 + "\n")
@@ -138,9 +219,52 @@ class Scheduler:
     def _signal_handler(self, signum, frame):
         """信号处理器（用于 Docker 容器优雅停止）"""
         print(f"\n⏹️  收到信号 {signum}，正在停止...")
+        self.drain()
         self.stop()
         sys.exit(0)
     
+    def drain(self):
+        """
+        排空：停止接收新文件，等待进行中的检测在期限内完成，
+        保存状态记录和待处理队列，下次启动时直接恢复
+        """
+        self._remaining(0)  # 开始计算停止期限
+        print(f"⏳ 等待进行中的检测完成（最多 {self.drain_timeout} 秒）...")
+        
+        # 1. 不再接收新文件、不再触发新任务
+        if self.watcher:
+            self.watcher.stop()
+        self.job_scheduler.stop(self._remaining(2))
+        self.controller.begin_drain()
+        
+        # 2. 等待进行中的检测完成（超时则中断哈希计算），为之后的步骤留出时间
+        reserve = SHUTDOWN_OVERHEAD - 2
+        finished = self.controller.finish_drain(max(0.0, self._remaining(self.drain_timeout + reserve) - reserve))
+        if finished:
+            print("✓ 进行中的检测已完成")
+        else:
+            print("⚠️  等待超时，未完成的文件将在下次启动时重新检测")
+        
+        # 3. 保存待处理队列
+        if self.watcher:
+            try:
+                saved = self.watcher.save_queue(self.queue_file)
+                if saved:
+                    print(f"💾 已保存待处理队列: {saved} 个文件")
+            except Exception as e:
+                print(f"⚠️  保存待处理队列失败: {e}")
+    
+    def _remaining(self, limit: float) -> float:
+        """
+        停止过程中某一步可用的等待时间（首次调用时开始计算 stop_grace_period）
+        
+        :param limit: 这一步的最长等待时间（秒）
+        :return: 不超过 limit 和停止期限剩余时间的等待时间（秒）
+        """
+        if self._stop_deadline is None:
+            self._stop_deadline = time.monotonic() + self.stop_grace_period
+        return max(0.0, min(limit, self._stop_deadline - time.monotonic()))
+    
     def _watch_loop(self):
         """实时监控循环"""
         from .file_watcher import FileWatcher
@@ -153,9 +277,11 @@ class Scheduler:
                 print(f"🔍 正在检测: {file_path.name} ...")
                 
                 # 实时监控到的新文件，先检测但不移动
-                result = self.controller.check_and_record(file_path)
+                result = self.controller.check_new_file(file_path)
                 
-                if result.get('success'):
+                if result.get('skipped'):
+                    print(f"⏭  {file_path.name}: {result.get('error', '正在被其他任务处理')}")
+                elif result.get('success'):
                     if result.get('can_rapid'):
                         print(f"✅ {file_path.name}: 可秒传（将在定时任务中移动）")
                     else:
@@ -167,57 +293,73 @@ class Scheduler:
                 import traceback
                 traceback.print_exc()
         
+        file_handler = self.controller.file_handler
         watcher = FileWatcher(
             watch_path=input_path,
             callback=process_callback,
             debounce_seconds=self.debounce_seconds,
-            recursive=True
+            recursive=True,
+            ignore_patterns=self.ignore_patterns,
+            file_filter=file_handler.file_filter,
+            coalesce_seconds=self.coalesce_seconds
         )
         
         watcher.start()
+        self.watcher = watcher
+        
+        # 恢复上次停止时未处理完的队列
+        restored = watcher.restore_queue(self.queue_file)
+        if restored:
+            print(f"♻️  已恢复上次停止时的待处理队列: {restored} 个文件")
+        
+        # 启动补偿扫描：停机期间到达的文件直接加入监控队列
+        self._reconcile_input(watcher, input_path)
     
-    def _cron_loop(self):
-        """定时任务循环"""
-        while self.running:
-            try:
-                # 检查是否需要运行定时任务
-                if self._should_run_cron():
-                    current_time = time.time()
-                    print(f"\n⏰ [{datetime.now().strftime('%H:%M:%S')}] 定时任务开始...")
-                    
-                    # 1. 检测并移动 input 目录中的文件
-                    try:
-                        print("  📂 检测 input 目录...")
-                        result = self.controller.process_input_with_delay()
-                        if result.get('success'):
-                            rapid = result.get('rapid_moved', 0)
-                            non_rapid = result.get('non_rapid_moved', 0)
-                            pending = result.get('pending', 0)
-                            print(f"  ✅ 检测完成: {rapid} 个可秒传已移动, {non_rapid} 个不可秒传已移动, {pending} 个待重检")
-                    except Exception as e:
-                        print(f"  ❌ 检测失败: {e}")
-                        self.controller.telegram.notify_error(f"定时检测失败: {e}")
-                    
-                    # 2. 重新检测 non_rapid 目录
-                    try:
-                        print("  🔄 重新检测 non_rapid 目录...")
-                        result = self.controller.recheck_non_rapid_files()
-                        if result.get('success'):
-                            now_rapid = result.get('now_rapid', 0)
-                            print(f"  ✅ 重检完成: {now_rapid} 个变为可秒传")
-                    except Exception as e:
-                        print(f"  ❌ 重检失败: {e}")
-                        self.controller.telegram.notify_error(f"定时重检失败: {e}")
-                    
-                    self.last_cron_time = current_time
-                    print(f"✅ 定时任务完成\n")
-                
-                # 每分钟检查一次
-                time.sleep(60)
-                
-            except Exception as e:
-                print(f"❌ 调度器错误: {e}")
-                time.sleep(60)
+    def _reconcile_input(self, watcher, input_path: Path):
+        """
+        启动补偿扫描
+        对比 input 目录与状态记录（路径、大小、修改时间），只将未记录或已变化的文件加入队列
+        
+        :param watcher: 文件监控器实例
+        :param input_path: input 目录
+        """
+        try:
+            start = time.time()
+            files = self.controller.file_handler.scan_files(input_path, recursive=True)
+            changed = self.controller.state_store.find_unknown_or_changed(files)
+            added = watcher.enqueue(changed)
+            elapsed = time.time() - start
+            print(f"🔁 启动补偿扫描: {len(files)} 个文件，{added} 个加入检测队列（耗时 {elapsed:.2f} 秒）")
+        except Exception as e:
+            print(f"⚠️  启动补偿扫描失败: {e}")
+    
+    def _run_scan_input(self):
+        """定时任务：检测并移动 input 目录中的文件"""
+        print(f"\n⏰ [{datetime.now().strftime('%H:%M:%S')}] 📂 检测 input 目录...")
+        try:
+            result = self.controller.process_input_with_delay()
+            if result.get('success'):
+                rapid = result.get('rapid_moved', 0)
+                non_rapid = result.get('non_rapid_moved', 0)
+                pending = result.get('pending', 0)
+                print(f"  ✅ 检测完成: {rapid} 个可秒传已移动, {non_rapid} 个不可秒传已移动, {pending} 个待重检")
+            return result
+        except Exception as e:
+            self.controller.telegram.notify_error(f"定时检测失败: {e}")
+            raise
+    
+    def _run_recheck(self):
+        """定时任务：重新检测 non_rapid 目录"""
+        print(f"\n⏰ [{datetime.now().strftime('%H:%M:%S')}] 🔄 重新检测 non_rapid 目录...")
+        try:
+            result = self.controller.recheck_non_rapid_files()
+            if result.get('success'):
+                now_rapid = result.get('now_rapid', 0)
+                print(f"  ✅ 重检完成: {now_rapid} 个变为可秒传")
+            return result
+        except Exception as e:
+            self.controller.telegram.notify_error(f"定时重检失败: {e}")
+            raise
     
     def _bot_loop(self):
         """Telegram Bot 循环"""
@@ -232,7 +374,7 @@ class Scheduler:
                 return
             
             print("🤖 正在启动 Telegram Bot...")
-            self.bot = TelegramBot(bot_token, self.controller)
+            self.bot = TelegramBot(bot_token, self.controller, scheduler=self)
             
             # 在单独的线程中运行 Bot
             self.bot.run()
@@ -246,12 +388,12 @@ class Scheduler:
         """停止调度器"""
         print("\n⏹️  正在停止调度器...")
         self.running = False
+        self.controller.config_manager.stop_watching()
         
         if self.watch_thread:
-            self.watch_thread.join(timeout=2)
+            self.watch_thread.join(timeout=self._remaining(2))
         
-        if self.cron_thread:
-            self.cron_thread.join(timeout=2)
+        self.job_scheduler.stop(self._remaining(2))
         
         if self.bot and self.bot_thread:
             try:
@@ -260,6 +402,9 @@ class Scheduler:
                     self.bot.application.stop()
             except Exception as e:
                 print(f"⚠️  停止 Bot 时出错: {e}")
-            self.bot_thread.join(timeout=2)
+            self.bot_thread.join(timeout=self._remaining(1))
+        
+        # 发出剩余通知（退出时 atexit 不会再延长等待）
+        self.controller.telegram.close(self._remaining(2))
         
         print("✅ 调度器已停止")
@@ -0,0 +1,336 @@
+"""
+状态存储模块
+统一读写重检记录文件（recheck.json），并提供按检测时间、状态、位置索引的查询
+"""
+
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .fs_utils import atomic_write_json
+
+
+class StateStore:
+    """
+    文件检测状态存储
+
+    记录在首次访问时从磁盘加载，之后以内存为准，所有读写都在锁内进行，
+    避免多个线程各自加载、各自覆盖造成的更新丢失
+
+    首次查询时建立索引（按 last_check_time 排序的列表、location / last_status 分组），
+    之后随每次修改增量维护，查询无需复制和排序全部记录
+    """
+
+    def __init__(self, state_file: str | Path):
+        """
+        初始化状态存储
+
+        :param state_file: 记录文件路径
+        """
+        self.state_file = Path(state_file)
+        self.lock = threading.RLock()
+        self._records: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+        
+        # 索引（首次查询时建立）
+        self._by_time: Optional[List[Tuple[float, str]]] = None
+        self._by_location: Dict[Any, Set[str]] = {}
+        self._by_status: Dict[Any, Set[str]] = {}
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        """加载记录（需在锁内调用）"""
+        if self._records is None:
+            if self.state_file.exists():
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self._records = json.load(f)
+            else:
+                self._records = {}
+        return self._records
+
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取全部记录的快照（可安全遍历和修改，不影响存储）
+
+        :return: {文件绝对路径: 记录}
+        """
+        with self.lock:
+            return {key: dict(record) for key, record in self._ensure_loaded().items()}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        获取单条记录的副本
+
+        :param key: 文件绝对路径
+        :return: 记录，不存在时返回 None
+        """
+        with self.lock:
+            record = self._ensure_loaded().get(key)
+            return dict(record) if record is not None else None
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        """
+        写入整条记录
+
+        :param key: 文件绝对路径
+        :param record: 记录
+        """
+        with self.lock:
+            records = self._ensure_loaded()
+            self._unindex(key, records.get(key))
+            records[key] = dict(record)
+            self._index(key, records[key])
+            self._dirty = True
+
+    def update(self, key: str, **fields) -> Dict[str, Any]:
+        """
+        更新记录字段（不存在时创建）
+
+        :param key: 文件绝对路径
+        :return: 更新后的记录副本
+        """
+        with self.lock:
+            record = self._ensure_loaded().setdefault(key, {})
+            self._unindex(key, record)
+            record.update(fields)
+            self._index(key, record)
+            self._dirty = True
+            return dict(record)
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        删除记录
+
+        :param key: 文件绝对路径
+        :return: 被删除的记录
+        """
+        with self.lock:
+            record = self._ensure_loaded().pop(key, None)
+            if record is not None:
+                self._unindex(key, record)
+                self._dirty = True
+            return record
+
+    def rename(self, old_key: str, new_key: str, **fields) -> Optional[Dict[str, Any]]:
+        """
+        文件移动后迁移记录
+
+        :param old_key: 原路径
+        :param new_key: 新路径
+        :return: 迁移后的记录副本，原记录不存在时返回 None
+        """
+        with self.lock:
+            records = self._ensure_loaded()
+            record = records.pop(old_key, None)
+            if record is None:
+                return None
+            self._unindex(old_key, record)
+            self._unindex(new_key, records.get(new_key))
+            record.update(fields)
+            records[new_key] = record
+            self._index(new_key, record)
+            self._dirty = True
+            return dict(record)
+
+    def remove_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """
+        删除满足条件的记录
+
+        :param predicate: 判断函数
+        :return: 删除数量
+        """
+        with self.lock:
+            records = self._ensure_loaded()
+            keys = [key for key, record in records.items() if predicate(record)]
+            for key in keys:
+                self._unindex(key, records.pop(key))
+            if keys:
+                self._dirty = True
+            return len(keys)
+
+    # ---- 索引 ----
+
+    def _ensure_indexed(self):
+        """建立索引（需在锁内调用）"""
+        if self._by_time is not None:
+            return
+        records = self._ensure_loaded()
+        self._by_time = []
+        self._by_location = {}
+        self._by_status = {}
+        for key, record in records.items():
+            self._by_location.setdefault(record.get('location'), set()).add(key)
+            self._by_status.setdefault(record.get('last_status'), set()).add(key)
+            self._by_time.append((record.get('last_check_time', 0), key))
+        self._by_time.sort()
+
+    def _index(self, key: str, record: Dict[str, Any]):
+        """将记录加入索引（需在锁内调用，索引尚未建立时跳过）"""
+        if self._by_time is None:
+            return
+        self._by_location.setdefault(record.get('location'), set()).add(key)
+        self._by_status.setdefault(record.get('last_status'), set()).add(key)
+        bisect.insort(self._by_time, (record.get('last_check_time', 0), key))
+
+    def _unindex(self, key: str, record: Optional[Dict[str, Any]]):
+        """将记录移出索引（需在锁内调用，索引尚未建立时跳过）"""
+        if self._by_time is None or record is None:
+            return
+        self._by_location.get(record.get('location'), set()).discard(key)
+        self._by_status.get(record.get('last_status'), set()).discard(key)
+        entry = (record.get('last_check_time', 0), key)
+        index = bisect.bisect_left(self._by_time, entry)
+        if index < len(self._by_time) and self._by_time[index] == entry:
+            del self._by_time[index]
+
+    def _iter_by_time(self, newest_first: bool = True, location: Optional[str] = None,
+                      status: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """按检测时间顺序遍历符合条件的记录（需在锁内调用）"""
+        self._ensure_indexed()
+        records = self._records
+        entries = reversed(self._by_time) if newest_first else iter(self._by_time)
+        locations = self._by_location.get(location, set()) if location is not None else None
+        statuses = self._by_status.get(status, set()) if status is not None else None
+        for _, key in entries:
+            if locations is not None and key not in locations:
+                continue
+            if statuses is not None and key not in statuses:
+                continue
+            yield key, records[key]
+
+    def count(self, location: Optional[str] = None, status: Optional[str] = None) -> int:
+        """
+        统计符合条件的记录数
+
+        :param location: 文件位置（input / non_rapid），为空时不限
+        :param status: 最近一次检测结果（rapid / non_rapid），为空时不限
+        :return: 记录数
+        """
+        with self.lock:
+            self._ensure_indexed()
+            if location is None and status is None:
+                return len(self._records)
+            if status is None:
+                return len(self._by_location.get(location, ()))
+            if location is None:
+                return len(self._by_status.get(status, ()))
+            return len(self._by_location.get(location, set()) & self._by_status.get(status, set()))
+
+    def recent(self, limit: int = 10, offset: int = 0, location: Optional[str] = None,
+               status: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        按最近检测时间倒序分页查询
+
+        :param limit: 每页数量
+        :param offset: 跳过的数量
+        :param location: 文件位置，为空时不限
+        :param status: 最近一次检测结果，为空时不限
+        :return: [(文件路径, 记录副本)]
+        """
+        with self.lock:
+            rows = self._iter_by_time(True, location, status)
+            return [(key, dict(record)) for _, (key, record) in zip(range(offset + limit), rows)][offset:]
+
+    def find(self, text: str, limit: int = 10, offset: int = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        按文件名搜索（不区分大小写的子串匹配，按最近检测时间倒序）
+
+        :param text: 搜索内容
+        :param limit: 每页数量
+        :param offset: 跳过的数量
+        :return: [(文件路径, 记录副本)]
+        """
+        text = text.casefold()
+        result = []
+        with self.lock:
+            for key, record in self._iter_by_time(True):
+                if text not in os.path.basename(key).casefold():
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                result.append((key, dict(record)))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def due(self, now: float, interval: float, max_times: int, limit: int = 10,
+            offset: int = 0) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        查询已到重检时间的 non_rapid 文件（按上次检测时间正序，最早到期的在前）
+
+        :param now: 当前时间戳
+        :param interval: 重检间隔（秒）
+        :param max_times: 最大检测次数，达到后不再重检
+        :param limit: 每页数量
+        :param offset: 跳过的数量
+        :return: [(文件路径, 记录副本)]
+        """
+        result = []
+        with self.lock:
+            for key, record in self._iter_by_time(False, location='non_rapid'):
+                if record.get('last_check_time', 0) > now - interval:
+                    # 按时间排序，之后的记录都未到期
+                    break
+                if record.get('check_count', 0) >= max_times:
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                result.append((key, dict(record)))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._ensure_loaded())
+
+    def flush(self) -> None:
+        """将修改写回磁盘（原子写入，中途中断不会损坏原文件）"""
+        with self.lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.state_file, self._records)
+            self._dirty = False
+
+    @staticmethod
+    def is_changed(record: Dict[str, Any], stat: os.stat_result) -> bool:
+        """
+        判断文件相对记录是否发生变化
+
+        旧版本记录没有 mtime，此时只比较大小，避免升级后全部重新计算哈希
+
+        :param record: 文件记录
+        :param stat: 文件当前 stat 结果
+        :return: 是否变化
+        """
+        if record.get('size') != stat.st_size:
+            return True
+
+        mtime = record.get('mtime')
+        return mtime is not None and mtime != stat.st_mtime
+
+    def find_unknown_or_changed(self, files: Iterable[Path]) -> List[Path]:
+        """
+        对比当前文件与记录，找出未记录或已变化的文件
+
+        :param files: 当前文件列表
+        :return: 需要检测的文件列表
+        """
+        records = self.records()
+        changed = []
+
+        for file_path in files:
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+
+            record = records.get(str(file_path.absolute()))
+            if record is None or self.is_changed(record, stat):
+                changed.append(file_path)
+
+        return changed
@@ -3,28 +3,134 @@ Telegram Bot 模块
 提供交互式菜单控制
 """
 
+import asyncio
+import html
+import itertools
 import os
-import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, Set
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 
+from .job_scheduler import JobBusyError
+from .progress import PassProgress
+
+
+# 进度消息的刷新间隔（秒），避免触发 Telegram 的编辑频率限制
+PROGRESS_EDIT_INTERVAL = 5
+
+# 记录列表每页显示的数量
+RECORDS_PAGE_SIZE = 10
+
+
+def _format_duration(seconds: float) -> str:
+    """格式化时长"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+
+
+def _format_size(size: float) -> str:
+    """格式化文件大小"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024.0:
+            return f"{size:.2f} {unit}"
+        size /= 1024.0
+    return f"{size:.2f} PB"
+
+
+class _ReplyQuery:
+    """将命令消息包装成回调查询：首次调用时回复一条消息，之后编辑这条消息"""
+    
+    def __init__(self, message):
+        self.message = message
+        self.sent = None
+    
+    async def edit_message_text(self, text, **kwargs):
+        if self.sent is None:
+            self.sent = await self.message.reply_text(text, **kwargs)
+        else:
+            await self.sent.edit_text(text, **kwargs)
+
 
 class TelegramBot:
     """Telegram Bot 控制器"""
     
-    def __init__(self, bot_token: str, controller):
+    def __init__(self, bot_token: str, controller, scheduler=None):
         """
         初始化 Telegram Bot
         
         :param bot_token: Bot Token
         :param controller: RapidUploadController 实例
+        :param scheduler: Scheduler 实例（调度器模式下传入，立即执行的任务与定时任务互斥）
         """
         self.bot_token = bot_token
         self.controller = controller
+        self.scheduler = scheduler
         self.app = None
+        
+        # 立即检测 / 重新检测在线程池中执行，事件循环只负责刷新进度
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bot-job')
+        self._job_ids = itertools.count(1)
+        self._jobs: Dict[str, PassProgress] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        
+        # 翻页用的查询条件（编号 -> (查询类型, 参数)）
+        self._query_ids = itertools.count(1)
+        self._queries: OrderedDict = OrderedDict()
+    
+    def _run_job(self, name: str, fallback):
+        """
+        立即运行任务
+        
+        :param name: 调度任务名
+        :param fallback: 未运行调度器时直接调用的控制器方法
+        :return: 任务结果
+        """
+        if self.scheduler and name in self.scheduler.job_scheduler.jobs:
+            try:
+                return self.scheduler.run_job_now(name)
+            except JobBusyError as e:
+                return {'success': False, 'error': str(e)}
+        return fallback()
+    
+    @staticmethod
+    def _format_count(counter: Optional[Dict[str, Any]]) -> str:
+        """格式化缓存的目录文件数"""
+        if counter is None:
+            return "统计中..."
+        return f"{counter['count']} 个文件"
+    
+    @staticmethod
+    def _format_stats_age(dir_stats: Dict[str, Optional[Dict[str, Any]]]) -> str:
+        """目录统计的校准时间"""
+        updated = [c['updated'] for c in dir_stats.values() if c is not None]
+        if not updated:
+            return "🗂 目录统计: 后台统计中"
+        return f"🗂 目录统计校准于: {datetime.fromtimestamp(min(updated)).strftime('%m-%d %H:%M')}"
+    
+    def _format_jobs_status(self) -> str:
+        """格式化定时任务的下一次运行时间"""
+        if not self.scheduler:
+            return ""
+        
+        lines = []
+        for job in self.scheduler.get_jobs_status():
+            if job['running']:
+                state = '🔄 运行中'
+            else:
+                state = f"下次: {datetime.fromtimestamp(job['next_run']).strftime('%m-%d %H:%M')}"
+            lines.append(f"• {job['description']}: {state}")
+        
+        if not lines:
+            return ""
+        return "\n⏰ <b>定时任务：</b>\n" + "\n".join(lines) + "\n"
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理 /start 命令"""
@@ -96,6 +202,10 @@ class TelegramBot:
             await self.show_notification_settings(query)
         elif action == "help":
             await self.show_help(query)
+        elif action.startswith("page:"):
+            await self.turn_page(query, action)
+        elif action.startswith("cancel_job:"):
+            await self.cancel_job(query, action)
         elif action.startswith("toggle_notify_"):
             await self.toggle_notification(query, action)
         elif action == "back_to_menu":
@@ -104,42 +214,34 @@ class TelegramBot:
     async def show_status(self, query):
         """显示当前状态"""
         try:
-            # 读取重检记录
-            recheck_file = Path(self.controller.recheck_file)
-            recheck_data = {}
-            if recheck_file.exists():
-                with open(recheck_file, 'r', encoding='utf-8') as f:
-                    recheck_data = json.load(f)
-            
-            # 统计各目录文件数
-            input_path = Path('./input')
-            rapid_path = Path('./rapid')
-            non_rapid_path = Path('./non_rapid')
+            state_store = self.controller.state_store
             
-            input_files = len(list(input_path.rglob('*'))) if input_path.exists() else 0
-            rapid_files = len(list(rapid_path.rglob('*'))) if rapid_path.exists() else 0
-            non_rapid_files = len(list(non_rapid_path.rglob('*'))) if non_rapid_path.exists() else 0
+            # 各目录文件数（缓存值，不遍历磁盘）
+            dir_stats = self.controller.dir_stats.snapshot()
+            input_files = self._format_count(dir_stats['input'])
+            rapid_files = self._format_count(dir_stats['rapid'])
+            non_rapid_files = self._format_count(dir_stats['non_rapid'])
             
-            # 统计待检测文件
-            pending_files = sum(1 for k, v in recheck_data.items() 
-                              if v.get('location') == 'input')
+            # 统计待检测文件（索引计数）
+            pending_files = state_store.count(location='input')
             
             status_text = f"""
 📊 <b>系统状态</b>
 
 📁 <b>文件分布：</b>
-• Input 目录: {input_files} 个文件
-• Rapid 目录: {rapid_files} 个文件
-• Non-Rapid 目录: {non_rapid_files} 个文件
+• Input 目录: {input_files}
+• Rapid 目录: {rapid_files}
+• Non-Rapid 目录: {non_rapid_files}
+{self._format_stats_age(dir_stats)}
 
 ⏳ <b>待处理：</b>
 • 待检测文件: {pending_files} 个
-• 记录总数: {len(recheck_data)} 条
+• 记录总数: {len(state_store)} 条
 
 ⚙️ <b>调度器状态：</b>
 • 实时监控: {'✅ 运行中' if self.controller.config_manager.get('scheduler.watch.enabled', True) else '⏸️ 已停止'}
 • 定时任务: {'✅ 运行中' if self.controller.config_manager.get('scheduler.cron.enabled', True) else '⏸️ 已停止'}
-
+{self._format_jobs_status()}
 🕐 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
             
@@ -154,19 +256,115 @@ class TelegramBot:
         except Exception as e:
             await query.edit_message_text(f"❌ 获取状态失败: {str(e)}")
     
-    async def scan_now(self, query):
-        """立即执行扫描"""
-        await query.edit_message_text("🔍 开始扫描 input 目录...\n请稍候...")
+    def _execute_job(self, progress: PassProgress, fallback: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """在工作线程中运行任务并跟踪进度"""
+        with self.controller.track_progress(progress):
+            return self._run_job(progress.name, fallback)
+    
+    async def _start_job(self, query, name: str, description: str, fallback, format_result):
+        """
+        在后台启动任务并立即返回，随后定期把进度编辑到消息中
         
+        :param query: 回调查询
+        :param name: 调度任务名
+        :param description: 任务描述
+        :param fallback: 未运行调度器时直接调用的控制器方法
+        :param format_result: 将任务结果格式化为消息文本的函数
+        """
+        for progress in self._jobs.values():
+            if progress.name == name and progress.finished is None:
+                await query.edit_message_text(f"⏳ {description}正在运行（任务 #{progress.job_id}）")
+                return
+        
+        job_id = str(next(self._job_ids))
+        progress = PassProgress(job_id, name, description)
+        self._jobs[job_id] = progress
+        
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._execute_job, progress, fallback
+        )
+        await self._edit_progress(query, progress)
+        
+        # 跟踪任务不阻塞当前回调，Bot 在任务运行期间仍可响应其他操作
+        task = asyncio.create_task(self._follow_job(query, progress, future, format_result))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _edit_progress(self, query, progress: PassProgress):
+        """将当前进度编辑到消息中（附带取消按钮）"""
+        info = progress.snapshot()
+        lines = [f"⏳ <b>{progress.description}</b>（任务 #{progress.job_id}）", ""]
+        if info['total'] is None:
+            lines.append("正在扫描文件...")
+        else:
+            percent = info['done'] / info['total'] * 100 if info['total'] else 100
+            lines.append(f"• 进度: {info['done']}/{info['total']} 个文件（{percent:.0f}%）")
+            lines.append(f"• 速度: {info['rate'] / (1024 * 1024):.1f} MB/s")
+            if info['eta'] is not None:
+                lines.append(f"• 预计剩余: {_format_duration(info['eta'])}")
+        lines.append(f"• 已用时间: {_format_duration(info['elapsed'])}")
+        
+        if info['cancelled']:
+            lines.append("\n⏹ 正在取消（当前文件完成后停止）...")
+            reply_markup = None
+        else:
+            reply_markup = InlineKeyboardMarkup(
+                [[InlineKeyboardButton("⏹ 取消", callback_data=f"cancel_job:{progress.job_id}")]]
+            )
+        
+        try:
+            await query.edit_message_text("\n".join(lines), reply_markup=reply_markup, parse_mode='HTML')
+        except Exception:
+            # 内容未变化或编辑过于频繁时忽略，下次再刷新
+            pass
+    
+    async def _follow_job(self, query, progress: PassProgress, future, format_result):
+        """定期刷新进度，任务结束后显示结果"""
         try:
-            result = self.controller.process_input_with_delay()
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=PROGRESS_EDIT_INTERVAL)
+                if done:
+                    break
+                await self._edit_progress(query, progress)
+            
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            result_text = format_result(result)
+            if progress.cancelled:
+                result_text = f"⏹ <b>任务 #{progress.job_id} 已取消</b>，以下为取消前的结果\n" + result_text
             
-            if result.get('success'):
-                rapid = result.get('rapid_moved', 0)
-                non_rapid = result.get('non_rapid_moved', 0)
-                pending = result.get('pending', 0)
-                
-                result_text = f"""
+            keyboard = [[InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")]]
+            await query.edit_message_text(
+                result_text,
+                reply_markup=InlineKeyboardMarkup(keyboard),
+                parse_mode='HTML'
+            )
+        except Exception as e:
+            print(f"⚠️  更新任务 #{progress.job_id} 进度失败: {e}")
+        finally:
+            self._jobs.pop(progress.job_id, None)
+    
+    async def cancel_job(self, query, action: str):
+        """取消正在运行的任务"""
+        progress = self._jobs.get(action.split(':', 1)[1])
+        if progress is None or progress.finished is not None:
+            return
+        progress.cancel()
+        await self._edit_progress(query, progress)
+    
+    @staticmethod
+    def _format_scan_result(result: Dict[str, Any]) -> str:
+        """格式化扫描结果"""
+        if not result.get('success'):
+            return f"❌ 扫描失败: {result.get('error', '未知错误')}"
+        
+        rapid = result.get('rapid_moved', 0)
+        non_rapid = result.get('non_rapid_moved', 0)
+        pending = result.get('pending', 0)
+        
+        return f"""
 ✅ <b>扫描完成</b>
 
 📊 <b>处理结果：</b>
@@ -176,34 +374,19 @@ class TelegramBot:
 
 🕐 完成时间: {datetime.now().strftime('%H:%M:%S')}
 """
-            else:
-                result_text = f"❌ 扫描失败: {result.get('error', '未知错误')}"
-            
-            keyboard = [[InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                result_text,
-                reply_markup=reply_markup,
-                parse_mode='HTML'
-            )
-        except Exception as e:
-            await query.edit_message_text(f"❌ 扫描失败: {str(e)}")
     
-    async def recheck_now(self, query):
-        """立即执行重新检测"""
-        await query.edit_message_text("🔄 开始重新检测 non_rapid 目录...\n请稍候...")
+    @staticmethod
+    def _format_recheck_result(result: Dict[str, Any]) -> str:
+        """格式化重新检测结果"""
+        if not result.get('success'):
+            return f"❌ 重新检测失败: {result.get('error', '未知错误')}"
         
-        try:
-            result = self.controller.recheck_non_rapid_files()
-            
-            if result.get('success'):
-                total = result.get('total', 0)
-                now_rapid = result.get('now_rapid', 0)
-                still_non_rapid = result.get('still_non_rapid', 0)
-                skipped = result.get('skipped', 0)
-                
-                result_text = f"""
+        total = result.get('total', 0)
+        now_rapid = result.get('now_rapid', 0)
+        still_non_rapid = result.get('still_non_rapid', 0)
+        skipped = result.get('skipped', 0)
+        
+        return f"""
 ✅ <b>重新检测完成</b>
 
 📊 <b>检测结果：</b>
@@ -214,19 +397,16 @@ class TelegramBot:
 
 🕐 完成时间: {datetime.now().strftime('%H:%M:%S')}
 """
-            else:
-                result_text = f"❌ 重新检测失败: {result.get('error', '未知错误')}"
-            
-            keyboard = [[InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                result_text,
-                reply_markup=reply_markup,
-                parse_mode='HTML'
-            )
-        except Exception as e:
-            await query.edit_message_text(f"❌ 重新检测失败: {str(e)}")
+    
+    async def scan_now(self, query):
+        """立即执行扫描（后台运行）"""
+        await self._start_job(query, 'scan_input', '扫描 input 目录',
+                              self.controller.process_input_with_delay, self._format_scan_result)
+    
+    async def recheck_now(self, query):
+        """立即执行重新检测（后台运行）"""
+        await self._start_job(query, 'recheck', '重新检测 non_rapid 目录',
+                              self.controller.recheck_non_rapid_files, self._format_recheck_result)
     
     async def clean_processed(self, query):
         """清理已处理文件记录"""
@@ -280,38 +460,35 @@ class TelegramBot:
                 # 简化版本：只显示当前目录统计
                 pass
             
-            rapid_path = Path('./rapid')
-            non_rapid_path = Path('./non_rapid')
-            
-            rapid_count = len([f for f in rapid_path.rglob('*') if f.is_file()]) if rapid_path.exists() else 0
-            non_rapid_count = len([f for f in non_rapid_path.rglob('*') if f.is_file()]) if non_rapid_path.exists() else 0
-            
-            # 计算总大小
-            rapid_size = sum(f.stat().st_size for f in rapid_path.rglob('*') if f.is_file()) if rapid_path.exists() else 0
-            non_rapid_size = sum(f.stat().st_size for f in non_rapid_path.rglob('*') if f.is_file()) if non_rapid_path.exists() else 0
+            # 文件数与总大小（缓存值，不遍历磁盘）
+            dir_stats = self.controller.dir_stats.snapshot()
+            if dir_stats['rapid'] is None or dir_stats['non_rapid'] is None:
+                keyboard = [[InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")]]
+                await query.edit_message_text(
+                    "⏳ 正在后台统计目录，请稍后再试",
+                    reply_markup=InlineKeyboardMarkup(keyboard)
+                )
+                return
             
-            def format_size(size):
-                for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                    if size < 1024.0:
-                        return f"{size:.2f} {unit}"
-                    size /= 1024.0
-                return f"{size:.2f} PB"
+            rapid_count, rapid_size = dir_stats['rapid']['count'], dir_stats['rapid']['bytes']
+            non_rapid_count, non_rapid_size = dir_stats['non_rapid']['count'], dir_stats['non_rapid']['bytes']
             
             stats_text = f"""
 📈 <b>统计信息</b>
 
 📁 <b>可秒传文件：</b>
 • 文件数: {rapid_count}
-• 总大小: {format_size(rapid_size)}
+• 总大小: {_format_size(rapid_size)}
 
 📁 <b>不可秒传文件：</b>
 • 文件数: {non_rapid_count}
-• 总大小: {format_size(non_rapid_size)}
+• 总大小: {_format_size(non_rapid_size)}
 
 📊 <b>总计：</b>
 • 文件总数: {rapid_count + non_rapid_count}
-• 总大小: {format_size(rapid_size + non_rapid_size)}
+• 总大小: {_format_size(rapid_size + non_rapid_size)}
 • 秒传率: {(rapid_count / (rapid_count + non_rapid_count) * 100) if (rapid_count + non_rapid_count) > 0 else 0:.1f}%
+{self._format_stats_age(dir_stats)}
 
 🕐 统计时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
@@ -327,45 +504,113 @@ class TelegramBot:
         except Exception as e:
             await query.edit_message_text(f"❌ 获取统计失败: {str(e)}")
     
-    async def show_file_list(self, query):
-        """显示最近文件列表"""
+    def _format_record(self, file_path: str, info: Dict[str, Any]) -> str:
+        """格式化单条检测记录"""
+        filename = html.escape(Path(file_path).name)
+        if len(filename) > 40:
+            filename = filename[:37] + '...'
+        status = "✅ 可秒传" if info.get('last_status') == 'rapid' else "⚠️ 不可秒传"
+        check_count = info.get('check_count', 0)
+        location = info.get('location', 'unknown')
+        last_check = info.get('last_check_time')
+        checked = datetime.fromtimestamp(last_check).strftime('%m-%d %H:%M') if last_check else '-'
+        return (f"• <code>{filename}</code>\n"
+                f"  状态: {status} | 检测: {check_count}次 | 位置: {location} | {checked}\n")
+    
+    def _query_records(self, kind: str, arg: str, offset: int):
+        """
+        执行记录查询
+        
+        :param kind: 查询类型（recent / find / pending / due）
+        :param arg: 查询参数（find 的搜索内容）
+        :param offset: 跳过的数量
+        :return: (标题, 本页记录，多取一条用于判断是否有下一页)
+        """
+        state_store = self.controller.state_store
+        limit = RECORDS_PAGE_SIZE + 1
+        
+        if kind == 'find':
+            return f"🔎 <b>搜索「{html.escape(arg)}」</b>", state_store.find(arg, limit, offset)
+        if kind == 'pending':
+            return "⏳ <b>input 中等待检测的文件</b>", state_store.recent(limit, offset, location='input')
+        if kind == 'due':
+            settings = self.controller.config_manager.settings
+            rows = state_store.due(
+                datetime.now().timestamp(),
+                settings.scheduler.cron_interval,
+                settings.recheck.max_recheck_times,
+                limit, offset
+            )
+            return "🔄 <b>已到重检时间的文件</b>", rows
+        return "📁 <b>最近检测的文件</b>", state_store.recent(limit, offset)
+    
+    async def show_records(self, query, kind: str, arg: str = '', offset: int = 0):
+        """
+        分页显示检测记录
+        
+        :param query: 回调查询
+        :param kind: 查询类型（recent / find / pending / due）
+        :param arg: 查询参数
+        :param offset: 跳过的数量
+        """
         try:
-            recheck_file = Path(self.controller.recheck_file)
-            recheck_data = {}
-            if recheck_file.exists():
-                with open(recheck_file, 'r', encoding='utf-8') as f:
-                    recheck_data = json.load(f)
-            
-            # 按最后检测时间排序
-            sorted_files = sorted(
-                recheck_data.items(),
-                key=lambda x: x[1].get('last_check_time', 0),
-                reverse=True
-            )[:10]  # 只显示最近 10 个
-            
-            if not sorted_files:
-                file_list_text = "📁 <b>最近文件</b>\n\n暂无记录"
+            title, rows = self._query_records(kind, arg, offset)
+            has_next = len(rows) > RECORDS_PAGE_SIZE
+            rows = rows[:RECORDS_PAGE_SIZE]
+            
+            page = offset // RECORDS_PAGE_SIZE + 1
+            text = f"{title}（第 {page} 页）\n\n"
+            if not rows:
+                text += "暂无记录"
             else:
-                file_list_text = "📁 <b>最近检测的文件（前10个）</b>\n\n"
-                for file_path, info in sorted_files:
-                    filename = Path(file_path).name
-                    status = "✅ 可秒传" if info.get('last_status') == 'rapid' else "⚠️ 不可秒传"
-                    check_count = info.get('check_count', 0)
-                    location = info.get('location', 'unknown')
-                    
-                    file_list_text += f"• <code>{filename[:30]}...</code>\n"
-                    file_list_text += f"  状态: {status} | 检测: {check_count}次 | 位置: {location}\n\n"
-            
-            keyboard = [[InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+                text += "\n".join(self._format_record(file_path, info) for file_path, info in rows)
+            
+            # 翻页按钮（查询参数可能超出 callback_data 的长度限制，按编号保存）
+            query_id = self._remember_query(kind, arg)
+            buttons = []
+            if offset > 0:
+                buttons.append(InlineKeyboardButton(
+                    "⬅️ 上一页", callback_data=f"page:{query_id}:{max(0, offset - RECORDS_PAGE_SIZE)}"
+                ))
+            if has_next:
+                buttons.append(InlineKeyboardButton(
+                    "下一页 ➡️", callback_data=f"page:{query_id}:{offset + RECORDS_PAGE_SIZE}"
+                ))
+            keyboard = [buttons] if buttons else []
+            keyboard.append([InlineKeyboardButton("🔙 返回菜单", callback_data="back_to_menu")])
             
             await query.edit_message_text(
-                file_list_text,
-                reply_markup=reply_markup,
+                text,
+                reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='HTML'
             )
         except Exception as e:
-            await query.edit_message_text(f"❌ 获取文件列表失败: {str(e)}")
+            await query.edit_message_text(f"❌ 查询记录失败: {str(e)}")
+    
+    def _remember_query(self, kind: str, arg: str) -> str:
+        """保存查询条件并返回编号（只保留最近的若干条）"""
+        for query_id, saved in self._queries.items():
+            if saved == (kind, arg):
+                self._queries.move_to_end(query_id)
+                return query_id
+        query_id = str(next(self._query_ids))
+        self._queries[query_id] = (kind, arg)
+        while len(self._queries) > 50:
+            self._queries.popitem(last=False)
+        return query_id
+    
+    async def turn_page(self, query, action: str):
+        """处理翻页按钮"""
+        _, query_id, offset = action.split(':', 2)
+        saved = self._queries.get(query_id)
+        if saved is None:
+            await query.edit_message_text("⌛ 查询已过期，请重新查询")
+            return
+        await self.show_records(query, saved[0], saved[1], int(offset))
+    
+    async def show_file_list(self, query):
+        """显示最近文件列表"""
+        await self.show_records(query, 'recent')
     
     async def show_system_info(self, query):
         """显示系统信息"""
@@ -422,18 +667,24 @@ class TelegramBot:
         except Exception as e:
             await query.edit_message_text(f"❌ 获取系统信息失败: {str(e)}")
     
-    async def show_notification_settings(self, query):
-        """显示通知设置"""
+    async def show_notification_settings(self, query, status: str = ''):
+        """
+        显示通知设置
+        
+        :param query: 回调查询
+        :param status: 显示在设置上方的操作结果（如切换成功或保存失败）
+        """
         telegram_config = self.controller.config_manager.get('telegram', {})
         
         notify_complete = telegram_config.get('notify_on_complete', True)
         notify_error = telegram_config.get('notify_on_error', True)
         notify_rapid = telegram_config.get('notify_on_rapid', False)
         
+        status_line = f"{html.escape(status)}\n\n" if status else ''
         settings_text = f"""
 🔔 <b>通知设置</b>
 
-当前配置：
+{status_line}当前配置：
 • 完成通知: {'✅ 开启' if notify_complete else '❌ 关闭'}
 • 错误通知: {'✅ 开启' if notify_error else '❌ 关闭'}
 • 单文件通知: {'✅ 开启' if notify_rapid else '❌ 关闭'}
@@ -473,12 +724,24 @@ class TelegramBot:
         )
     
     async def toggle_notification(self, query, action):
-        """切换通知设置"""
-        # 注意：这里只是演示，实际需要修改配置文件
+        """切换通知设置（写回配置文件并立即生效）"""
         setting_name = action.replace('toggle_notify_', '')
+        defaults = {'complete': True, 'error': True, 'rapid': False}
+        # 回调已在 button_callback 中应答过（不能再次 answer），结果直接显示在设置消息中
+        if setting_name not in defaults:
+            await self.show_notification_settings(query, "⚠️ 未知的通知设置")
+            return
+        
+        key_path = f"telegram.notify_on_{setting_name}"
+        enabled = not self.controller.config_manager.get(key_path, defaults[setting_name])
+        
+        try:
+            self.controller.config_manager.update_file(key_path, enabled)
+        except Exception as e:
+            await self.show_notification_settings(query, f"❌ 保存失败: {e}")
+            return
         
-        await query.answer(f"⚠️ 通知设置需要修改配置文件后重启生效")
-        await self.show_notification_settings(query)
+        await self.show_notification_settings(query, f"{'✅ 已开启' if enabled else '❌ 已关闭'}")
     
     async def show_help(self, query):
         """显示帮助信息"""
@@ -490,6 +753,9 @@ class TelegramBot:
 • /status - 查看系统状态
 • /scan - 立即扫描
 • /recheck - 立即重检
+• /find 关键字 - 按文件名搜索记录
+• /pending - input 中等待检测的文件
+• /due - 已到重检时间的文件
 
 <b>功能说明：</b>
 
@@ -515,7 +781,7 @@ class TelegramBot:
 查看 CPU、内存、磁盘使用情况
 
 🔔 <b>通知设置</b>
-配置通知选项（需重启生效）
+配置通知选项（立即生效）
 
 <b>项目地址：</b>
 https://github.com/AWdress/AW115MST
@@ -563,37 +829,31 @@ https://github.com/AWdress/AW115MST
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理 /status 命令"""
-        # 创建一个临时 query 对象
-        class TempQuery:
-            def __init__(self, message):
-                self.message = message
-            
-            async def edit_message_text(self, text, **kwargs):
-                await self.message.reply_text(text, **kwargs)
-        
-        await self.show_status(TempQuery(update.message))
+        await self.show_status(_ReplyQuery(update.message))
     
     async def scan_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理 /scan 命令"""
-        class TempQuery:
-            def __init__(self, message):
-                self.message = message
-            
-            async def edit_message_text(self, text, **kwargs):
-                await self.message.reply_text(text, **kwargs)
-        
-        await self.scan_now(TempQuery(update.message))
+        await self.scan_now(_ReplyQuery(update.message))
     
     async def recheck_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """处理 /recheck 命令"""
-        class TempQuery:
-            def __init__(self, message):
-                self.message = message
-            
-            async def edit_message_text(self, text, **kwargs):
-                await self.message.reply_text(text, **kwargs)
-        
-        await self.recheck_now(TempQuery(update.message))
+        await self.recheck_now(_ReplyQuery(update.message))
+    
+    async def find_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """处理 /find 命令（按文件名搜索记录）"""
+        text = ' '.join(context.args or []).strip()
+        if not text:
+            await update.message.reply_text("用法: /find 文件名关键字")
+            return
+        await self.show_records(_ReplyQuery(update.message), 'find', text)
+    
+    async def pending_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """处理 /pending 命令（input 中等待检测的文件）"""
+        await self.show_records(_ReplyQuery(update.message), 'pending')
+    
+    async def due_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """处理 /due 命令（已到重检时间的文件）"""
+        await self.show_records(_ReplyQuery(update.message), 'due')
     
     def run(self):
         """运行 Bot"""
@@ -604,10 +864,16 @@ https://github.com/AWdress/AW115MST
         self.app.add_handler(CommandHandler("status", self.status_command))
         self.app.add_handler(CommandHandler("scan", self.scan_command))
         self.app.add_handler(CommandHandler("recheck", self.recheck_command))
+        self.app.add_handler(CommandHandler("find", self.find_command))
+        self.app.add_handler(CommandHandler("pending", self.pending_command))
+        self.app.add_handler(CommandHandler("due", self.due_command))
         
         # 注册回调处理器
         self.app.add_handler(CallbackQueryHandler(self.button_callback))
         
+        # 启动时在后台统计目录，状态页无需等待遍历
+        self.controller.dir_stats.refresh()
+        
         print("🤖 Telegram Bot 启动成功")
         print(f"📱 Bot Token: {self.bot_token[:10]}...")
         
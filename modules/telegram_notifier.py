@@ -1,10 +1,17 @@
 """
 Telegram 通知模块
 发送处理结果通知到 Telegram
+
+通知先放入队列，由后台线程发送，处理循环不会因网络请求而阻塞；
+逐个文件的秒传通知合并为汇总消息，发送频率遵守 Telegram 的限流
 """
 
-import requests
-from typing import Dict, Any, Optional
+import atexit
+import html
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional
 from datetime import datetime
 
 
@@ -15,6 +22,29 @@ class TelegramNotifier:
         """
         初始化 Telegram 通知器
         
+        :param config: 通知配置
+        """
+        self._session = None
+        
+        # 发送队列（有界，满时丢弃最早的消息）与待汇总的秒传文件
+        self._cond = threading.Condition()
+        self._queue: Deque[str] = deque()
+        self._dropped = 0
+        self._rapid_files: List[str] = []
+        self._rapid_count = 0
+        self._rapid_since = 0.0
+        self._worker: Optional[threading.Thread] = None
+        self._closing = False
+        self._close_deadline = None
+        self._next_send = 0.0
+        self._atexit_registered = False
+        
+        self.apply_config(config)
+    
+    def apply_config(self, config: Dict[str, Any]):
+        """
+        应用通知配置（运行中修改配置文件后调用）
+        
         :param config: 通知配置
         """
         self.enabled = config.get('enabled', False)
@@ -23,15 +53,29 @@ class TelegramNotifier:
         self.notify_on_complete = config.get('notify_on_complete', True)
         self.notify_on_error = config.get('notify_on_error', True)
         self.notify_on_rapid = config.get('notify_on_rapid', False)
+        # 秒传通知汇总：累计 digest_size 个文件或等待 digest_interval 秒后发送一条
+        self.digest_size = max(1, config.get('digest_size', 20))
+        self.digest_interval = config.get('digest_interval', 30)
+        # 队列上限与两条消息的最小间隔（Telegram 单个会话约每秒 1 条）
+        self.queue_size = max(1, config.get('queue_size', 100))
+        self.min_interval = config.get('min_interval', 1)
         self.config = config  # 保存完整配置
         
         if self.enabled and (not self.bot_token or not self.chat_id):
             print("⚠️  警告: Telegram 通知已启用但未配置 bot_token 或 chat_id")
             self.enabled = False
     
+    def _get_session(self):
+        """复用的 HTTP 会话（连接池）"""
+        if self._session is None:
+            import requests
+            
+            self._session = requests.Session()
+        return self._session
+    
     def send_message(self, message: str, parse_mode: str = 'HTML') -> bool:
         """
-        发送消息到 Telegram
+        立即发送消息到 Telegram（阻塞，被限流时按 retry_after 等待后重试）
         
         :param message: 消息内容
         :param parse_mode: 解析模式 (HTML/Markdown)
@@ -40,19 +84,155 @@ class TelegramNotifier:
         if not self.enabled:
             return False
         
-        try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            data = {
-                'chat_id': self.chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            }
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        data = {
+            'chat_id': self.chat_id,
+            'text': message,
+            'parse_mode': parse_mode
+        }
+        
+        for attempt in range(3):
+            try:
+                response = self._get_session().post(url, json=data, timeout=10)
+            except Exception as e:
+                print(f"❌ Telegram 通知发送失败: {e}")
+                return False
             
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
-        except Exception as e:
-            print(f"❌ Telegram 通知发送失败: {e}")
-            return False
+            if response.status_code != 429:
+                return response.status_code == 200
+            
+            # 触发限流：等待 Telegram 要求的时间
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after', 5)
+            except ValueError:
+                retry_after = 5
+            print(f"⚠️  Telegram 限流，{retry_after} 秒后重试")
+            time.sleep(retry_after)
+        
+        return False
+    
+    def post_message(self, message: str):
+        """
+        将消息放入发送队列（不阻塞）
+        
+        :param message: 消息内容（HTML）
+        """
+        if not self.enabled:
+            return
+        
+        with self._cond:
+            # 先发出已累计的秒传汇总，保持消息顺序
+            self._queue_digest()
+            self._enqueue(message)
+            self._ensure_worker()
+            self._cond.notify()
+    
+    def _enqueue(self, message: str):
+        """入队，队列已满时丢弃最早的消息（需持有锁）"""
+        if len(self._queue) >= self.queue_size:
+            self._queue.popleft()
+            self._dropped += 1
+        self._queue.append(message)
+    
+    def _queue_digest(self):
+        """将累计的秒传文件生成一条汇总消息并入队（需持有锁）"""
+        if not self._rapid_count:
+            return
+        
+        names, count = self._rapid_files, self._rapid_count
+        self._rapid_files, self._rapid_count = [], 0
+        
+        if count == 1:
+            message = f"""
+✅ <b>发现可秒传文件</b>
+
+📁 文件: <code>{html.escape(names[0])}</code>
+🕐 时间: {datetime.now().strftime('%H:%M:%S')}
+"""
+        else:
+            lines = '\n'.join(f"📁 <code>{html.escape(name)}</code>" for name in names)
+            if count > len(names):
+                lines += f"\n… 另有 {count - len(names)} 个文件"
+            message = f"""
+✅ <b>发现 {count} 个可秒传文件</b>
+
+{lines}
+
+🕐 时间: {datetime.now().strftime('%H:%M:%S')}
+"""
+        self._enqueue(message.strip())
+    
+    def _ensure_worker(self):
+        """按需启动发送线程（需持有锁）"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._closing = False
+        self._close_deadline = None
+        self._worker = threading.Thread(target=self._run, name='telegram-notifier', daemon=True)
+        self._worker.start()
+        if not self._atexit_registered:
+            # 程序退出前发出队列中剩余的通知
+            atexit.register(self.close)
+            self._atexit_registered = True
+    
+    def _next_message(self) -> Optional[str]:
+        """
+        等待并取出下一条待发送消息（需持有锁）
+        
+        :return: 消息内容，关闭且队列已空时返回 None
+        """
+        while True:
+            if not self._queue and self._rapid_count:
+                waited = time.monotonic() - self._rapid_since
+                if self._closing or self._rapid_count >= self.digest_size or waited >= self.digest_interval:
+                    self._queue_digest()
+            
+            if self._queue:
+                message = self._queue.popleft()
+                if self._dropped:
+                    message += f"\n\n⚠️ 通知过多，已丢弃 {self._dropped} 条"
+                    self._dropped = 0
+                return message
+            
+            if self._closing:
+                return None
+            
+            timeout = None
+            if self._rapid_count:
+                timeout = max(0.0, self._rapid_since + self.digest_interval - time.monotonic())
+            self._cond.wait(timeout)
+    
+    def _run(self):
+        """发送线程：逐条发送，两条消息之间至少间隔 min_interval 秒"""
+        while True:
+            with self._cond:
+                message = self._next_message()
+            if message is None:
+                return
+            
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.send_message(message)
+            self._next_send = time.monotonic() + self.min_interval
+    
+    def close(self, timeout: float = 10):
+        """
+        发出队列中剩余的通知并停止发送线程
+        
+        多次调用时共用第一次的期限（如停止流程已关闭过，退出时的 atexit 调用不会再等待 timeout 秒）
+        
+        :param timeout: 最长等待时间（秒）
+        """
+        with self._cond:
+            worker = self._worker
+            self._closing = True
+            if self._close_deadline is None:
+                self._close_deadline = time.monotonic() + timeout
+            deadline = self._close_deadline
+            self._cond.notify()
+        if worker is not None:
+            worker.join(max(0.0, deadline - time.monotonic()))
     
     def notify_complete(self, stats: Dict[str, int], duration: float):
         """
@@ -82,25 +262,26 @@ class TelegramNotifier:
 🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         
-        self.send_message(message.strip())
+        self.post_message(message.strip())
     
     def notify_rapid_file(self, filename: str):
         """
-        发送单个可秒传文件通知
+        记录一个可秒传文件（累计后以汇总消息发送）
         
         :param filename: 文件名
         """
         if not self.enabled or not self.notify_on_rapid:
             return
         
-        message = f"""
-✅ <b>发现可秒传文件</b>
-
-📁 文件: <code>{filename}</code>
-🕐 时间: {datetime.now().strftime('%H:%M:%S')}
-"""
-        
-        self.send_message(message.strip())
+        with self._cond:
+            if not self._rapid_count:
+                self._rapid_since = time.monotonic()
+            self._rapid_count += 1
+            # 文件名最多保留 digest_size 个，其余只计数
+            if len(self._rapid_files) < self.digest_size:
+                self._rapid_files.append(filename)
+            self._ensure_worker()
+            self._cond.notify()
     
     def notify_error(self, error_msg: str):
         """
@@ -119,7 +300,7 @@ class TelegramNotifier:
 🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         
-        self.send_message(message.strip())
+        self.post_message(message.strip())
     
     def notify_recheck_complete(self, stats: Dict[str, int]):
         """
@@ -147,7 +328,7 @@ class TelegramNotifier:
 🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         
-        self.send_message(message.strip())
+        self.post_message(message.strip())
     
     def test_connection(self) -> bool:
         """
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准
+
+在独立的解释器中分别导入各命令分支需要的模块，统计导入耗时，
+并列出被加载的重型依赖（短命令不应加载 p115client / watchdog / telegram 等）
+
+用法（在项目根目录运行）:
+  python scripts/bench_startup.py
+  python scripts/bench_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 重型依赖
+HEAVY_MODULES = ['p115client', 'watchdog', 'telegram', 'tqdm', 'requests', 'PyQt6']
+
+# 命令分支 -> 该分支导入的模块
+CLI_PATHS = {
+    '--help / --version': [],
+    '--check-config': ['modules.config_init'],
+    '--test-telegram': ['modules.config_init', 'modules.config_manager', 'modules.telegram_notifier'],
+    '--clean-processed': ['modules.config_init', 'modules.controller'],
+    '默认（调度器）': ['modules.config_init', 'modules.controller', 'modules.scheduler', 'modules.file_watcher'],
+    '--telegram-bot': ['modules.config_init', 'modules.controller', 'modules.telegram_bot'],
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+error = None
+for name in {modules!r}:
+    try:
+        __import__(name)
+    except ImportError as e:
+        error = str(e)
+        break
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'elapsed': elapsed, 'heavy': heavy, 'error': error}}))
+"""
+
+
+def measure(modules, repeat: int):
+    """
+    在新的解释器中导入模块并计时
+
+    :param modules: 模块列表
+    :param repeat: 重复次数
+    :return: (耗时中位数, 加载的重型依赖, 导入错误)
+    """
+    code = PROBE.format(modules=modules, heavy=HEAVY_MODULES)
+    samples = []
+    result = {}
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['elapsed'])
+    return statistics.median(samples), result['heavy'], result['error']
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='统计各命令分支的导入耗时')
+    parser.add_argument('--repeat', type=int, default=5, help='每个分支重复次数（取中位数，默认: 5）')
+    args = parser.parse_args()
+
+    print(f"{'命令分支':<20}{'导入耗时':>10}  重型依赖")
+    for label, modules in CLI_PATHS.items():
+        elapsed, heavy, error = measure(modules, args.repeat)
+        detail = ', '.join(heavy) or '-'
+        if error:
+            detail += f"（导入失败: {error}）"
+        print(f"{label:<20}{elapsed * 1000:>8.1f}ms  {detail}")
+
+
+if __name__ == '__main__':
+    main()